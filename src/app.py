@@ -1,7 +1,15 @@
+import importlib
+
 import streamlit as st
 
-from pages import game_analysis, player_analysis, quality_analysis
+from components.date_filter import render_date_filter
+from components.debug_panel import (DEBUG_PARAM, render_debug_panel,
+                                    render_profile_list)
 from utils.data_processing import load_data
+from utils.instrumentation import start_exporter
+from utils.profiler import (StackSampler, profiling_requested,
+                            save_profile)
+from utils.warmup import start_warmup
 
 st.set_page_config(
     page_title="Gaming Habits and Mental Well-being",
@@ -21,35 +29,68 @@ st.markdown("""
             unsafe_allow_html=True)
 
 
+# Dashboard sections: navigation label -> (question, page module). Pages
+# are imported on first use so their chart libraries only load when needed
+SECTIONS = {
+    "Kind of Player": (
+        "Question I - What types of players are more likely to experience stress?",
+        "pages.player_analysis"),
+    "Kind of Game": (
+        "Question II - What kind of game will lead to anxiety and stress?",
+        "pages.game_analysis"),
+    "Quality of Life": (
+        "Question III - How does gaming influence quality of life?",
+        "pages.quality_analysis"),
+}
+
+
 def main():
-    # Load data
-    df = load_data()
+    # Warm shared caches in the background; a no-op after the first run
+    start_warmup()
+    # Metrics endpoint and file, when instrumentation is enabled
+    start_exporter()
+
+    # Load data; components look up its version with get_data_version
+    df, _ = load_data()
 
     # Set title
     st.title("Gaming Habits and Mental Well-being")
 
-    # Create tabs
-    tab1, tab2, tab3 = st.tabs(
-        ["Kind of Player", "Kind of Game", "Quality of Life"])
+    # Restrict every section to the responses of a survey date range
+    df = render_date_filter(df)
+
+    # Section navigation; only the active section is rendered on a rerun,
+    # the others keep their cached data until they are selected again
+    section = st.radio(
+        "Section",
+        list(SECTIONS),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_section"
+    )
+
+    # Render the active section
+    question, page_module = SECTIONS[section]
+    page = importlib.import_module(page_module)
+    st.header(question)
+    st.markdown("<br>", unsafe_allow_html=True)
+    page.render(df)
 
-    # Render each tab
-    with tab1:
-        st.header(
-            "Question I - What types of players are more likely to experience stress?")
-        st.markdown("<br>", unsafe_allow_html=True)
-        player_analysis.render(df)
+    # Hidden performance panel, shown with ?debug=metrics
+    if st.query_params.get("debug") == DEBUG_PARAM:
+        render_debug_panel()
 
-    with tab2:
-        st.header(
-            'Question II - What kind of game will lead to anxiety and stress?')
-        st.markdown("<br>", unsafe_allow_html=True)
-        game_analysis.render(df)
 
-    with tab3:
-        st.header('Question III - How does gaming influence quality of life?')
-        st.markdown("<br>", unsafe_allow_html=True)
-        quality_analysis.render(df)
+def profiled_main():
+    """Run one rerun under the stack sampler and save its profile"""
+    with StackSampler() as sampler:
+        main()
+    save_profile(sampler, st.session_state.get("active_section", "Unknown"))
+    render_profile_list()
 
 
 if __name__ == "__main__":
-    main()
+    if profiling_requested():
+        profiled_main()
+    else:
+        main()
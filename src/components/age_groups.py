@@ -1,19 +1,76 @@
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
+from utils.bootstrap import get_bootstrap_ci
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.data_processing import get_data_version
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
+# Session State key of the age group bars brushed in the chart
+AGE_BRUSH_KEY = "age_brush"
 
-def render_age_analysis(df):
-    """Render age group analysis visualization"""
-    # Create time spent categories
-    df["TimeSpent"] = pd.cut(
-        df["Hours"],
+
+def _mark_age_brushed():
+    """Flag a new brush so the linked panels get refreshed"""
+    st.session_state["age_brushed"] = True
+
+
+def get_age_brush():
+    """Return the age groups brushed in the chart, or an empty tuple"""
+    event = st.session_state.get(AGE_BRUSH_KEY)
+    if not event:
+        return ()
+    return tuple(sorted({point["x"] for point in event["selection"]["points"]
+                         if "x" in point}))
+
+
+def brush_age_groups(crossfilter):
+    """Filter a crossfilter on the brushed age groups"""
+    brush = get_age_brush()
+    dimension = crossfilter.dimension("AgeGroup")
+    if brush:
+        dimension.filter_in(brush)
+    else:
+        dimension.filter_all()
+
+
+@keyed_lru_cache(maxsize=64)
+@persistent_cache
+def get_age_anxiety(_df, version):
+    """Mean anxiety per age group and weekly hours, with bootstrap intervals"""
+    # Create time spent categories next to the two columns used, leaving the
+    # shared frame untouched
+    df = _df[["AgeGroup", "GAD_T"]].assign(TimeSpent=pd.cut(
+        _df["Hours"],
         bins=[0, 5, 15, 25, float("inf")],
         labels=["0-5", "5-15", "15-25", "Over 25"]
-    )
+    ))
     # Group data and calculate anxiety score
     grouped = df.groupby(["AgeGroup", "TimeSpent"])[
         "GAD_T"].mean().reset_index()
+    # Attach bootstrap confidence intervals of the means
+    ci = get_bootstrap_ci(df, ("AgeGroup", "TimeSpent"), "GAD_T", version)
+    return grouped.join(ci[["count", "low", "high"]],
+                        on=["AgeGroup", "TimeSpent"])
+
+
+def prepare_age_analysis(df):
+    """Compute the age analysis data of a selection"""
+    return get_age_anxiety(df, get_data_version(df))
+
+
+@st.fragment
+@instrumented
+def render_age_analysis(df):
+    """
+    Render age group analysis visualization.
+
+    Runs as a fragment. Clicking or box-selecting bars brushes their age
+    groups for the linked panels (``get_age_brush``), and a change triggers
+    a full rerun so they pick it up.
+    """
+    grouped = prepare_age_analysis(df)
     # Create the figure
     fig = go.Figure()
     # Define colors for each time spent category
@@ -33,9 +90,19 @@ def render_age_analysis(df):
             marker_color=colors[time_spent],
             text=time_data["GAD_T"].round(1),
             textposition="outside",
+            error_y=dict(
+                type="data",
+                array=time_data["high"] - time_data["GAD_T"],
+                arrayminus=time_data["GAD_T"] - time_data["low"],
+                color="rgba(255, 255, 255, 0.5)",
+                thickness=1
+            ),
+            customdata=time_data[["low", "high", "count"]],
             hovertemplate="<b>Age Group:</b> %{x}<br>" +
                          "<b>Hours per Week:</b> " + time_spent + "<br>" +
-                         "<b>Average Anxiety Score:</b> %{y:.1f}<extra></extra>"
+                         "<b>Average Anxiety Score:</b> %{y:.1f}<br>" +
+                         "<b>95% CI:</b> %{customdata[0]:.1f} - %{customdata[1]:.1f}<br>" +
+                         "<b>Players:</b> %{customdata[2]}<extra></extra>"
         ))
     # Update layout
     fig.update_layout(
@@ -84,5 +151,11 @@ def render_age_analysis(df):
         paper_bgcolor='rgba(0,0,0,0)',
         margin=dict(t=100)
     )
-    # Display the chart in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    # Display the chart in Streamlit; selected bars brush the linked panels
+    plotly_chart(fig, use_container_width=True, key=AGE_BRUSH_KEY,
+                 on_select=_mark_age_brushed, selection_mode=("points", "box"))
+
+    # Linked panels live outside this fragment and only see the new brush
+    # on a full rerun
+    if st.session_state.pop("age_brushed", False):
+        st.rerun()
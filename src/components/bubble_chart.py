@@ -1,46 +1,178 @@
 import streamlit as st
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.data_processing import (get_country_names, get_data_version,
+                                   view_aggregate)
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
+# Hand-placed countries shown by default: code -> (label, x, y)
+FEATURED_COUNTRIES = {
+    "USA": ("U.S.A", -2.18, 47.5), "CAN": ("Canada", -1.7, 47),
+    "DEU": ("Germany", -1.5, 46), "NLD": ("Netherlands", -1.7, 45),
+    "GBR": ("U.K", -2, 46)
+}
+
+# Centre of the country cluster and spacing between auto-placed bubbles
+COUNTRY_CENTER = (-1.8, 46.5)
+COUNTRY_SPACING = 0.35
+
+
+@st.cache_data(max_entries=32)
+@persistent_cache
+def get_country_counts(_df, version):
+    """Return the player count of every country, largest first, ties by code"""
+    counts = view_aggregate(version, "country_counts")
+    if counts is not None:
+        return counts
+    counts = _df.groupby("Residence_ISO3").size().reset_index(name="count")
+    return counts.sort_values(
+        by="count", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def get_top_countries(df, version, top_n):
+    """Return the residence countries with the most players, largest first"""
+    return get_country_counts(df, version)["Residence_ISO3"].head(
+        top_n).tolist()
+
+
+@st.cache_data
+def get_country_layout(count):
+    """
+    Lay out bubble positions for a number of countries.
+
+    Positions follow a golden-angle spiral around the country cluster centre,
+    so the layout is deterministic and only depends on the country count.
+    The spiral grows to the left to keep clear of the anxiety bubbles.
+
+    Args:
+        count (int): Number of countries to place, largest first
+
+    Returns:
+        list: (x, y) coordinates, one per country
+    """
+    golden_angle = np.pi * (3 - np.sqrt(5))
+    theta = np.arange(count) * golden_angle
+    r = np.sqrt(np.arange(count) + 0.5) * COUNTRY_SPACING
+    radius = r.max()
+
+    x = COUNTRY_CENTER[0] - max(radius - 0.5, 0) + r * np.cos(theta)
+    y = COUNTRY_CENTER[1] + r * np.sin(theta)
+    return list(zip(x.tolist(), y.tolist()))
+
+
+def get_country_positions(df, top_n=None):
+    """Return code -> (label, x, y) for the featured or top-N countries"""
+    if not top_n:
+        return FEATURED_COUNTRIES
+
+    codes = get_top_countries(df, get_data_version(df), top_n)
+    country_names = get_country_names()
+    return {
+        code: (country_names.get(code, code), x, y)
+        for code, (x, y) in zip(codes, get_country_layout(len(codes)))
+    }
+
+
+@keyed_lru_cache(maxsize=64)
+@persistent_cache
+def get_relationship_counts(_df, version, codes):
+    """
+    Count players per anxiety group, country and age group.
+
+    Args:
+        _df (pd.DataFrame): Survey data (not hashed)
+        version (str): Dataset version the counts are cached under
+        codes (tuple): Residence countries drawn
+
+    Returns:
+        pd.DataFrame: Counts with the country and age group proportions
+    """
+    # Filter first so grouping only touches the displayed countries, taking
+    # only the columns used rather than copying every column of the selection
+    filtered_df = _df.loc[_df["Residence_ISO3"].isin(list(codes)),
+                          ["Residence_ISO3", "GAD_T", "Age"]]
 
-def render_relationship_analysis(df):
     # Define bins and groups
     anxiety_bins = [0, 3, 7, 11, 15, 21]
     anxiety_labels = ["0-3", "4-7", "8-11", "12-15", "16-21"]
-    df["Anxiety_Group"] = pd.cut(
-        df["GAD_T"], bins=anxiety_bins, labels=anxiety_labels, include_lowest=True)
+    anxiety_group = pd.cut(
+        filtered_df["GAD_T"], bins=anxiety_bins, labels=anxiety_labels,
+        include_lowest=True).rename("Anxiety_Group")
 
     age_bins = [18, 23, 28, 33, 38, 100]
     age_labels = ["18-22", "23-27", "28-32", "33-37", "38+"]
-    df["Age_Group"] = pd.cut(df["Age"].astype(
-        float), bins=age_bins, labels=age_labels, include_lowest=True)
+    age_group = pd.cut(filtered_df["Age"].astype(
+        float), bins=age_bins, labels=age_labels,
+        include_lowest=True).rename("Age_Group")
 
-    # Filter and group data
-    selected_countries = ["CAN", "USA", "DEU", "NLD", "GBR"]
-    filtered_df = df[df["Residence_ISO3"].isin(selected_countries)]
     grouped_data = filtered_df.groupby(
-        ["Anxiety_Group", "Residence_ISO3", "Age_Group"]).size().reset_index(name="Count")
+        [anxiety_group, filtered_df["Residence_ISO3"], age_group],
+        observed=False).size().reset_index(name="Count")
 
     # Calculate proportions
-    total_by_country = filtered_df.groupby("Residence_ISO3").size()
-    total_by_age = filtered_df.groupby("Age_Group").size()
-    grouped_data["Country_Proportion"] = grouped_data.apply(
-        lambda row: row["Count"] / total_by_country[row["Residence_ISO3"]], axis=1
-    )
-    grouped_data["Age_Proportion"] = grouped_data.apply(
-        lambda row: row["Count"] / total_by_age[row["Age_Group"]], axis=1
-    )
+    grouped_data["Country_Proportion"] = grouped_data["Count"] / grouped_data.groupby(
+        "Residence_ISO3")["Count"].transform("sum")
+    grouped_data["Age_Proportion"] = grouped_data["Count"] / grouped_data.groupby(
+        "Age_Group", observed=False)["Count"].transform("sum")
+    return grouped_data
+
+
+def get_selected_top_n():
+    """Return the country count chosen on the last run, None for featured"""
+    if st.session_state.get("bubble_country_mode", "Featured") == "Featured":
+        return None
+    return st.session_state.get("bubble_top_n", 10)
+
+
+def prepare_relationship_analysis(df, top_n=None):
+    """Place the featured or top-N countries and count their players"""
+    countries = get_country_positions(df, top_n)
+    return countries, get_relationship_counts(
+        df, get_data_version(df), tuple(countries))
+
+
+@st.fragment
+@instrumented
+def render_relationship_analysis(df):
+    # Choose between the featured countries and the most represented ones
+    mode_col, count_col = st.columns(2)
+    with mode_col:
+        country_mode = st.radio(
+            "Countries:",
+            ["Featured", "Top countries by players"],
+            horizontal=True,
+            key="bubble_country_mode"
+        )
+    top_n = None
+    if country_mode != "Featured":
+        # A narrow date range may leave fewer countries than the defaults
+        available = min(50, df["Residence_ISO3"].nunique())
+        with count_col:
+            if available < 2:
+                st.caption(f"{available} country in the selected data"
+                           if available == 1 else
+                           "No countries in the selected data")
+                top_n = available
+            else:
+                min_value = min(5, available - 1)
+                top_n = st.slider(
+                    "Number of countries:",
+                    min_value=min_value,
+                    max_value=available,
+                    value=min(10, available),
+                    key="bubble_top_n"
+                )
+    countries, grouped_data = prepare_relationship_analysis(df, top_n)
 
     # Mappings
-    country_full_names = {
-        "USA": "U.S.A", "CAN": "Canada", "DEU": "Germany",
-        "NLD": "Netherlands", "GBR": "U.K"
-    }
+    country_full_names = {code: label
+                          for code, (label, _, _) in countries.items()}
 
     country_coords = {
-        "U.S.A": {"x": -2.18, "y": 47.5}, "Canada": {"x": -1.7, "y": 47},
-        "Germany": {"x": -1.5, "y": 46}, "Netherlands": {"x": -1.7, "y": 45},
-        "U.K": {"x": -2, "y": 46}
+        label: {"x": x, "y": y} for label, x, y in countries.values()
     }
 
     anxiety_coords = {
@@ -60,16 +192,20 @@ def render_relationship_analysis(df):
             return {counts.index[0]: sizes[-1]}
         bins = pd.qcut(counts, min(5, len(counts)), duplicates='drop')
         size_map = {}
-        for i, (_, grp) in enumerate(counts.groupby(bins)):
+        for i, (_, grp) in enumerate(counts.groupby(bins, observed=False)):
             for idx in grp.index:
                 size_map[idx] = sizes[min(i, len(sizes)-1)]
         return size_map
 
+    # Shrink country bubbles as more of them share the cluster
+    country_scale = min(1, np.sqrt(len(FEATURED_COUNTRIES) / len(countries)))
     country_sizes = assign_sizes(
-        grouped_data.groupby("Residence_ISO3")["Count"].sum())
+        grouped_data.groupby("Residence_ISO3")["Count"].sum(),
+        sizes=[size * country_scale for size in [30, 50, 70, 90, 110]])
     anxiety_sizes = assign_sizes(
-        grouped_data.groupby("Anxiety_Group")["Count"].sum())
-    age_sizes = assign_sizes(grouped_data.groupby("Age_Group")["Count"].sum())
+        grouped_data.groupby("Anxiety_Group", observed=False)["Count"].sum())
+    age_sizes = assign_sizes(grouped_data.groupby(
+        "Age_Group", observed=False)["Count"].sum())
 
     # Visualization
     selected_anxiety = st.selectbox(
@@ -161,11 +297,17 @@ def render_relationship_analysis(df):
         margin=dict(l=50, r=50, t=100, b=50)
     )
 
-    fig.add_annotation(x=-2, y=49, text="Country",
+    country_label = (-2, 49)
+    if top_n:
+        xs = [x for _, x, _ in countries.values()]
+        ys = [y for _, _, y in countries.values()]
+        country_label = ((min(xs) + max(xs)) / 2, max(max(ys) + 0.8, 49))
+
+    fig.add_annotation(x=country_label[0], y=country_label[1], text="Country",
                        showarrow=False, font=dict(size=16))
     fig.add_annotation(x=0, y=46, text="Anxiety Score",
                        showarrow=False, font=dict(size=16))
     fig.add_annotation(x=2, y=52, text="Age",
                        showarrow=False, font=dict(size=16))
 
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
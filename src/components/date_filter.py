@@ -0,0 +1,41 @@
+import pandas as pd
+import streamlit as st
+
+from utils.data_processing import get_data_version
+from utils.instrumentation import instrumented
+from utils.partitions import get_time_partitions, select_dates
+
+
+@instrumented
+def render_date_filter(df):
+    """
+    Render a date range filter over the survey responses.
+
+    The range is resolved on the time partitions of the data, so only the
+    partitions at its ends are scanned and the view's aggregates are
+    combined from the partitions' pre-aggregates.
+
+    Returns:
+        pd.DataFrame: The responses in the selected range, or ``df`` itself
+        when the whole survey period is selected
+    """
+    partitions = get_time_partitions(df, get_data_version(df))
+    first = partitions.stats["Datetime_min"].min().date()
+    last = partitions.stats["Datetime_max"].max().date()
+
+    selected = st.date_input(
+        "Survey dates",
+        value=(first, last),
+        min_value=first,
+        max_value=last,
+        key="survey_dates"
+    )
+
+    # The range is incomplete while its end is being picked
+    if not isinstance(selected, tuple) or len(selected) != 2:
+        return df
+    start, end = selected
+    if (start, end) == (first, last):
+        return df
+    return select_dates(partitions, pd.Timestamp(start),
+                        pd.Timestamp(end) + pd.Timedelta(days=1))
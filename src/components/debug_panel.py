@@ -0,0 +1,122 @@
+import pandas as pd
+import streamlit as st
+
+from utils import memory
+from utils.cache import PERSISTENT_CACHE
+from utils.figures import FIGURE_STATS
+from utils.instrumentation import ENABLED, REGISTRY
+from utils.profiler import list_profiles
+
+# Query parameter value that shows the panel, e.g. ?debug=metrics
+DEBUG_PARAM = "metrics"
+
+
+@st.fragment(run_every=5)
+def render_debug_panel():
+    """Render the per-function timing, cache and payload metrics"""
+    with st.expander("Performance metrics", expanded=True):
+        if PERSISTENT_CACHE is not None:
+            render_persistent_cache()
+
+        if not ENABLED:
+            st.info("Instrumentation is disabled; restart the app with "
+                    "DASHBOARD_METRICS=1 to record metrics.")
+            return
+
+        summary = REGISTRY.summary()
+        if summary.empty:
+            st.caption("No instrumented calls recorded yet.")
+            return
+
+        summary["hit_rate"] *= 100
+        st.dataframe(
+            summary.set_index("function"),
+            use_container_width=True,
+            column_config={
+                "hit_rate": st.column_config.NumberColumn(format="%.0f%%"),
+                **{f"seconds_{q}": st.column_config.NumberColumn(format="%.4f")
+                   for q in ("p50", "p95", "p99")},
+            },
+        )
+        st.download_button("Download Prometheus metrics",
+                           REGISTRY.to_prometheus(), "metrics.prom",
+                           mime="text/plain")
+
+        figures = FIGURE_STATS.summary()
+        if figures["figures"]:
+            render_figure_stats(figures)
+
+        if memory.ENABLED:
+            render_memory_log()
+
+
+def render_persistent_cache():
+    """Render the counters of the persistent aggregate cache"""
+    info = PERSISTENT_CACHE.info()
+    lookups = info["hits"] + info["misses"]
+    hit_rate = info["hits"] / lookups * 100 if lookups else 0
+    size = ("size unavailable" if info["entries"] is None else
+            f"{info['entries']} entries, {info['bytes'] / 2**20:.1f} of "
+            f"{info['max_bytes'] / 2**20:.0f}MiB")
+    st.caption(
+        f"Persistent cache: {size}, "
+        f"{info['hits']} hits / {info['misses']} misses ({hit_rate:.0f}%), "
+        f"{info['writes']} writes, {info['evictions']} evictions, "
+        f"{info['errors']} errors")
+
+
+def render_figure_stats(figures):
+    """Render the bytes saved by compacting chart payloads"""
+    original, compact = figures["original_bytes"], figures["compact_bytes"]
+    st.caption(
+        f"Chart payloads: {figures['figures']} figures, "
+        f"{original / 2**20:.1f} → {compact / 2**20:.1f}MiB "
+        f"({(1 - compact / original) * 100:.0f}% saved by compaction)")
+
+
+def render_memory_log():
+    """Render the per-component allocations of recent reruns"""
+    log = memory.MEMORY_LOG.to_frame()
+    if log.empty:
+        return
+
+    st.markdown("**Memory per component call**")
+    # First calls on a frame also fill the caches of their helpers, so only
+    # warm calls are checked, by their median over the log
+    warm = log[log["warm"]]
+    ratios = (warm["peak_bytes"] / warm["frame_bytes"]).groupby(
+        warm["function"]).median()
+    copies = ratios[ratios >= memory.COPY_THRESHOLD]
+    if not copies.empty:
+        st.warning("Full-frame copies suspected in: " + ", ".join(copies.index))
+    log["time"] = pd.to_datetime(log["time"], unit="s")
+    for col in ("frame_bytes", "frame_deep_bytes", "peak_bytes",
+                "retained_bytes"):
+        log[col.replace("_bytes", "_mib")] = log.pop(col) / 2**20
+    log["top_allocations"] = log["top_allocations"].str.join("\n")
+    st.dataframe(log.iloc[::-1], use_container_width=True, hide_index=True,
+                 column_config={
+                     col: st.column_config.NumberColumn(format="%.1f")
+                     for col in ("frame_mib", "frame_deep_mib", "peak_mib",
+                                 "retained_mib")})
+
+
+def render_profile_list(limit=10):
+    """Render the most recent rerun profiles with download links"""
+    with st.expander("Recent profiles", expanded=True):
+        profiles = list_profiles(limit)
+        if not profiles:
+            st.caption("No profiles saved yet.")
+            return
+
+        st.caption("Open the files in https://www.speedscope.app")
+        for i, (path, metadata) in enumerate(profiles):
+            col1, col2 = st.columns([4, 1])
+            col1.markdown(
+                f"**{metadata.get('section', '?')}** · "
+                f"{metadata.get('created', '')} · "
+                f"{metadata.get('duration', 0):.2f}s, "
+                f"{metadata.get('samples', 0)} samples")
+            col2.download_button("Download", path.read_bytes(), path.name,
+                                 mime="application/json",
+                                 key=f"profile_download_{i}")
@@ -2,21 +2,59 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import streamlit as st
-from utils.data_processing import get_game_logo
+from utils.cache import persistent_cache
+from utils.data_processing import (get_data_version, get_game_logo,
+                                   view_aggregate)
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
 
+def _mark_game_changed():
+    """Flag a new game selection so the linked panels get refreshed"""
+    st.session_state["game_changed"] = True
+
+
+@st.cache_data(max_entries=32)
+@persistent_cache
+def get_game_counts(_df, version):
+    """Return the player count of every game, largest first, ties by name"""
+    game_stats = view_aggregate(version, "game_counts")
+    if game_stats is not None:
+        return game_stats
+    game_stats = _df.groupby("Game").size().reset_index(name="count")
+    return game_stats.sort_values(
+        by='count', ascending=False, kind="stable").reset_index(drop=True)
+
+
+def prepare_game_bubble_chart(df):
+    """Count the players of every game and load the logos drawn"""
+    game_stats = get_game_counts(df, get_data_version(df))
+    for game in game_stats["Game"]:
+        get_game_logo(game)
+    return game_stats
+
+
+@st.fragment
+@instrumented
 def render_game_bubble_chart(df):
-    """Render a bubble chart where the logos are ordered in decreasing order by count."""
-    # Group data by game and count the number of players
-    game_stats = df.groupby("Game").size().reset_index(name="count")
+    """
+    Render a bubble chart where the logos are ordered in decreasing order by count.
 
-    # Sort the games in decreasing order by count
-    game_stats = game_stats.sort_values(
-        by='count', ascending=False).reset_index(drop=True)
+    Runs as a fragment. The selected game is published in
+    ``st.session_state["selected_game"]`` for the linked sunburst and radar
+    panels, and a change triggers a full rerun so they pick it up.
+    """
+    # Count the players of every game, in decreasing order
+    game_stats = prepare_game_bubble_chart(df)
 
     # Create a dropdown for selecting a game
     game_options = ["All"] + game_stats["Game"].tolist()
-    selected_game = st.selectbox("Select a game to focus on:", game_options)
+    selected_game = st.selectbox(
+        "Select a game to focus on:",
+        game_options,
+        key="selected_game",
+        on_change=_mark_game_changed
+    )
 
     # Determine data to display and dynamically adjust sizes
     if selected_game == "All":
@@ -153,7 +191,7 @@ def render_game_bubble_chart(df):
     )
 
     # Display the chart
-    st.plotly_chart(
+    plotly_chart(
         fig,
         use_container_width=True,
         config={
@@ -162,4 +200,9 @@ def render_game_bubble_chart(df):
         }
     )
 
+    # Linked panels live outside this fragment and only see the new
+    # selection on a full rerun
+    if st.session_state.pop("game_changed", False):
+        st.rerun()
+
     return selected_game
@@ -1,22 +1,113 @@
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from utils.cache import persistent_cache
+from utils.data_processing import get_data_version, view_aggregate
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
-def normalize_score(series):
-    """Normalize scores to 0-100 scale"""
-    return ((series - series.min()) / (series.max() - series.min())) * 100
+# Columns the Player Type filters act on; each combination is one cell
+CELL_COLUMNS = ["Gender", "Work", "Degree", "Age"]
+SCORE_COLUMNS = ["GAD_T", "SPIN_T", "SWL_T"]
 
 
+def normalize_score(series, lo=None, hi=None):
+    """Normalize scores to 0-100 scale, optionally against fixed bounds"""
+    lo = series.min() if lo is None else lo
+    hi = series.max() if hi is None else hi
+    return ((series - lo) / (hi - lo)) * 100
+
+
+def summarize_cells(cells, bounds):
+    """Compute the Summary Statistics metrics from aggregated filter cells"""
+    count = cells["count"].sum()
+
+    def mean(total):
+        return total / count if count else float("nan")
+
+    stats = {
+        "Players": int(count),
+        "Age": mean((cells["Age"] * cells["count"]).sum()),
+        "Gaming Hours": mean(cells["Hours"].sum()),
+        "Non-Gameplay Gaming Hours": mean(cells["streams"].sum()),
+        "Employment": mean(cells["Employed"].sum()) * 100,
+    }
+    for col, name in [("GAD_T", "General Anxiety"),
+                      ("SPIN_T", "Social Anxiety"),
+                      ("SWL_T", "Life Satisfaction")]:
+        lo, hi = bounds[col]
+        stats[name] = (mean(cells[col].sum()) - lo) / (hi - lo) * 100
+    return stats
+
+
+@st.cache_resource(max_entries=32)
+@persistent_cache
+def get_life_quality_cube(_df, version):
+    """
+    Aggregate players into cells of the Player Type filters.
+
+    Computed once per dataset version, or combined from the partition sums
+    of a date range view. Every cell holds the player count, the sums
+    needed for the Summary Statistics and the score bounds, so filtered and
+    overall metrics are derived from cells instead of rows.
+
+    Args:
+        _df (pd.DataFrame): Full survey data (not hashed)
+        version (str): Dataset version the cube is cached under
+
+    Returns:
+        dict: ``cells`` frame, normalization ``bounds`` and the overall
+        ``full_stats``
+    """
+    cells = view_aggregate(version, "life_quality_cells")
+    if cells is None:
+        values = _df[["Hours", "streams", *SCORE_COLUMNS]].assign(
+            Employed=_df["Work"].eq("Employed"))
+        grouper = values.groupby([_df[col] for col in CELL_COLUMNS],
+                                 dropna=False)
+        cells = grouper.sum()
+        cells["count"] = grouper.size()
+        extrema = grouper[SCORE_COLUMNS].agg(["min", "max"])
+        for col, stat in extrema.columns:
+            cells[f"{col}_{stat}"] = extrema[(col, stat)]
+        cells = cells.reset_index()
+
+    bounds = {col: (cells[f"{col}_min"].min(), cells[f"{col}_max"].max())
+              for col in SCORE_COLUMNS}
+    return {
+        "cells": cells,
+        "bounds": bounds,
+        "full_stats": summarize_cells(cells, bounds),
+    }
+
+
+def select_cells(cells, gender, work, education, age_range):
+    """
+    Return a boolean mask of the cells, or rows, matching the Player Type
+    filters
+    """
+    mask = cells["Age"].between(*age_range)
+    if gender != "All":
+        mask &= cells["Gender"] == gender
+    if education != "All":
+        if education == "Other":
+            mask &= cells["Degree"].isna()
+        else:
+            mask &= cells["Degree"] == education
+    if work != "All":
+        mask &= cells["Work"] == work
+    return mask.to_numpy()
+
+
+@st.fragment
+@instrumented
 def render_life_quality_analysis(df):
     """Render the Quality of Life analysis page with interactive controls and visualizations"""
 
-    # Normalize scores first
-    df['GAD_T_norm'] = normalize_score(df['GAD_T'])
-    df['SPIN_T_norm'] = normalize_score(df['SPIN_T'])
-    df['SWL_T_norm'] = normalize_score(df['SWL_T'])
+    # Global baselines and filter cells, cached per dataset version
+    cube = get_life_quality_cube(df, get_data_version(df))
 
     # Create two columns for the top section
     top_left, top_right = st.columns([1, 2])
@@ -57,22 +148,18 @@ def render_life_quality_analysis(df):
             value=(18, 56)
         )
 
-    # Filter data based on selections
-    filtered_df = df.copy()
-    if gender != "All":
-        filtered_df = filtered_df[filtered_df["Gender"] == gender]
-    if education != "All":
-        if education == "Other":
-            filtered_df = filtered_df[df["Degree"].isna()]
-        else:
-            filtered_df = filtered_df[filtered_df["Degree"] == education]
-    if work != "All":
-        filtered_df = filtered_df[filtered_df["Work"] == work]
-
-    filtered_df = filtered_df[
-        (filtered_df["Age"] >= age_range[0]) &
-        (filtered_df["Age"] <= age_range[1])
-    ]
+    # Filter data based on selections, resolved on cells and only matched
+    # against the rows when it leaves some out
+    cell_mask = select_cells(cube["cells"], gender, work, education, age_range)
+    filtered_df = df if cell_mask.all() else df.loc[
+        select_cells(df, gender, work, education, age_range),
+        ["Hours", "streams", *SCORE_COLUMNS]]
+
+    # Normalize scores against the full-dataset bounds
+    norm_scores = {
+        f"{col}_norm": normalize_score(filtered_df[col], *cube["bounds"][col])
+        for col in SCORE_COLUMNS
+    }
 
     # Top Right Column - Scatter Plot
     with top_right:
@@ -113,7 +200,7 @@ def render_life_quality_analysis(df):
         fig_scatter.add_trace(
             go.Scatter(
                 x=filtered_df[time_col],
-                y=filtered_df[score_col],
+                y=norm_scores[score_col],
                 mode='markers',
                 marker=dict(
                     color=color,
@@ -123,20 +210,21 @@ def render_life_quality_analysis(df):
             )
         )
 
-        # Add trend line
-        z = np.polyfit(filtered_df[time_col], filtered_df[score_col], 1)
-        p = np.poly1d(z)
-        x_trend = np.linspace(
-            filtered_df[time_col].min(), filtered_df[time_col].max(), 100)
-        fig_scatter.add_trace(
-            go.Scatter(
-                x=x_trend,
-                y=p(x_trend),
-                mode='lines',
-                line=dict(color='#FFD700', width=2),  # Gold color
-                name='Trend'
+        # Add trend line, when the filters leave enough respondents to fit one
+        if filtered_df[time_col].nunique() > 1:
+            z = np.polyfit(filtered_df[time_col], norm_scores[score_col], 1)
+            p = np.poly1d(z)
+            x_trend = np.linspace(
+                filtered_df[time_col].min(), filtered_df[time_col].max(), 100)
+            fig_scatter.add_trace(
+                go.Scatter(
+                    x=x_trend,
+                    y=p(x_trend),
+                    mode='lines',
+                    line=dict(color='#FFD700', width=2),  # Gold color
+                    name='Trend'
+                )
             )
-        )
 
         fig_scatter.update_layout(
             title='Quality of Life Analysis (Normalized Scores)',
@@ -146,7 +234,7 @@ def render_life_quality_analysis(df):
             showlegend=False
         )
 
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        plotly_chart(fig_scatter, use_container_width=True)
 
     # Create two columns for the middle section
     middle_left, middle_right = st.columns([1, 1])
@@ -166,7 +254,7 @@ def render_life_quality_analysis(df):
         for col, (name, color) in score_columns.items():
             fig_dist.add_trace(
                 go.Histogram(
-                    x=filtered_df[col],
+                    x=norm_scores[col],
                     name=name,
                     nbinsx=30,
                     histnorm='percent',
@@ -187,15 +275,15 @@ def render_life_quality_analysis(df):
             bargap=0.1
         )
 
-        st.plotly_chart(fig_dist, use_container_width=True)
+        plotly_chart(fig_dist, use_container_width=True)
 
     # Middle Right - Average Scores
     with middle_right:
         # Average scores bar chart
         avg_scores = {
-            'General Anxiety': filtered_df['GAD_T_norm'].mean(),
-            'Social Anxiety': filtered_df['SPIN_T_norm'].mean(),
-            'Life Satisfaction': filtered_df['SWL_T_norm'].mean()
+            'General Anxiety': norm_scores['GAD_T_norm'].mean(),
+            'Social Anxiety': norm_scores['SPIN_T_norm'].mean(),
+            'Life Satisfaction': norm_scores['SWL_T_norm'].mean()
         }
 
         fig_bar = go.Figure(data=[
@@ -218,40 +306,16 @@ def render_life_quality_analysis(df):
             yaxis=dict(range=[0, 100])
         )
 
-        st.plotly_chart(fig_bar, use_container_width=True)
+        plotly_chart(fig_bar, use_container_width=True)
 
     # Bottom Section - Summary Statistics with Deltas
     st.markdown("### Summary Statistics")
     if gender != "All" or education != "All" or work != "All" or age_range != (18, 80):
         st.caption("↑↓ shows the difference from overall average")
 
-    # Calculate employment percentage
-    def get_employment_percentage(data):
-        return (data['Work'] == 'Employed').mean() * 100
-
-    # Calculate full dataset statistics (before filtering)
-    full_stats = {
-        "Players": len(df),
-        "Age": df['Age'].mean(),
-        "Gaming Hours": df['Hours'].mean(),
-        "Non-Gameplay Gaming Hours": df['streams'].mean(),
-        "General Anxiety": df['GAD_T_norm'].mean(),
-        "Social Anxiety": df['SPIN_T_norm'].mean(),
-        "Life Satisfaction": df['SWL_T_norm'].mean(),
-        "Employment": get_employment_percentage(df)
-    }
-
-    # Calculate filtered dataset statistics
-    filtered_stats = {
-        "Players": len(filtered_df),
-        "Age": filtered_df['Age'].mean(),
-        "Gaming Hours": filtered_df['Hours'].mean(),
-        "Non-Gameplay Gaming Hours": filtered_df['streams'].mean(),
-        "General Anxiety": filtered_df['GAD_T_norm'].mean(),
-        "Social Anxiety": filtered_df['SPIN_T_norm'].mean(),
-        "Life Satisfaction": filtered_df['SWL_T_norm'].mean(),
-        "Employment": get_employment_percentage(filtered_df)
-    }
+    # Overall and filtered statistics both come from the cached cells
+    full_stats = cube["full_stats"]
+    filtered_stats = summarize_cells(cube["cells"][cell_mask], cube["bounds"])
 
     # Check if any filter is applied
     is_filtered = (gender != "All" or education != "All" or
@@ -2,6 +2,10 @@ import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
 import streamlit as st
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.data_processing import get_data_version
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
 
 def categorize_earnings(value):
@@ -58,8 +62,54 @@ def get_marker_symbol(status):
     return symbols.get(status, 'circle')
 
 
-def render_motivation_analysis(df):
-    """Render the motivation analysis visualization"""
+def get_motivation_keys(df):
+    """Return the earnings category, work status and anxiety level of rows"""
+    # Categorize only the columns used, without copying the shared frame;
+    # each distinct answer is categorized once
+    return pd.DataFrame({
+        'earnings': df['earnings'].map(
+            {value: categorize_earnings(value)
+             for value in df['earnings'].unique()}),
+        'Work': df['Work'],
+        'anxiety_level': df['GAD_T'].map(
+            {score: categorize_anxiety(score)
+             for score in df['GAD_T'].unique()}),
+    })
+
+
+@keyed_lru_cache(maxsize=64)
+@persistent_cache
+def get_motivation_counts(_df, version):
+    """Count players per earnings category, work status and anxiety level"""
+    return (
+        get_motivation_keys(_df)
+        .groupby(['earnings', 'Work', 'anxiety_level'])
+        .size()
+        .reset_index(name='count')
+    )
+
+
+def get_brushed_motivation_counts(crossfilter):
+    """Count the players passing every filter of a crossfilter"""
+    return crossfilter.group(
+        "player_motivation", get_motivation_keys).all()
+
+
+def prepare_motivation_analysis(df):
+    """Compute the motivation counts of a selection"""
+    return get_motivation_counts(df, get_data_version(df))
+
+
+@st.fragment
+@instrumented
+def render_motivation_analysis(df, crossfilter=None):
+    """
+    Render the motivation analysis visualization.
+
+    With a crossfilter, players are counted from the rows passing its
+    filters (the country and the brushes of the linked panels) instead of
+    the rows of ``df``.
+    """
     # Create filters in columns
     col1, col2 = st.columns(2)
 
@@ -88,15 +138,14 @@ def render_motivation_analysis(df):
         selected_anxiety_values = [anxiety_options[level]
                                    for level in selected_anxiety]
 
-    # Create a copy and categorize data
-    df = df.copy()
-    df['earnings'] = df['earnings'].apply(categorize_earnings)
-    df['anxiety_level'] = df['GAD_T'].apply(categorize_anxiety)
-
-    # Apply filters
-    df_filtered = df[
-        (df['Work'].isin(selected_employment)) &
-        (df['anxiety_level'].isin(selected_anxiety_values))
+    # Select the counts of the chosen groups
+    if crossfilter is None:
+        counts = prepare_motivation_analysis(df)
+    else:
+        counts = get_brushed_motivation_counts(crossfilter)
+    motivation_data = counts[
+        (counts['Work'].isin(selected_employment)) &
+        (counts['anxiety_level'].isin(selected_anxiety_values))
     ]
 
     # Define all possible categories
@@ -107,13 +156,6 @@ def render_motivation_analysis(df):
         "Other"
     ]
 
-    # Get the counts for each combination
-    motivation_data = (
-        df_filtered.groupby(['earnings', 'Work', 'anxiety_level'])
-        .size()
-        .reset_index(name='count')
-    )
-
     # Create figure
     fig = go.Figure()
 
@@ -278,4 +320,4 @@ def render_motivation_analysis(df):
     )
 
     # Display the chart
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
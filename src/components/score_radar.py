@@ -2,56 +2,235 @@ import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from utils.bootstrap import get_bootstrap_ci
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.crossfilter import summarize
+from utils.data_processing import (derive_version, get_data_version,
+                                   view_aggregate)
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
 
-def group_playstyles(playstyle):
-    if "Singleplayer" in playstyle:
-        return "Single Player"
-    elif "Multiplayer - offline" in playstyle:
-        return "Multiplayer - offline (same room)"
-    elif "Multiplayer - online - with strangers" in playstyle:
-        return "Multiplayer - online (with strangers)"
-    elif "Multiplayer - online - with online acquaintances" in playstyle:
-        return "Multiplayer - online (with online acquaintances/teammates)"
-    elif "Multiplayer - online - with real life friends" in playstyle:
-        return "Multiplayer - online (with real-life friends)"
-    else:
-        return "Others"
+RADAR_COLUMNS = ["SPIN_T", "SWL_T", "Narcissism", "GAD_T"]
 
+# Radar axes and the score column each one is derived from
+SCORES = {
+    "Social Anxiety Score": "SPIN_T",
+    "Life Satisfaction": "SWL_T",
+    "Narcissism": "Narcissism",
+    "Anxiety Score": "GAD_T",
+}
 
-def normalize_column(column):
-    return (column - column.min()) / (column.max() - column.min()) * 100
 
+@st.cache_resource(max_entries=32)
+@persistent_cache
+def get_radar_aggregates(_df, version):
+    """
+    Aggregate the radar scores per (Game, Grouped_Playstyle).
 
-def invert_column(column):
-    return 100 - normalize_column(column)
+    Computed once per dataset version, or combined from the partition sums
+    of a date range view. Holds the count, sum, min and max of every score
+    column, plus the label of the row where each pair first appears so
+    playstyles keep their order of appearance in the data.
 
+    Args:
+        _df (pd.DataFrame): Full survey data (not hashed)
+        version (str): Dataset version the table is cached under
 
-def render_score_radar(df, game=None):
+    Returns:
+        pd.DataFrame: One row per (Game, Grouped_Playstyle)
+    """
+    aggregates = view_aggregate(version, "radar_aggregates")
+    if aggregates is not None:
+        return aggregates
+    grouped = _df[RADAR_COLUMNS].assign(first_row=_df.index).groupby(
+        [_df["Game"], _df["Grouped_Playstyle"]], sort=False)
+
+    aggregates = grouped[RADAR_COLUMNS].agg(["count", "sum", "min", "max"])
+    aggregates.columns = [f"{col}_{stat}" for col, stat in aggregates.columns]
+    aggregates["first_row"] = grouped["first_row"].min()
+    return aggregates.reset_index()
+
+
+def select_game(aggregates, game):
+    """Return the aggregate rows for a game, or all rows for "All" """
     if game and game != "All":
-        df = df[df["Game"] == game]
+        return aggregates[aggregates["Game"] == game]
+    return aggregates
 
-    df['Grouped_Playstyle'] = df['Playstyle'].apply(group_playstyles)
-    unique_playstyles = list(df['Grouped_Playstyle'].unique())
-    selected_playstyles = st.multiselect(
-        "Select Playstyles", unique_playstyles, default=unique_playstyles)
 
-    df = df[df["Grouped_Playstyle"].isin(selected_playstyles)]
+def get_playstyle_options(aggregates, game):
+    """List the playstyles of a game in order of first appearance"""
+    first_rows = select_game(aggregates, game).groupby(
+        "Grouped_Playstyle")["first_row"].min()
+    return first_rows.sort_values().index.tolist()
+
+
+def select_playstyles(aggregates, game, playstyles):
+    """Return the aggregate rows of the selected game and playstyles"""
+    rows = select_game(aggregates, game)
+    return rows[rows["Grouped_Playstyle"].isin(playstyles)]
+
+
+def get_radar_bounds(rows):
+    """Return the (min, max) of every score column over aggregate rows"""
+    return {col: (rows[f"{col}_min"].min(), rows[f"{col}_max"].max())
+            for col in SCORES.values()}
+
+
+@keyed_lru_cache(maxsize=256)
+def get_radar_scores(_aggregates, game, playstyles, version):
+    """
+    Compute the radar values of each selected playstyle from aggregates.
+
+    Scores are min/max normalized to 0-100 over the selected rows, with life
+    satisfaction inverted, without touching the underlying survey rows.
+
+    Args:
+        _aggregates (pd.DataFrame): Output of ``get_radar_aggregates``
+        game (str): Selected game or "All"
+        playstyles (frozenset): Selected playstyle groups
+        version (str): Dataset version the aggregates belong to
+
+    Returns:
+        pd.DataFrame: Mean normalized scores indexed by playstyle
+    """
+    rows = select_playstyles(_aggregates, game, playstyles)
+    bounds = get_radar_bounds(rows)
+    by_playstyle = rows.groupby("Grouped_Playstyle")
+
+    scores = pd.DataFrame(index=by_playstyle.size().index)
+    for score, col in SCORES.items():
+        lo, hi = bounds[col]
+        mean = (by_playstyle[f"{col}_sum"].sum()
+                / by_playstyle[f"{col}_count"].sum())
+        scores[score] = (mean - lo) / (hi - lo) * 100
+
+    scores["Life Satisfaction"] = 100 - scores["Life Satisfaction"]
+    return scores
+
+
+def get_brushed_radar(crossfilter, aggregates):
+    """
+    Aggregate the radar scores of the rows passing a crossfilter.
+
+    Counts and sums come from the crossfilter's group; the score bounds and
+    playstyle order stay those of all rows, as extremes cannot be
+    maintained while rows leave the filter.
+
+    Returns:
+        tuple: Aggregates shaped like ``get_radar_aggregates``, of the pairs
+        with rows, and the group's reductions
+    """
+    reductions = crossfilter.group(
+        "score_radar", ("Game", "Grouped_Playstyle"), RADAR_COLUMNS).all()
+    keys = ["Game", "Grouped_Playstyle"]
+    sums = [f"{col}_{stat}" for col in RADAR_COLUMNS
+            for stat in ["count", "sum"]]
+    brushed = aggregates.drop(columns=sums).merge(
+        reductions[keys + sums], on=keys)
+    return brushed[aggregates.columns], reductions
 
-    scores = [
-        "Social Anxiety Score",
-        "Life Satisfaction",
-        "Narcissism",
-        "Anxiety Score",
-    ]
 
-    df['Social Anxiety Score'] = df['SPIN_T']
-    df['Life Satisfaction'] = invert_column(df['SWL_T'])
-    df['Anxiety Score'] = df['GAD_T']
+def get_normal_intervals(reductions, game, col):
+    """Normal 95% intervals of a score per playstyle, from group reductions"""
+    sums = select_game(reductions, game).groupby("Grouped_Playstyle")[
+        [f"{col}_count", f"{col}_sum", f"{col}_sumsq"]].sum()
+    ci = summarize(sums, [col])
+    return ci.rename(columns={f"{col}_low": "low", f"{col}_high": "high"})
 
-    for score in ["Social Anxiety Score", "Narcissism", "Anxiety Score"]:
-        df[score] = normalize_column(df[score])
 
-    grouped = df.groupby('Grouped_Playstyle')[scores].mean()
+def get_interval_grouping(game):
+    """Return the columns the radar intervals of a game are computed over"""
+    if game and game != "All":
+        return ("Game", "Grouped_Playstyle")
+    return ("Grouped_Playstyle",)
+
+
+def get_radar_intervals(df, aggregates, game, playstyles, version,
+                        reductions=None):
+    """
+    Bootstrap confidence intervals of the radar values.
+
+    Intervals are computed on the raw scores per (Game, Grouped_Playstyle),
+    or per playstyle across all games, and mapped onto the radar's 0-100
+    scale with the same bounds as the means. Given a crossfilter group's
+    reductions, normal intervals of its rows are used instead.
+
+    Args:
+        df (pd.DataFrame): Full survey data
+        aggregates (pd.DataFrame): Output of ``get_radar_aggregates``
+        game (str): Selected game or "All"
+        playstyles (frozenset): Selected playstyle groups
+        version (str): Dataset version of ``df``
+        reductions (pd.DataFrame): Output of ``get_brushed_radar``
+
+    Returns:
+        tuple: Lower and upper bound frames, indexed by playstyle
+    """
+    bounds = get_radar_bounds(select_playstyles(aggregates, game, playstyles))
+    by_game = bool(game and game != "All")
+    by = get_interval_grouping(game)
+
+    low, high = pd.DataFrame(), pd.DataFrame()
+    for score, col in SCORES.items():
+        if reductions is None:
+            ci = get_bootstrap_ci(df, by, col, version)
+            # Playstyles without values of a score have no interval
+            ci = (ci.loc[game] if by_game else ci).reindex(sorted(playstyles))
+        else:
+            ci = get_normal_intervals(reductions, game, col).reindex(
+                sorted(playstyles))
+        lo, hi = bounds[col]
+        low[score] = (ci["low"] - lo) / (hi - lo) * 100
+        high[score] = (ci["high"] - lo) / (hi - lo) * 100
+
+    low["Life Satisfaction"], high["Life Satisfaction"] = (
+        100 - high["Life Satisfaction"], 100 - low["Life Satisfaction"])
+    return low, high
+
+
+def prepare_score_radar(df, game=None):
+    """
+    Aggregate the radar scores and bootstrap their intervals.
+
+    The intervals do not depend on the selected playstyles, so they are
+    computed for all of them and cached per grouping and version.
+
+    Returns:
+        pd.DataFrame: Output of ``get_radar_aggregates``
+    """
+    version = get_data_version(df)
+    for col in SCORES.values():
+        get_bootstrap_ci(df, get_interval_grouping(game), col, version)
+    return get_radar_aggregates(df, version)
+
+
+@st.fragment
+@instrumented
+def render_score_radar(df, game=None, crossfilter=None, brush=()):
+    """
+    Render the radar of mean scores per playstyle.
+
+    With a crossfilter, the scores are those of the rows passing its
+    filters; ``brush`` identifies them in the caches.
+    """
+    version = get_data_version(df)
+    aggregates = prepare_score_radar(df, game)
+    reductions = None
+    if crossfilter is not None:
+        aggregates, reductions = get_brushed_radar(crossfilter, aggregates)
+        version = derive_version(version, ("brush", brush))
+
+    unique_playstyles = get_playstyle_options(aggregates, game)
+    selected_playstyles = st.multiselect(
+        "Select Playstyles", unique_playstyles, default=unique_playstyles)
+
+    scores = list(SCORES)
+    grouped = get_radar_scores(
+        aggregates, game, frozenset(selected_playstyles), version)
+    low, high = get_radar_intervals(
+        df, aggregates, game, frozenset(selected_playstyles), version,
+        reductions)
 
     fig = go.Figure()
 
@@ -62,8 +241,10 @@ def render_score_radar(df, game=None):
                 theta=scores,
                 name=playstyle,
                 fill="toself",
+                customdata=list(zip(low.loc[playstyle], high.loc[playstyle])),
                 hovertemplate="<b>%{theta}</b><br>" +
                 "<b>Value</b>: %{r:.1f}<br>" +
+                "<b>95% CI</b>: %{customdata[0]:.1f} - %{customdata[1]:.1f}<br>" +
                 "<b>Playstyle</b>: " + playstyle + "<extra></extra>"
             )
         )
@@ -94,4 +275,4 @@ def render_score_radar(df, game=None):
         )
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import plotly.colors
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.cache import persistent_cache
+from utils.data_processing import get_data_version
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
+
+# Plotted columns and their labels
+TREND_COLUMNS = {
+    "GAD_T": "General Anxiety",
+    "SWL_T": "Life Satisfaction",
+    "SPIN_T": "Social Anxiety",
+    "Hours": "Gaming Hours",
+}
+# Bucket sizes and the default rolling window of each, in buckets
+BUCKETS = {
+    "Hour": (pd.Timedelta(hours=1), 24),
+    "Day": (pd.Timedelta(days=1), 7),
+}
+BREAKDOWNS = ["None", "Platform", "Game"]
+# Groups drawn in a breakdown; the less common ones are combined as "Other"
+MAX_GROUPS = 6
+# Normal quantile of the two-sided 95% band around the rolling means
+BAND_Z = 1.96
+# Relative rounding error of the running sums of squares
+SUMSQ_NOISE = 64 * np.finfo(float).eps
+
+
+@st.cache_data(max_entries=16)
+@persistent_cache
+def get_score_buckets(_df, version, bucket, by=None):
+    """
+    Aggregate the trend columns into time buckets of ``Datetime``.
+
+    Computed once per dataset version, bucket size and breakdown. Every
+    bucket from the first to the last response is kept, empty or not, and
+    the count, sum and sum of squares of each column are stored as
+    cumulative sums over the buckets, so the total of any run of buckets
+    is the difference of two entries. Values are shifted by the column mean
+    before they are summed, which keeps the sums of squares small.
+
+    Args:
+        _df (pd.DataFrame): Survey data (not hashed)
+        version (str): Dataset version the buckets are cached under
+        bucket (str): Key of ``BUCKETS``
+        by (str): Column to break the buckets down by, or None
+
+    Returns:
+        dict: Bucket ``times``, ``groups``, column ``shift`` and the
+        cumulative ``count``, ``sum`` and ``sumsq`` arrays shaped
+        (groups, buckets + 1, columns)
+    """
+    step, _ = BUCKETS[bucket]
+    dates = _df["Datetime"]
+    valid = dates.notna().to_numpy()
+    stamps = dates[valid].dt.floor(step)
+    if stamps.empty:
+        times = pd.DatetimeIndex([])
+        positions = np.empty(0, dtype=np.intp)
+    else:
+        times = pd.date_range(stamps.min(), stamps.max(), freq=step)
+        positions = ((stamps - times[0]) // step).to_numpy()
+
+    if by is None:
+        groups = ["All"]
+        codes = np.zeros(len(positions), dtype=np.intp)
+    else:
+        keys = _df.loc[valid, by].fillna("Other").astype(str)
+        groups = [key for key in keys.value_counts().index
+                  if key != "Other"][:MAX_GROUPS]
+        named = keys.isin(groups)
+        if not named.all():
+            keys = keys.where(named, "Other")
+            groups.append("Other")
+        codes = pd.Categorical(keys, categories=groups).codes.astype(np.intp)
+
+    values = _df.loc[valid, list(TREND_COLUMNS)].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    shift = np.nanmean(values, axis=0) if len(values) else np.zeros(
+        len(TREND_COLUMNS))
+    shifted = np.where(present, values - shift, 0.0)
+
+    cells = len(groups) * len(times)
+    flat = codes * len(times) + positions
+    totals = {}
+    for name, weights in [("count", present), ("sum", shifted),
+                          ("sumsq", shifted ** 2)]:
+        sums = np.stack([np.bincount(flat, weights[:, i], minlength=cells)
+                         for i in range(len(TREND_COLUMNS))], axis=-1)
+        sums = sums.reshape(len(groups), len(times), len(TREND_COLUMNS))
+        totals[name] = np.concatenate(
+            [np.zeros((len(groups), 1, len(TREND_COLUMNS))),
+             np.cumsum(sums, axis=1)], axis=1)
+
+    return {"times": times, "groups": groups, "shift": shift, **totals}
+
+
+def rolling_scores(buckets, window):
+    """
+    Derive the rolling means of the buckets by differencing their cumsums.
+
+    Each bucket's window holds it and the ``window - 1`` buckets before it,
+    so any window size takes one pass over the buckets.
+
+    Args:
+        buckets (dict): Result of ``get_score_buckets``
+        window (int): Buckets per window
+
+    Returns:
+        dict: ``mean``, ``low`` and ``high`` bounds of the 95% band and
+        ``count`` of the windows, shaped (groups, buckets, columns); NaN
+        where a window has too few values
+    """
+    ends = np.arange(1, len(buckets["times"]) + 1)
+    starts = np.maximum(ends - window, 0)
+
+    def windowed(name):
+        cumulative = buckets[name]
+        return cumulative[:, ends] - cumulative[:, starts]
+
+    count, total, squares = windowed("count"), windowed("sum"), windowed("sumsq")
+    # A difference of running totals is only exact to the rounding error of
+    # the totals, so squared deviations below it are those of equal values
+    noise = SUMSQ_NOISE * buckets["sumsq"][:, ends]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        deviations = squares - total * mean
+        deviations = np.where(deviations > noise, deviations, 0.0)
+        variance = deviations / (count - 1)
+        margin = BAND_Z * np.sqrt(variance / count)
+    mean = np.where(count > 0, mean, np.nan)
+    margin = np.where(count > 1, margin, np.nan)
+    mean += buckets["shift"]
+    return {"mean": mean, "low": mean - margin, "high": mean + margin,
+            "count": count}
+
+
+def prepare_score_trends(df, bucket, breakdown):
+    """Build the score buckets the trend chart is drawn from"""
+    by = None if breakdown == "None" else breakdown
+    return get_score_buckets(df, get_data_version(df), bucket, by)
+
+
+@st.fragment
+@instrumented
+def render_score_trends(df):
+    """Render the rolling means of the scores over the survey period"""
+    st.markdown("### Scores over Time")
+
+    controls = st.columns(3)
+    with controls[0]:
+        bucket = st.radio("Bucket:", list(BUCKETS), horizontal=True)
+    with controls[1]:
+        breakdown = st.radio("Break down by:", BREAKDOWNS, horizontal=True)
+    with controls[2]:
+        score = st.radio("Score:", list(TREND_COLUMNS.values()),
+                         horizontal=True)
+
+    buckets = prepare_score_trends(df, bucket, breakdown)
+    times = buckets["times"]
+    if len(times) == 0:
+        st.info("No responses with a date in this selection.")
+        return
+
+    _, default_window = BUCKETS[bucket]
+    window = st.slider(
+        f"Rolling window ({bucket.lower()}s):",
+        min_value=1,
+        max_value=max(len(times), 2),
+        value=min(default_window, len(times))
+    )
+
+    rolling = rolling_scores(buckets, window)
+    column = list(TREND_COLUMNS.values()).index(score)
+    colors = plotly.colors.qualitative.Plotly
+
+    fig = go.Figure()
+    for i, group in enumerate(buckets["groups"]):
+        color = colors[i % len(colors)]
+        mean = rolling["mean"][i, :, column]
+        low, high = rolling["low"][i, :, column], rolling["high"][i, :, column]
+
+        # The band is a closed shape along the upper then the lower bound
+        band = ~np.isnan(low)
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([times[band], times[band][::-1]]),
+            y=np.concatenate([high[band], low[band][::-1]]),
+            fill="toself",
+            fillcolor=color,
+            opacity=0.2,
+            line=dict(width=0),
+            hoverinfo="skip",
+            showlegend=False,
+            legendgroup=group
+        ))
+        fig.add_trace(go.Scatter(
+            x=times,
+            y=mean,
+            mode="lines",
+            line=dict(color=color, width=2),
+            name=group,
+            legendgroup=group,
+            customdata=rolling["count"][i, :, column],
+            hovertemplate=f"<b>{group}</b><br>%{{x}}<br>"
+                          f"{score}: %{{y:.1f}}<br>"
+                          "Responses: %{customdata:,.0f}<extra></extra>"
+        ))
+
+    fig.update_layout(
+        title=f"{score}, rolling mean over {window} {bucket.lower()}(s)",
+        xaxis_title="Response time",
+        yaxis_title=score,
+        height=450,
+        showlegend=breakdown != "None"
+    )
+    plotly_chart(fig, use_container_width=True)
+    st.caption("Shaded bands show the 95% confidence interval of each "
+               "rolling mean.")
@@ -1,35 +1,141 @@
-import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
-from streamlit.components.v1 import html
-
-
-def group_playstyles(playstyle):
-    if "Singleplayer" in playstyle:
-        return "Single Player"
-    elif "Multiplayer - offline" in playstyle:
-        return "Multiplayer - offline (same room)"
-    elif "Multiplayer - online - with strangers" in playstyle:
-        return "Multiplayer - online (with strangers)"
-    elif "Multiplayer - online - with online acquaintances" in playstyle:
-        return "Multiplayer - online (with online acquaintances/teammates)"
-    elif "Multiplayer - online - with real life friends" in playstyle:
-        return "Multiplayer - online (with real-life friends)"
-    else:
-        return "Others"
-
 
-def categorize_anxiety(score):
-    if score <= 7:
-        return "Low Anxiety"
-    elif score <= 14:
-        return "Moderate Anxiety"
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.data_processing import (categorize_anxiety, get_data_version,
+                                   view_aggregate)
+from utils.figures import plotly_chart
+from utils.instrumentation import instrumented
+
+# Hierarchy levels, outermost first; Game is filtered on rather than drawn
+SUNBURST_LEVELS = ("Game", "Grouped_Playstyle", "Anxiety_Level")
+# Session State key prefix of the wedges brushed for a game
+PLAYSTYLE_BRUSH_KEY = "playstyle_brush"
+
+# Define custom colors for playstyles
+PLAYSTYLE_COLORS = {
+    "Single Player": '#6ee7b7',  # Light blue
+    "Multiplayer - offline (same room)": '#60a5fa',  # Blue
+    # Dark blue
+    "Multiplayer - online (with online acquaintances/teammates)": '#2563eb',
+    "Multiplayer - online (with real-life friends)": '#fca5a5',  # Red
+    "Multiplayer - online (with strangers)": '#ef4444',  # Dark red
+    "Others": '#10b981'  # Green
+}
+
+
+def get_sunburst_paths(df, levels=SUNBURST_LEVELS):
+    """Return the id of the sunburst leaf of every row"""
+    columns = [categorize_anxiety(df["GAD_T"]) if level == "Anxiety_Level"
+               else df[level].astype(str) for level in levels[1:]]
+    return columns[0].str.cat(columns[1:], sep="/")
+
+
+def _mark_playstyle_brushed():
+    """Flag a new brush so the linked panels get refreshed"""
+    st.session_state["playstyle_brushed"] = True
+
+
+def get_playstyle_brush(game):
+    """Return the ids of the wedges brushed for a game, or an empty tuple"""
+    return tuple(sorted(st.session_state.get(f"{PLAYSTYLE_BRUSH_KEY}_{game}")
+                        or ()))
+
+
+def brush_playstyles(crossfilter, game):
+    """Filter a crossfilter on the rows under the brushed wedges of a game"""
+    brush = get_playstyle_brush(game)
+    dimension = crossfilter.dimension("sunburst_path",
+                                      values=get_sunburst_paths)
+    if brush:
+        dimension.filter_in([
+            path for path in dimension.categories
+            if any(path == node or path.startswith(f"{node}/")
+                   for node in brush)])
     else:
-        return "High Anxiety"
-
-
+        dimension.filter_all()
+
+
+@st.cache_resource(max_entries=32)
+@persistent_cache
+def get_sunburst_counts(_df, version, levels=SUNBURST_LEVELS):
+    """
+    Count players for every leaf of the sunburst hierarchy.
+
+    Computed once per dataset version, or combined from the partition sums
+    of a date range view for the default levels. Any survey column can be
+    used as a level (e.g. Platform or League) in addition to the derived
+    Anxiety_Level.
+
+    Args:
+        _df (pd.DataFrame): Full survey data (not hashed)
+        version (str): Dataset version the counts are cached under
+        levels (tuple): Hierarchy columns, outermost first
+
+    Returns:
+        pd.Series: Player counts indexed by the hierarchy levels
+    """
+    if levels == SUNBURST_LEVELS:
+        counts = view_aggregate(version, "sunburst_counts")
+        if counts is not None:
+            return counts
+    data = _df.assign(Anxiety_Level=categorize_anxiety(_df["GAD_T"]))
+    return data.groupby(list(levels)).size()
+
+
+@keyed_lru_cache(maxsize=64)
+def build_sunburst_tree(_counts, game, version, levels=SUNBURST_LEVELS):
+    """
+    Flatten the hierarchy counts of a game into sunburst nodes.
+
+    Args:
+        _counts (pd.Series): Output of ``get_sunburst_counts``
+        game (str): Selected game or "All"
+        version (str): Dataset version the counts belong to
+        levels (tuple): Hierarchy columns the counts were built with
+
+    Returns:
+        dict: ``ids``, ``parents``, ``labels``, ``values`` and the top-level
+        ``branches`` of every node, or None if the game has no players
+    """
+    if game and game != "All":
+        counts = _counts[_counts.index.get_level_values("Game") == game]
+    else:
+        counts = _counts
+    counts = counts.droplevel("Game")
+    if counts.empty:
+        return None
+
+    tree = {"ids": [], "parents": [], "labels": [], "values": [],
+            "branches": []}
+    for depth in range(1, counts.index.nlevels + 1):
+        level_counts = counts.groupby(level=list(range(depth))).sum()
+        for path, value in level_counts.items():
+            path = tuple(map(str, path if isinstance(path, tuple) else (path,)))
+            tree["ids"].append("/".join(path))
+            tree["parents"].append("/".join(path[:-1]))
+            tree["labels"].append(path[-1])
+            tree["values"].append(int(value))
+            tree["branches"].append(path[0])
+    return tree
+
+
+def prepare_playstyle_anxiety_sunburst_chart(df, game=None):
+    """Build the sunburst nodes of a game from counts cached per version"""
+    version = get_data_version(df)
+    return build_sunburst_tree(get_sunburst_counts(df, version), game, version)
+
+
+@st.fragment
+@instrumented
 def render_playstyle_anxiety_sunburst_chart(df, game=None):
-    """Render a sunburst chart of playstyles and anxiety levels."""
+    """
+    Render a sunburst chart of playstyles and anxiety levels.
+
+    Runs as a fragment. Wedges picked below the chart brush the linked
+    score radar (``get_playstyle_brush``), and a change triggers a full
+    rerun so it picks them up.
+    """
     # Create an expandable section for the interaction tips
     with st.expander("💡 Interactive Chart Tip"):
         col1, col2, col3 = st.columns(3)
@@ -43,49 +149,29 @@ def render_playstyle_anxiety_sunburst_chart(df, game=None):
         with col3:
             st.info("👆 Hover for details")
 
-    # Apply the playstyle grouping
-    df['Grouped_Playstyle'] = df['Playstyle'].apply(group_playstyles)
-
-    # Filter by game if specified
-    if game and game != "All":
-        df = df[df["Game"] == game]
-
-    # Check if DataFrame is empty after filtering
-    if df.empty:
-        st.warning("No data available for the selected game.")
-        return
-
     # Ensure the anxiety score column exists
     if 'GAD_T' not in df.columns:
         st.error("Anxiety Score column 'GAD_T' not found in the DataFrame.")
         return
 
-    # Categorize anxiety levels
-    df['Anxiety_Level'] = df['GAD_T'].apply(categorize_anxiety)
+    # Build the hierarchy from counts cached per dataset version
+    tree = prepare_playstyle_anxiety_sunburst_chart(df, game)
 
-    # Count occurrences for each combination of playstyle and anxiety level
-    counts = df.groupby(['Grouped_Playstyle', 'Anxiety_Level']
-                        ).size().reset_index(name='Count')
-
-    # Define custom colors for playstyles
-    playstyle_colors = {
-        "Single Player": '#6ee7b7',  # Light blue
-        "Multiplayer - offline (same room)": '#60a5fa',  # Blue
-        # Dark blue
-        "Multiplayer - online (with online acquaintances/teammates)": '#2563eb',
-        "Multiplayer - online (with real-life friends)": '#fca5a5',  # Red
-        "Multiplayer - online (with strangers)": '#ef4444',  # Dark red
-        "Others": '#10b981'  # Green
-    }
+    # Check if there is data left after filtering
+    if tree is None:
+        st.warning("No data available for the selected game.")
+        return
 
     # Create the sunburst chart
-    fig = px.sunburst(
-        counts,
-        path=['Grouped_Playstyle', 'Anxiety_Level'],
-        values='Count',
-        color='Grouped_Playstyle',
-        color_discrete_map=playstyle_colors
-    )
+    fig = go.Figure(go.Sunburst(
+        ids=tree["ids"],
+        parents=tree["parents"],
+        labels=tree["labels"],
+        values=tree["values"],
+        branchvalues="total",
+        marker=dict(colors=[PLAYSTYLE_COLORS.get(branch)
+                            for branch in tree["branches"]])
+    ))
 
     # Update the layout for a dark theme
     fig.update_layout(
@@ -109,4 +195,26 @@ def render_playstyle_anxiety_sunburst_chart(df, game=None):
     )
 
     # Render the chart in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
+
+    # Wedge clicks only zoom the chart, so brushed wedges are picked here;
+    # every game keeps its own brush. Names can hold the id separator, so
+    # wedges are labelled from the tree
+    nodes = dict(zip(tree["ids"], zip(tree["parents"], tree["labels"])))
+
+    def wedge_name(node):
+        parent, label = nodes[node]
+        return f"{wedge_name(parent)} › {label}" if parent else label
+
+    st.multiselect(
+        "Filter the score radar by wedge",
+        options=tree["ids"],
+        format_func=wedge_name,
+        key=f"{PLAYSTYLE_BRUSH_KEY}_{game}",
+        on_change=_mark_playstyle_brushed
+    )
+
+    # Linked panels live outside this fragment and only see the new brush
+    # on a full rerun
+    if st.session_state.pop("playstyle_brushed", False):
+        st.rerun()
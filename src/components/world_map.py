@@ -1,15 +1,19 @@
+import contextlib
+import threading
+
 import streamlit as st
-import folium
-from folium import plugins
-from streamlit_folium import st_folium
-import branca.colormap as cm
-import pandas as pd
-from utils.data_processing import get_country_stats, load_geojson
-from shapely.geometry import shape
+from utils.bootstrap import get_bootstrap_ci
+from utils.data_processing import get_country_stats, get_data_version, load_geojson
+from utils.instrumentation import instrumented, sending_chart
+
+# Country statistics shown on the map
+MAP_COLUMNS = ("GAD_T", "SWL_T", "SPIN_T", "Hours")
 
 
 def get_country_bounds(feature):
     """Get the bounding box coordinates for a country"""
+    from shapely.geometry import shape
+
     polygon = shape(feature["geometry"])
     bounds = polygon.bounds
     return [[bounds[1], bounds[0]], [bounds[3], bounds[2]]]
@@ -17,32 +21,78 @@ def get_country_bounds(feature):
 
 def get_country_centroid(feature):
     """Get the centroid coordinates for a country"""
+    from shapely.geometry import shape
+
     polygon = shape(feature["geometry"])
     centroid = polygon.centroid
     return [centroid.y, centroid.x]
 
 
-def render_world_map(df, selected_country=None):
-    """Render interactive world map visualization of gaming anxiety levels"""
-    country_stats = get_country_stats(df)
+@st.cache_resource
+def get_country_geometry():
+    """Index the bounds and centroid of every country in the world GeoJSON by country code"""
     world_geo = load_geojson()
-
     if world_geo is None:
-        st.error("Unable to load map data. Please check if the GeoJSON file exists.")
-        return
+        return {}
+    return {
+        feature["id"]: {
+            "bounds": get_country_bounds(feature),
+            "centroid": get_country_centroid(feature),
+        }
+        for feature in world_geo["features"]
+    }
+
+
+def prepare_world_map(df):
+    """Compute the country statistics, anxiety intervals and shapes the map draws"""
+    version = get_data_version(df)
+    get_country_geometry()
+    return (get_country_stats(df, version),
+            get_bootstrap_ci(df, ("Residence_ISO3",), "GAD_T", version),
+            load_geojson())
+
+
+def get_brushed_world_map(crossfilter):
+    """
+    Compute the country statistics of the rows passing a crossfilter.
+
+    The map's group ignores the country filter, so every country is drawn.
+    Anxiety intervals are normal approximations from the group's sums
+    rather than bootstrapped from rows.
+    """
+    stats = crossfilter.dimension("Residence_ISO3").group(
+        "world_map", columns=MAP_COLUMNS).all()
+    anxiety_ci = stats.set_index("Residence_ISO3")[
+        ["GAD_T_count", "GAD_T_low", "GAD_T_high"]]
+    anxiety_ci.columns = ["count", "low", "high"]
+    return (stats[["Residence_ISO3", *MAP_COLUMNS]], anxiety_ci,
+            load_geojson())
+
+
+def build_world_map(country_stats, anxiety_ci, world_geo,
+                    selected_country=None):
+    """
+    Build the folium map of country statistics and their anxiety intervals.
+
+    Returns:
+        folium.Map: Countries colored by mean anxiety, with the selected
+        country zoomed to and marked
+    """
+    # Mapping libraries are heavy to import, so load them on first render
+    import branca.colormap as cm
+    import folium
 
     map_center = [20, 0]
     zoom_start = 2
 
-    if selected_country:
-        for feature in world_geo["features"]:
-            if feature["id"] == selected_country:
-                bounds = get_country_bounds(feature)
-                map_center = [
-                    (bounds[0][0] + bounds[1][0]) / 2,
-                    (bounds[0][1] + bounds[1][1]) / 2
-                ]
-                zoom_start = 4
+    geometry = get_country_geometry().get(selected_country)
+    if geometry:
+        bounds = geometry["bounds"]
+        map_center = [
+            (bounds[0][0] + bounds[1][0]) / 2,
+            (bounds[0][1] + bounds[1][1]) / 2
+        ]
+        zoom_start = 4
 
     m = folium.Map(
         location=map_center,
@@ -54,11 +104,8 @@ def render_world_map(df, selected_country=None):
         world_copy_jump=True,
     )
 
-    if selected_country:
-        for feature in world_geo["features"]:
-            if feature["id"] == selected_country:
-                bounds = get_country_bounds(feature)
-                m.fit_bounds(bounds, padding=[20, 20])
+    if geometry:
+        m.fit_bounds(geometry["bounds"], padding=[20, 20])
 
     vmin = country_stats["GAD_T"].min()
     vmax = country_stats["GAD_T"].max()
@@ -78,6 +125,8 @@ def render_world_map(df, selected_country=None):
             country_data = country_stats[country_stats["Residence_ISO3"]
                                          == country_code].iloc[0].to_dict()
             country_data["name"] = country_name
+            country_data.update(
+                anxiety_ci.loc[country_code, ["count", "low", "high"]].to_dict())
             country_data_dict[country_code] = country_data
 
     country_features = folium.FeatureGroup(name="Countries")
@@ -97,7 +146,9 @@ def render_world_map(df, selected_country=None):
                         {data['name']}
                     </div>
                     <div style='color: #666; line-height: 1.5'>
-                        <b>Anxiety Score:</b> {anxiety_score:.2f}<br>
+                        <b>Anxiety Score:</b> {anxiety_score:.2f}
+                        ({data['low']:.2f} - {data['high']:.2f}, 95% CI)<br>
+                        <b>Respondents:</b> {data['count']:.0f}<br>
                         <b>Life Satisfaction:</b> {data['SWL_T']:.2f}<br>
                         <b>Gaming Hours/Week:</b> {data['Hours']:.1f}
                     </div>
@@ -130,9 +181,8 @@ def render_world_map(df, selected_country=None):
 
             # Add standard map marker for selected country
             if country_code == selected_country:
-                centroid = get_country_centroid(feature)
                 folium.Marker(
-                    location=centroid,
+                    location=geometry["centroid"],
                     popup=data['name'],
                     icon=folium.Icon(color='red', icon='info-sign'),
                 ).add_to(m)
@@ -152,8 +202,50 @@ def render_world_map(df, selected_country=None):
     country_features.add_to(m)
     colormap.add_to(m)
 
-    st_folium(
-        m,
-        width="100%",
-        height=500
-    )
+    return m
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_world_map(_df, version, selected_country=None):
+    """
+    Build the unbrushed map of a dataset version and selected country.
+
+    The map and its GeoJSON layers are shared by every session. Rendering a
+    folium map updates its elements in place, so it is returned with a lock
+    to render it under.
+
+    Returns:
+        tuple: The folium map and its lock
+    """
+    return (build_world_map(*prepare_world_map(_df), selected_country),
+            threading.Lock())
+
+
+@st.fragment
+@instrumented
+def render_world_map(df, selected_country=None, crossfilter=None):
+    """
+    Render interactive world map visualization of gaming anxiety levels.
+
+    With a crossfilter, the countries are drawn from the rows passing its
+    filters (the brushes of the linked panels) instead of all rows.
+    """
+    from streamlit_folium import st_folium
+
+    if load_geojson() is None:
+        st.error("Unable to load map data. Please check if the GeoJSON file exists.")
+        return
+
+    if crossfilter is None:
+        m, lock = get_world_map(df, get_data_version(df), selected_country)
+    else:
+        m = build_world_map(*get_brushed_world_map(crossfilter),
+                            selected_country)
+        lock = contextlib.nullcontext()
+
+    with lock, sending_chart(lambda: m.get_root().render()):
+        st_folium(
+            m,
+            width="100%",
+            height=500
+        )
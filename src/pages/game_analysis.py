@@ -1,17 +1,35 @@
 import streamlit as st
 
-from components.game_chart import render_game_bubble_chart
-from components.score_radar import render_score_radar
-from components.sunburst_chart import render_playstyle_anxiety_sunburst_chart
+from components.game_chart import (prepare_game_bubble_chart,
+                                   render_game_bubble_chart)
+from components.score_radar import prepare_score_radar, render_score_radar
+from components.sunburst_chart import (
+    brush_playstyles, get_playstyle_brush,
+    prepare_playstyle_anxiety_sunburst_chart,
+    render_playstyle_anxiety_sunburst_chart)
+from utils.crossfilter import get_crossfilter
+from utils.planner import prepare_panels
 
 
 def render(df):
     """Render the Kind of Game analysis page"""
+    # A game selection reruns the page, so the game of the linked panels is
+    # known before the game chart is rendered and their data is prepared
+    # concurrently while the panels are rendered in order
+    game = st.session_state.get("selected_game", "All")
+    prepare_panels(
+        (prepare_game_bubble_chart, df),
+        (prepare_playstyle_anxiety_sunburst_chart, df, game),
+        (prepare_score_radar, df, game),
+    )
 
     game_container = st.container()
     with game_container:
         st.subheader("Game Popularity and Engagement Visualization")
-        selected_game = render_game_bubble_chart(df)
+        render_game_bubble_chart(df)
+
+    # The game chart publishes its selection for the linked panels
+    selected_game = st.session_state.get("selected_game", "All")
 
     st.empty()
 
@@ -22,12 +40,15 @@ def render(df):
 
     st.empty()
 
+    # Brushed sunburst wedges filter the radar; the session's crossfilter
+    # only updates the rows entering or leaving the brush
+    crossfilter = None
+    brush = get_playstyle_brush(selected_game)
+    if brush:
+        crossfilter = get_crossfilter(df, "game_analysis")
+        brush_playstyles(crossfilter, selected_game)
+
     radar_container = st.container()
     with radar_container:
         st.subheader("Score Distribution by Gaming Style")
-        filtered_df = (
-            df[df["Game"] == selected_game]
-            if selected_game and selected_game != "All"
-            else df
-        )
-        render_score_radar(filtered_df, selected_game)
+        render_score_radar(df, selected_game, crossfilter, brush)
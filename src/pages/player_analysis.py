@@ -1,9 +1,15 @@
 import streamlit as st
-from components.age_groups import render_age_analysis
-from components.player_motivation import render_motivation_analysis
-from components.world_map import render_world_map
-from components.bubble_chart import render_relationship_analysis
-from utils.data_processing import get_country_names
+from components.age_groups import (brush_age_groups, get_age_brush,
+                                   prepare_age_analysis, render_age_analysis)
+from components.player_motivation import (prepare_motivation_analysis,
+                                          render_motivation_analysis)
+from components.world_map import prepare_world_map, render_world_map
+from components.bubble_chart import (get_selected_top_n,
+                                     prepare_relationship_analysis,
+                                     render_relationship_analysis)
+from utils.crossfilter import get_crossfilter
+from utils.data_processing import filter_rows, get_country_names
+from utils.planner import prepare_panels
 
 
 def render(df):
@@ -27,16 +33,40 @@ def render(df):
         index=0
     )
 
-    map_container = st.container()
-    with map_container:
-        render_world_map(df, selected_country=selected_code)
-
     filtered_df = (
-        df[df["Residence_ISO3"] == selected_code]
+        filter_rows(df, Residence_ISO3=selected_code)
         if selected_code != "All Countries"
         else df
     )
 
+    # Brushing age groups filters the map and the motivation chart. The
+    # session's crossfilter only updates the rows entering or leaving the
+    # brush and the country filter; without a brush the panels read the
+    # shared caches
+    crossfilter = None
+    if get_age_brush():
+        crossfilter = get_crossfilter(df, "player_analysis")
+        countries = crossfilter.dimension("Residence_ISO3")
+        if selected_code != "All Countries":
+            countries.filter_exact(selected_code)
+        else:
+            countries.filter_all()
+        brush_age_groups(crossfilter)
+
+    # The panels' data only depends on the country, so it is prepared
+    # concurrently while they are rendered in order
+    prepare_panels(
+        (prepare_world_map, df),
+        (prepare_age_analysis, filtered_df),
+        (prepare_motivation_analysis, filtered_df),
+        (prepare_relationship_analysis, df, get_selected_top_n()),
+    )
+
+    map_container = st.container()
+    with map_container:
+        render_world_map(df, selected_country=selected_code,
+                         crossfilter=crossfilter)
+
     st.empty()
 
     age_container = st.container()
@@ -49,7 +79,7 @@ def render(df):
     motivation_container = st.container()
     with motivation_container:
         st.subheader("Player Motivation")
-        render_motivation_analysis(filtered_df)
+        render_motivation_analysis(filtered_df, crossfilter)
 
     st.divider()
 
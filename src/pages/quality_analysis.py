@@ -1,8 +1,13 @@
 import streamlit as st
 
 from components.life_quality import render_life_quality_analysis
+from components.score_trends import render_score_trends
 
 
 def render(df):
     """Render the Quality of Life analysis page"""
     render_life_quality_analysis(df)
+
+    st.empty()
+
+    render_score_trends(df)
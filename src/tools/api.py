@@ -0,0 +1,245 @@
+"""
+Serve the dashboard aggregates as a local JSON API.
+
+Every endpoint answers a GET with the records the matching dashboard panel
+is drawn from, computed by the same cached helpers, so repeat queries are
+served from the in-process and persistent caches. Responses carry an ETag
+derived from the dataset version and the query: a request whose
+If-None-Match still matches is answered with 304 before anything is
+computed, and the tags change as soon as the survey file does.
+
+Endpoints:
+    /country-stats, /age-stats, /platform-stats, /game-counts,
+    /playstyle-anxiety-counts
+        Take filters as column=value parameters, e.g. ?Gender=Male&Age=25;
+        values must occur in the column, and at most 3 filters are combined
+    /life-quality
+        Summary statistics of the Quality of Life panel; takes gender,
+        work, education (as in the panel) and age=low-high
+    /radar-scores
+        Radar values of a game (game=, "All" by default) and its
+        playstyles (repeated playstyle=, all by default)
+    /
+        The dataset version and the endpoint list
+
+Invalid parameters are answered with 400 and unexpected errors with 500,
+both with a JSON ``error`` message.
+
+Usage (from the src directory):
+    python -m tools.api --port 8502
+"""
+import argparse
+import json
+import logging
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from components.game_chart import get_game_counts
+from components.life_quality import (get_life_quality_cube, select_cells,
+                                     summarize_cells)
+from components.score_radar import (get_playstyle_options,
+                                    get_radar_aggregates, get_radar_scores)
+from components.sunburst_chart import get_sunburst_counts
+from tools.benchmark import quiet_bare_mode
+from utils.cache import keyed_lru_cache
+from utils.data_processing import (derive_version, filter_rows,
+                                   get_age_stats, get_country_stats,
+                                   get_data_version, get_platform_stats,
+                                   load_data)
+
+logger = logging.getLogger(__name__)
+
+# Filters a query may combine; with values limited to those in the data,
+# this bounds the distinct filtered views clients can request
+MAX_FILTERS = 3
+
+
+class QueryError(ValueError):
+    """Invalid request parameters, answered with 400"""
+
+
+def single(params, name, default):
+    """Return the last value of a query parameter"""
+    return params.get(name, [default])[-1]
+
+
+@keyed_lru_cache(maxsize=64)
+def column_values(_df, version, col):
+    """Map every distinct value of a column to itself, once per version"""
+    return {value: value for value in _df[col].dropna().unique()}
+
+
+def row_filters(df, params):
+    """
+    Convert column=value parameters to values of the columns.
+
+    Values are replaced by the equal value found in the column, so e.g.
+    ``Age=25`` and ``Age=25.0`` make the same filter and share its cache
+    entries.
+    """
+    if len(params) > MAX_FILTERS:
+        raise QueryError(f"At most {MAX_FILTERS} filters can be combined")
+    version = get_data_version(df)
+    filters = {}
+    for col, values in params.items():
+        if col not in df.columns:
+            raise QueryError(f"Unknown survey column: {col}")
+        value = values[-1]
+        if pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                value = pd.to_numeric(value)
+            except ValueError:
+                raise QueryError(f"{col} must be a number") from None
+        known = column_values(df, version, col)
+        if value not in known:
+            raise QueryError(f"Unknown value of {col}: {values[-1]}")
+        filters[col] = known[value]
+    return filters
+
+
+def filtered(helper):
+    """Endpoint computing a version-keyed helper on filtered rows"""
+    def endpoint(df, params):
+        rows = filter_rows(df, **row_filters(df, params))
+        return helper(rows, get_data_version(rows))
+    return endpoint
+
+
+def playstyle_anxiety_counts(df, version):
+    """Player counts per game, playstyle and anxiety level"""
+    return get_sunburst_counts(df, version).reset_index(name="count")
+
+
+def life_quality(df, params):
+    """Summary statistics of the players matching the Player Type filters"""
+    cube = get_life_quality_cube(df, get_data_version(df))
+    try:
+        low, high = map(int, single(params, "age", "18-56").split("-"))
+    except ValueError:
+        raise QueryError("age must be a range such as 18-30") from None
+    mask = select_cells(cube["cells"], single(params, "gender", "All"),
+                        single(params, "work", "All"),
+                        single(params, "education", "All"), (low, high))
+    return summarize_cells(cube["cells"][mask], cube["bounds"])
+
+
+def radar_scores(df, params):
+    """Radar values of the selected game and playstyles"""
+    version = get_data_version(df)
+    aggregates = get_radar_aggregates(df, version)
+    game = single(params, "game", "All")
+    options = get_playstyle_options(aggregates, game)
+    if not options:
+        raise QueryError(f"Unknown game: {game}")
+    playstyles = params.get("playstyle", options)
+    scores = get_radar_scores(aggregates, game, frozenset(playstyles), version)
+    return scores.rename_axis("Grouped_Playstyle").reset_index()
+
+
+ENDPOINTS = {
+    "/country-stats": filtered(get_country_stats),
+    "/age-stats": filtered(get_age_stats),
+    "/platform-stats": filtered(get_platform_stats),
+    "/game-counts": filtered(get_game_counts),
+    "/playstyle-anxiety-counts": filtered(playstyle_anxiety_counts),
+    "/life-quality": life_quality,
+    "/radar-scores": radar_scores,
+}
+
+
+def to_json(value):
+    """Serialize a frame as records, or a dict of scalars, with NaN as null"""
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient="records", date_format="iso")
+    return json.dumps({key: None if pd.isna(v) else
+                       v.item() if isinstance(v, np.generic) else v
+                       for key, v in value.items()})
+
+
+def make_etag(version, path, params):
+    """Return the entity tag of a query on a dataset version"""
+    query = tuple(sorted((name, tuple(values))
+                         for name, values in params.items()))
+    return f'"{derive_version(version, (path, query))}"'
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            self.respond()
+        except ConnectionError:
+            # The client went away; there is no one to answer
+            pass
+        except Exception:
+            logger.exception("Error answering %s", self.path)
+            self.send_body(500, json.dumps({"error": "Internal server error"}))
+
+    def respond(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        df, version = load_data()
+
+        if url.path == "/":
+            self.send_body(200, json.dumps(
+                {"version": version, "endpoints": sorted(ENDPOINTS)}))
+            return
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            self.send_body(404, json.dumps({"error": "Unknown endpoint"}))
+            return
+
+        etag = make_etag(version, url.path, params)
+        if_none_match = {tag.strip().removeprefix("W/") for tag in
+                         self.headers.get("If-None-Match", "").split(",")}
+        if etag in if_none_match or "*" in if_none_match:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            body = to_json(endpoint(df, params))
+        except QueryError as e:
+            self.send_body(400, json.dumps({"error": str(e)}))
+            return
+        self.send_body(200, body, etag)
+
+    def send_body(self, status, body, etag=None):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            # Clients may keep responses but must revalidate them
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    quiet_bare_mode()
+    _, version = load_data()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving dataset {version} on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Benchmark every dashboard component across data scales.
+
+Each ``render_*`` component is called directly in Streamlit's bare mode
+(widgets return their defaults and nothing is sent to a browser) on datasets
+of increasing size. For every run it records cold and warm wall time, peak
+traced memory and the serialized size of the figures handed to
+``st.plotly_chart`` / ``st_folium``. Results are written as JSON and can be
+compared against a stored baseline.
+
+Usage (from the src directory):
+    python -m tools.benchmark --sizes 10000 100000 --output results.json
+    python -m tools.benchmark --baseline baseline.json --tolerance 1.25
+"""
+import argparse
+import contextlib
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import streamlit as st
+
+# Streamlit loggers that warn on every call outside a script run
+BARE_MODE_LOGGERS = [
+    "streamlit.runtime.scriptrunner_utils.script_run_context",
+    "streamlit.runtime.caching.cache_data_api",
+]
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Component name -> (module, extra positional arguments after the frame)
+COMPONENTS = {
+    "render_world_map": ("components.world_map", ()),
+    "render_age_analysis": ("components.age_groups", ()),
+    "render_motivation_analysis": ("components.player_motivation", ()),
+    "render_relationship_analysis": ("components.bubble_chart", ()),
+    "render_game_bubble_chart": ("components.game_chart", ()),
+    "render_playstyle_anxiety_sunburst_chart": ("components.sunburst_chart", ("All",)),
+    "render_score_radar": ("components.score_radar", ("All",)),
+    "render_life_quality_analysis": ("components.life_quality", ()),
+    "render_score_trends": ("components.score_trends", ()),
+}
+
+
+def quiet_bare_mode():
+    """Silence the warnings Streamlit logs for every call outside a script run"""
+    # The environment variable carries the setting into worker processes
+    os.environ["STREAMLIT_LOGGER_LEVEL"] = "error"
+    for name in BARE_MODE_LOGGERS:
+        logging.getLogger(name).addFilter(
+            lambda record: record.levelno >= logging.ERROR)
+    warnings.filterwarnings("ignore")
+
+
+def get_render(name):
+    """Return a component's render function, unwrapped from its fragment"""
+    import importlib
+
+    module, _ = COMPONENTS[name]
+    # Fragments only execute inside a script run; call the function
+    return inspect.unwrap(getattr(importlib.import_module(module), name))
+
+
+def make_dataset(rows, seed=0, synthetic=False):
+    """
+    Build a processed survey frame with the given number of rows.
+
+    By default rows are resampled with replacement from the shipped dataset,
+    which keeps every column and category realistic at any scale. With
+    ``synthetic`` they are drawn from the synthetic survey generator, so no
+    answer is repeated verbatim. Either way the frame is tagged with a
+    version derived from the shipped dataset's, so components do not hash
+    it.
+    """
+    from utils.data_processing import (derive_version, load_data,
+                                       process_data, tag_version)
+
+    source, version = load_data()
+    if synthetic:
+        from utils.synthetic_data import generate_survey
+        df = process_data(generate_survey(rows, seed))
+    else:
+        df = source.sample(rows, replace=True, random_state=seed,
+                           ignore_index=True)
+    return tag_version(df, derive_version(
+        version, ("synthetic" if synthetic else "sample", rows, seed)))
+
+
+def clear_caches():
+    """Drop every Streamlit and in-process cache so the next call is cold"""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for module in [*(module for module, _ in COMPONENTS.values()),
+                   "utils.data_processing"]:
+        for attr in vars(sys.modules.get(module, object)).values():
+            if callable(getattr(attr, "cache_clear", None)):
+                attr.cache_clear()
+
+
+@contextlib.contextmanager
+def capture_payloads():
+    """Record the serialized size of every figure the components emit"""
+    import streamlit_folium
+
+    payloads = []
+    plotly_chart, st_folium = st.plotly_chart, streamlit_folium.st_folium
+
+    def record_plotly(fig, *args, **kwargs):
+        payloads.append(len(fig.to_json()))
+        return plotly_chart(fig, *args, **kwargs)
+
+    def record_folium(fig, *args, **kwargs):
+        payloads.append(len(fig.get_root().render()))
+
+    st.plotly_chart, streamlit_folium.st_folium = record_plotly, record_folium
+    try:
+        yield payloads
+    finally:
+        st.plotly_chart, streamlit_folium.st_folium = plotly_chart, st_folium
+
+
+def run_component(render, df, args):
+    """Time one cold and one warm call of a component"""
+    clear_caches()
+    gc.collect()
+    with capture_payloads() as payloads:
+        start = time.perf_counter()
+        render(df, *args)
+        cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    render(df, *args)
+    warm = time.perf_counter() - start
+
+    # Memory is traced in a separate cold call as tracing slows it down
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    render(df, *args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "cold_seconds": cold,
+        "warm_seconds": warm,
+        "peak_memory_bytes": peak,
+        "payload_bytes": sum(payloads),
+    }
+
+
+def run_benchmarks(sizes, components, seed=0, synthetic=False):
+    """
+    Benchmark components on datasets of the given sizes.
+
+    Returns:
+        dict: ``meta`` about the run and one ``results`` entry per
+        (component, rows)
+    """
+    results = []
+    for rows in sizes:
+        df = make_dataset(rows, seed, synthetic)
+        for name in components:
+            result = run_component(get_render(name), df, COMPONENTS[name][1])
+            results.append({"component": name, "rows": rows, **result})
+            print(f"{name:<42}{rows:>10,}{result['cold_seconds']:>10.3f}s"
+                  f"{result['warm_seconds']:>10.3f}s"
+                  f"{result['peak_memory_bytes'] / 2**20:>10.1f}MiB"
+                  f"{result['payload_bytes'] / 1024:>10.1f}KiB")
+        del df
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "synthetic": synthetic,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline run.
+
+    Returns:
+        list: (component, rows, metric, baseline, current) for every metric
+        that grew by more than ``tolerance`` times
+    """
+    previous = {(r["component"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get((result["component"], result["rows"]))
+        if before is None:
+            continue
+        for metric in ("cold_seconds", "warm_seconds", "peak_memory_bytes",
+                       "payload_bytes"):
+            if result[metric] > before[metric] * tolerance:
+                regressions.append((result["component"], result["rows"],
+                                    metric, before[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--components", nargs="+", choices=list(COMPONENTS),
+                        default=list(COMPONENTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use generated rows instead of resampled ones")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed growth factor over the baseline")
+    args = parser.parse_args(argv)
+
+    quiet_bare_mode()
+
+    print(f"{'component':<42}{'rows':>10}{'cold':>11}{'warm':>11}"
+          f"{'peak':>13}{'payload':>13}")
+    results = run_benchmarks(args.sizes, args.components, args.seed,
+                             args.synthetic)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for component, rows, metric, before, after in regressions:
+            print(f"REGRESSION {component} @ {rows:,} rows: {metric} "
+                  f"{before:.4g} -> {after:.4g}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance}x the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Build the SQLite survey database and check its pushed-down queries.
+
+Loads a raw survey CSV or Parquet file (the shipped processed CSV by
+default) into an indexed SQLite database chunk by chunk, so datasets larger
+than memory can be loaded. With ``--check`` the source is also loaded into
+pandas, and the database's aggregates and row selections are compared with
+the frame helpers for the most common value of every indexed column.
+
+The dashboard and its tools load the survey from the database, and query
+their aggregates and filtered rows from it, with ``DASHBOARD_DATABASE`` set
+to its path.
+
+Usage (from the src directory):
+    python -m tools.build_database survey.sqlite --source synthetic.csv
+    DASHBOARD_DATABASE=survey.sqlite streamlit run app.py
+"""
+import argparse
+import inspect
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from components.bubble_chart import get_country_counts
+from components.game_chart import get_game_counts
+from components.life_quality import get_life_quality_cube
+from components.score_radar import get_radar_aggregates
+from components.sunburst_chart import get_sunburst_counts
+from utils.data_processing import (CSV_FILE_PATH, get_age_stats,
+                                   get_country_stats, get_platform_stats,
+                                   process_data)
+from utils.survey_db import (AGGREGATES, DASHBOARD_COLUMNS, INDEX_COLUMNS,
+                             DatabaseView, build_database, read_source)
+
+# Helpers whose results the database and the pre-aggregates reproduce,
+# called uncached
+HELPERS = {
+    "country_stats": inspect.unwrap(get_country_stats),
+    "age_stats": inspect.unwrap(get_age_stats),
+    "platform_stats": inspect.unwrap(get_platform_stats),
+    "game_counts": inspect.unwrap(get_game_counts),
+    "country_counts": inspect.unwrap(get_country_counts),
+    "life_quality_cells": lambda rows, version: inspect.unwrap(
+        get_life_quality_cube)(rows, version)["cells"],
+    "radar_aggregates": inspect.unwrap(get_radar_aggregates),
+    "sunburst_counts": lambda rows, version: inspect.unwrap(
+        get_sunburst_counts)(rows, version).reset_index(name="count"),
+}
+
+
+def frame_filter(df, filters):
+    """Apply database filters to a frame"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in filters.items():
+        if value is None:
+            mask &= df[col].isna()
+        elif isinstance(value, tuple):
+            mask &= df[col].between(*value)
+        elif isinstance(value, (list, set, frozenset)):
+            mask &= df[col].isin(list(value))
+        else:
+            mask &= df[col] == value
+    return df[mask]
+
+
+def compare(name, expected, actual):
+    """Return a mismatch description, or None when the frames agree"""
+    try:
+        pd.testing.assert_frame_equal(
+            expected.reset_index(drop=True), actual.reset_index(drop=True),
+            check_dtype=False, check_categorical=False)
+    except AssertionError as e:
+        return f"{name}: {e}"
+    return None
+
+
+def check(db, df):
+    """Compare the database with the frame under a set of filters"""
+    filter_sets = [{}, {"Age": (25, 35)},
+                   {"Gender": "Male", "Degree": None}]
+    for col in INDEX_COLUMNS:
+        filter_sets.append({col: df[col].mode().iloc[0]})
+
+    failures = []
+    for filters in filter_sets:
+        rows = frame_filter(df, filters)
+        start = time.perf_counter()
+        results = {name: getattr(db, name)(**filters) for name in AGGREGATES}
+        results["select"] = db.select(["GAD_T", "AgeGroup", "Datetime"],
+                                      **filters)
+        elapsed = time.perf_counter() - start
+        expected = {name: HELPERS[name](rows, None) for name in AGGREGATES}
+        expected["select"] = rows[["GAD_T", "AgeGroup", "Datetime"]]
+        for name, result in results.items():
+            if isinstance(result, pd.Series):
+                result = result.reset_index(name="count")
+            failure = compare(f"{name} {filters}", expected[name], result)
+            if failure:
+                failures.append(failure)
+        if not results["select"].index.equals(rows.index):
+            failures.append(f"select {filters}: row labels differ")
+
+        # The view load_data registers with DASHBOARD_DATABASE set
+        if filters and all(not isinstance(value, (tuple, list)) and
+                           value is not None for value in filters.values()):
+            view = DatabaseView(db, db.version)
+            spec = tuple(sorted(filters.items()))
+            selected = view.select(DASHBOARD_COLUMNS, spec)
+            failure = compare(f"view select {filters}",
+                              rows[DASHBOARD_COLUMNS], selected)
+            if failure:
+                failures.append(failure)
+        plan = "; ".join(db.explain(**filters))
+        print(f"{str(filters):<48}{len(rows):>10,}{elapsed:>9.3f}s  {plan}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="SQLite database file to write")
+    parser.add_argument("--source", default=CSV_FILE_PATH,
+                        help="raw survey CSV or .parquet file")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--check", action="store_true",
+                        help="compare queries with the pandas helpers")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    db = build_database(args.output, args.source, args.chunk_rows)
+    print(f"Loaded {db.rows:,} rows into {args.output} (version {db.version}) "
+          f"in {time.perf_counter() - start:.1f}s")
+    if not args.check:
+        return 0
+
+    df = process_data(pd.concat(read_source(args.source, args.chunk_rows)))
+    print(f"{'filters':<48}{'rows':>10}{'query':>10}  plan")
+    failures = check(db, df)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
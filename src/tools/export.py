@@ -0,0 +1,335 @@
+"""
+Export every country and game view of the dashboard to static HTML.
+
+Country views hold the world map and age analysis of each residence
+country (and of all countries), game views the game bubble chart,
+playstyle sunburst and score radar of each game (and of all games), with
+every other widget at its default. The dataset is loaded and the shared
+caches are warmed once, then the views are rendered by a pool of forked
+worker processes that read the parent's frame without copying it. Each
+chart is written as a standalone HTML file.
+
+A manifest next to the files records the version of every output: a
+digest of its input rows, the view, and the source of the component's
+module and of every app module it imports, directly or not. Outputs
+whose version is unchanged since the last export are skipped.
+
+Usage (from the src directory):
+    python -m tools.export exports/ --workers 8
+"""
+import argparse
+import ast
+import contextlib
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from tools.benchmark import COMPONENTS, get_render, quiet_bare_mode
+
+MANIFEST = "manifest.json"
+ALL_COUNTRIES = "All Countries"
+ALL_GAMES = "All"
+# Components exported for every view of each kind
+COUNTRY_COMPONENTS = ["render_world_map", "render_age_analysis"]
+GAME_COMPONENTS = ["render_game_bubble_chart",
+                   "render_playstyle_anxiety_sunburst_chart",
+                   "render_score_radar"]
+# Packages whose modules are part of a component's source digest
+APP_PACKAGES = ("components", "utils")
+
+
+def slug(name):
+    """Return a file name for a country code or game"""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def content_version(df):
+    """Return a digest of a frame's rows, independent of its row labels"""
+    from utils.data_processing import VERSION_DIGITS
+
+    digest = hashlib.blake2b(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False)
+                  .to_numpy().tobytes())
+    return digest.hexdigest()[:VERSION_DIGITS]
+
+
+def _app_module(name):
+    """Return ``name`` if it is a module of the app packages, else None"""
+    import importlib.util
+
+    if name.split(".")[0] not in APP_PACKAGES:
+        return None
+    try:
+        return name if importlib.util.find_spec(name) else None
+    except ImportError:
+        # A name imported from a module, not a submodule
+        return None
+
+
+def app_imports(module_name):
+    """Return a module and the app modules it imports, transitively"""
+    import importlib
+
+    modules, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        if name in modules:
+            continue
+        modules.add(name)
+        tree = ast.parse(inspect.getsource(importlib.import_module(name)))
+        # Imports inside functions count too, as components import lazily
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level:
+                names = [node.module, *(f"{node.module}.{alias.name}"
+                                        for alias in node.names)]
+            else:
+                continue
+            pending += filter(None, map(_app_module, names))
+    return sorted(modules)
+
+
+def source_digest(component):
+    """
+    Return a digest of the source of a component's module and of the app
+    modules it imports, such as the shared data helpers and figures.
+    """
+    import importlib
+
+    digest = hashlib.blake2b()
+    for name in app_imports(COMPONENTS[component][0]):
+        digest.update(name.encode())
+        digest.update(inspect.getsource(importlib.import_module(name)).encode())
+    return digest.hexdigest()[:16]
+
+
+def country_rows(df, code):
+    """Return the rows of a residence country, as the player page does"""
+    from utils.data_processing import filter_rows
+
+    if code == ALL_COUNTRIES:
+        return df
+    return filter_rows(df, Residence_ISO3=code)
+
+
+def plan_exports(df, version):
+    """
+    List the outputs of every view with the version of their inputs.
+
+    The world map and the game views are drawn from the full dataset, so
+    their version follows the dataset's; the age analysis only reads the
+    country's rows, so it is versioned by their contents.
+
+    Returns:
+        list: One dict per output with its ``component``, view ``kind`` and
+        ``key``, relative ``path`` and ``version``
+    """
+    from utils.data_processing import derive_version
+
+    digests = {component: source_digest(component)
+               for component in COUNTRY_COMPONENTS + GAME_COMPONENTS}
+    views = [("country", code) for code in
+             [ALL_COUNTRIES, *sorted(df["Residence_ISO3"].dropna().unique())]]
+    views += [("game", game) for game in
+              [ALL_GAMES, *sorted(df["Game"].dropna().unique())]]
+
+    tasks = []
+    for kind, key in views:
+        components = COUNTRY_COMPONENTS if kind == "country" else GAME_COMPONENTS
+        for component in components:
+            input_version = version
+            if component == "render_age_analysis":
+                input_version = content_version(country_rows(df, key))
+            tasks.append({
+                "component": component,
+                "kind": kind,
+                "key": key,
+                "path": f"{kind}/{slug(key)}/{component.removeprefix('render_')}",
+                "version": derive_version(
+                    input_version, (component, kind, key, digests[component])),
+            })
+    return tasks
+
+
+@contextlib.contextmanager
+def select_values(**values):
+    """Have ``st.selectbox`` return the given values, by widget key"""
+    selectbox = st.selectbox
+
+    def select(label, options, *args, key=None, **kwargs):
+        if key in values:
+            return values[key]
+        return selectbox(label, options, *args, key=key, **kwargs)
+
+    st.selectbox = select
+    try:
+        yield
+    finally:
+        st.selectbox = selectbox
+
+
+@contextlib.contextmanager
+def capture_charts():
+    """Collect the figures the components emit instead of sending them"""
+    import streamlit_folium
+
+    charts = []
+    plotly_chart, st_folium = st.plotly_chart, streamlit_folium.st_folium
+    st.plotly_chart = lambda fig, *args, **kwargs: charts.append(("plotly", fig))
+    streamlit_folium.st_folium = lambda fig, *args, **kwargs: charts.append(
+        ("folium", fig))
+    try:
+        yield charts
+    finally:
+        st.plotly_chart, streamlit_folium.st_folium = plotly_chart, st_folium
+
+
+def render_view(task, df):
+    """Call a view's component with the arguments its page passes"""
+    render = get_render(task["component"])
+    component, key = task["component"], task["key"]
+    if component == "render_world_map":
+        render(df, selected_country=key)
+    elif component == "render_age_analysis":
+        render(country_rows(df, key))
+    elif component == "render_game_bubble_chart":
+        with select_values(selected_game=key):
+            render(df)
+    else:
+        render(df, key)
+
+
+def to_html(kind, chart, include_plotlyjs):
+    """Return a chart as a standalone HTML document"""
+    if kind == "folium":
+        return chart.get_root().render()
+    # Figures may hold typed arrays, which plotly.py does not validate
+    return pio.to_html(chart.to_dict(), include_plotlyjs=include_plotlyjs,
+                       validate=False)
+
+
+def export_view(task, output_dir, include_plotlyjs):
+    """
+    Render one output of a view and write its charts.
+
+    Runs in a worker process. ``load_data`` returns the frame inherited from
+    the parent when the worker was forked.
+
+    Returns:
+        tuple: The task, the files written and the seconds taken
+    """
+    from utils.data_processing import load_data
+
+    start = time.perf_counter()
+    df, _ = load_data()
+    with capture_charts() as charts:
+        render_view(task, df)
+
+    files = []
+    for i, (kind, chart) in enumerate(charts):
+        path = Path(output_dir, task["path"] + (f"-{i + 1}" if i else "")
+                    ).with_suffix(".html")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(to_html(kind, chart, include_plotlyjs))
+        files.append(str(path))
+    return task, files, time.perf_counter() - start
+
+
+def load_manifest(output_dir):
+    try:
+        with open(Path(output_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = Path(output_dir, MANIFEST)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_export(output_dir, workers=None, force=False, include_plotlyjs="cdn"):
+    """
+    Export the views whose outputs are missing or out of date.
+
+    Returns:
+        dict: Counts of ``rendered``, ``skipped`` and ``failed`` outputs
+    """
+    from utils.data_processing import load_data
+    from utils.warmup import WarmupState, warm_caches
+
+    df, version = load_data()
+    tasks = plan_exports(df, version)
+    manifest = {} if force else load_manifest(output_dir)
+    stale = [task for task in tasks
+             if manifest.get(task["path"], {}).get("version") != task["version"]
+             or not all(map(os.path.exists,
+                            manifest[task["path"]].get("files", [])))]
+    print(f"{len(tasks)} outputs, {len(tasks) - len(stale)} up to date")
+    if not stale:
+        return {"rendered": 0, "skipped": len(tasks), "failed": 0}
+
+    # Caches warmed here are inherited by the forked workers
+    warm_caches(WarmupState())
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=quiet_bare_mode) as pool:
+        futures = {pool.submit(export_view, task, output_dir,
+                               include_plotlyjs): task for task in stale}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                task, files, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                manifest.pop(task["path"], None)
+                print(f"FAIL {task['path']}: {e!r}")
+                continue
+            manifest[task["path"]] = {"version": task["version"],
+                                      "files": files}
+            print(f"{task['path']:<64}{seconds:>8.2f}s")
+    save_manifest(output_dir, manifest)
+    return {"rendered": len(stale) - failed,
+            "skipped": len(tasks) - len(stale), "failed": failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="directory to write the HTML files to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true",
+                        help="render every output, even if up to date")
+    parser.add_argument("--offline", action="store_true",
+                        help="embed plotly.js instead of loading it from a CDN")
+    args = parser.parse_args(argv)
+
+    quiet_bare_mode()
+    start = time.perf_counter()
+    counts = run_export(args.output, args.workers, args.force,
+                        True if args.offline else "cdn")
+    print(f"Rendered {counts['rendered']}, skipped {counts['skipped']}, "
+          f"failed {counts['failed']} in {time.perf_counter() - start:.1f}s")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
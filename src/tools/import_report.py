@@ -0,0 +1,105 @@
+"""
+Import-time report and cold-start budget check for the app entry point.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter, prints
+the slowest top-level packages and exits non-zero when the cumulative import
+time of ``app`` exceeds the budget.
+
+Usage (from the src directory):
+    python -m tools.import_report --budget 1.0
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent
+
+# Cold-start budget for importing the app entry point, in seconds
+DEFAULT_BUDGET = 1.0
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_imports(module="app"):
+    """
+    Import a module in a fresh interpreter and parse the importtime output.
+
+    Args:
+        module (str): Module to import
+
+    Returns:
+        list: (name, depth, self seconds, cumulative seconds) per import
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, total, indent, name = match.groups()
+            imports.append((name, len(indent) // 2,
+                            int(own) / 1e6, int(total) / 1e6))
+    return imports
+
+
+def summarize(imports, module="app", top=15):
+    """
+    Summarize importtime records.
+
+    Args:
+        imports (list): Output of ``measure_imports``
+        module (str): Module that was imported
+        top (int): Number of packages to list
+
+    Returns:
+        dict: Cumulative ``total`` for the module and the ``slowest``
+        top-level packages with their cumulative time
+    """
+    total = next((cumulative for name, _, _, cumulative in imports
+                  if name == module), 0.0)
+    packages = {}
+    for name, _, _, cumulative in imports:
+        package = name.split(".")[0]
+        if package != module and name == package:
+            packages[package] = max(packages.get(package, 0.0), cumulative)
+    slowest = sorted(packages.items(), key=lambda item: item[1],
+                     reverse=True)[:top]
+    return {"total": total, "slowest": slowest}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="cold-start budget in seconds")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs to take the fastest of")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    runs = [summarize(measure_imports(args.module), args.module, args.top)
+            for _ in range(args.repeat)]
+    report = min(runs, key=lambda run: run["total"])
+
+    print(f"{'package':<30}{'cumulative (s)':>15}")
+    for package, seconds in report["slowest"]:
+        print(f"{package:<30}{seconds:>15.3f}")
+    print(f"{'import ' + args.module:<30}{report['total']:>15.3f}")
+
+    if report["total"] > args.budget:
+        print(f"Import of {args.module} took {report['total']:.3f}s, "
+              f"over the {args.budget:.3f}s budget")
+        return 1
+    print(f"Within the {args.budget:.3f}s budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Load-test the dashboard with concurrent simulated sessions.
+
+Each session is an ``AppTest`` instance running ``app.py`` in this process,
+so sessions share the process's caches and CPU like users on one Streamlit
+server. Sessions replay a journey through every section (switching country
+and anxiety group, selecting games and playstyles, moving the age slider,
+changing the quality filters) with choices drawn from a per-session seed.
+For every session count it reports p50/p95/p99 latency per interaction,
+throughput and the process RSS sampled while the level ran (its peak, and
+the RSS it started from, which holds the caches of earlier levels), and
+names the count with the highest throughput as the saturation point.
+
+Usage (from the src directory):
+    python -m tools.load_test --sessions 1 2 4 8 16 --rounds 2
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+APP_PATH = Path(__file__).parent.parent / "app.py"
+
+
+def _find(widgets, label):
+    return next(w for w in widgets if w.label.startswith(label))
+
+
+def _pick(rng, options, current=None):
+    choices = [option for option in options if option != current] or options
+    return rng.choice(choices)
+
+
+def switch_section(at, rng, section):
+    at.radio(key="active_section").set_value(section).run()
+
+
+def select_country(at, rng):
+    from utils.data_processing import get_country_names
+
+    # Options are (name, code) pairs shown by name; AppTest can only set the
+    # value itself
+    codes = {name: code for code, name in get_country_names().items()}
+    box = _find(at.selectbox, "Filter by Country")
+    name = _pick(rng, box.options, box.value[0])
+    box.set_value((name, codes.get(name, name))).run()
+
+
+def select_anxiety_group(at, rng):
+    box = _find(at.selectbox, "Select Anxiety Group")
+    box.set_value(_pick(rng, box.options, box.value)).run()
+
+
+def filter_motivation(at, rng):
+    box = _find(at.multiselect, "Select Employment Status")
+    box.set_value(rng.sample(box.options, rng.randint(1, len(box.options)))).run()
+
+
+def select_game(at, rng):
+    box = at.selectbox(key="selected_game")
+    box.set_value(_pick(rng, box.options, box.value)).run()
+
+
+def select_playstyles(at, rng):
+    box = _find(at.multiselect, "Select Playstyles")
+    box.set_value(rng.sample(box.options, rng.randint(1, len(box.options)))).run()
+
+
+def move_age_slider(at, rng):
+    low = rng.randint(18, 40)
+    _find(at.slider, "Age:").set_value((low, rng.randint(low + 1, 56))).run()
+
+
+def select_quality_filter(at, rng):
+    radio = _find(at.radio, rng.choice(["Gender:", "Work Status:",
+                                        "Education Level:"]))
+    radio.set_value(_pick(rng, radio.options, radio.value)).run()
+
+
+# One round of a session: (interaction name, function, extra arguments)
+JOURNEY = [
+    ("select_country", select_country, ()),
+    ("select_anxiety_group", select_anxiety_group, ()),
+    ("filter_motivation", filter_motivation, ()),
+    ("switch_section", switch_section, ("Kind of Game",)),
+    ("select_game", select_game, ()),
+    ("select_playstyles", select_playstyles, ()),
+    ("switch_section", switch_section, ("Quality of Life",)),
+    ("move_age_slider", move_age_slider, ()),
+    ("select_quality_filter", select_quality_filter, ()),
+    ("move_age_slider", move_age_slider, ()),
+    ("switch_section", switch_section, ("Kind of Player",)),
+]
+
+
+def share_runtime():
+    """
+    Let AppTest sessions run concurrently against one shared runtime.
+
+    Each AppTest run installs a fresh mock runtime as the global instance
+    and removes it when done, which breaks every other session still
+    running. AppTest is pointed at a subclass instead, so those assignments
+    land on the subclass, while the real global holds a single runtime
+    shared by all sessions, as on one server process.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import (
+        MemoryCacheStorageManager)
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import (
+        MemoryMediaFileStorage)
+    from streamlit.testing.v1 import app_test
+
+    class SessionRuntime(Runtime):
+        pass
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(
+        MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = SessionRuntime
+
+
+# Seconds between RSS samples while a level runs
+RSS_INTERVAL = 0.05
+
+
+def current_rss_bytes():
+    """
+    Return the current resident set size of this process.
+
+    Read from ``/proc/self/statm`` on Linux. Elsewhere only the lifetime peak
+    is available, so the peak of a level also covers the levels before it.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in kilobytes on Linux and in bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Sample the process RSS in a background thread while a block runs"""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.start = self.peak = None
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __enter__(self):
+        self.start = self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return False
+
+
+def run_session(seed, rounds, think_time, record, timeout):
+    """Open the app in a new session and replay the journey"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+
+    def step(name, func, *args):
+        start = time.perf_counter()
+        error = None
+        try:
+            func(at, rng, *args) if func else at.run()
+            if at.exception:
+                error = at.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record(name, time.perf_counter() - start, error)
+        if think_time:
+            time.sleep(rng.expovariate(1 / think_time))
+
+    step("open", None)
+    for _ in range(rounds):
+        for name, func, args in JOURNEY:
+            step(name, func, *args)
+
+
+def run_level(sessions, rounds, think_time, seed, timeout):
+    """
+    Run a number of concurrent sessions to completion.
+
+    Returns:
+        dict: Latency quantiles per interaction and overall, throughput,
+        error count, and the RSS at the start and peak of the level
+    """
+    latencies = {}
+    errors = []
+    lock = threading.Lock()
+
+    def record(name, seconds, error):
+        with lock:
+            latencies.setdefault(name, []).append(seconds)
+            if error:
+                errors.append((name, str(error)))
+
+    start = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, seed + i, rounds, think_time,
+                               record, timeout)
+                   for i in range(sessions)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    def quantiles(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"count": len(values), "p50": p50, "p95": p95, "p99": p99}
+
+    all_latencies = [s for values in latencies.values() for s in values]
+    return {
+        "sessions": sessions,
+        "elapsed_seconds": elapsed,
+        "throughput": len(all_latencies) / elapsed,
+        "start_rss_bytes": rss.start,
+        "peak_rss_bytes": rss.peak,
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "overall": quantiles(all_latencies),
+        "interactions": {name: quantiles(values)
+                         for name, values in sorted(latencies.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="concurrent session counts to run, in order")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="journeys each session replays")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean pause between interactions in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="seconds a single interaction may take")
+    parser.add_argument("--output", help="JSON file for the full results")
+    args = parser.parse_args(argv)
+
+    from tools.benchmark import quiet_bare_mode
+    quiet_bare_mode()
+    share_runtime()
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(sessions, args.rounds, args.think_time, args.seed,
+                          args.timeout)
+        levels.append(level)
+
+        print(f"\n{sessions} session(s): {level['throughput']:.2f} "
+              f"interactions/s, RSS {level['start_rss_bytes'] / 2**20:.0f}MiB "
+              f"at start, {level['peak_rss_bytes'] / 2**20:.0f}MiB peak, "
+              f"{level['errors']} error(s)")
+        print(f"  {'interaction':<24}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, stats in [*level["interactions"].items(),
+                            ("overall", level["overall"])]:
+            print(f"  {name:<24}{stats['count']:>7}{stats['p50']:>8.3f}s"
+                  f"{stats['p95']:>8.3f}s{stats['p99']:>8.3f}s")
+        for name, error in level["first_errors"]:
+            print(f"  ERROR in {name}: {error}")
+
+    best = max(levels, key=lambda level: level["throughput"])
+    print(f"\nSaturation: throughput peaks at {best['sessions']} session(s) "
+          f"with {best['throughput']:.2f} interactions/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"levels": levels}, f, indent=2)
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Check that no component copies or mutates the full dataset on a rerun.
+
+Each ``render_*`` component is called twice in Streamlit's bare mode on a
+scaled dataset: once to fill its caches, then again under tracemalloc, as
+on a rerun. The check fails when the second call's peak allocation reaches
+the threshold fraction of the frame's shallow size (a full-frame copy), or
+when a call adds, removes or replaces columns of the frame it was given.
+
+Usage (from the src directory):
+    python -m tools.memory_check --rows 200000 --threshold 0.9
+"""
+import argparse
+import gc
+import sys
+
+from tools.benchmark import (COMPONENTS, clear_caches, get_render,
+                             make_dataset, quiet_bare_mode)
+from utils.memory import COPY_THRESHOLD, MemoryTracker, frame_bytes
+
+
+def check_component(name, df, threshold):
+    """
+    Measure a component's rerun allocations on the given frame.
+
+    Returns:
+        dict: Memory record of the rerun, with ``mutated`` set when the
+        component changed the frame's columns
+    """
+    render = get_render(name)
+    args = COMPONENTS[name][1]
+    columns = list(df.columns)
+    # The first call fills the caches and makes the second one warm
+    with MemoryTracker(name, df, threshold, snapshots=False):
+        render(df, *args)
+
+    gc.collect()
+    with MemoryTracker(name, df, threshold) as tracker:
+        render(df, *args)
+    return {**tracker.record, "mutated": list(df.columns) != columns}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--components", nargs="+", choices=list(COMPONENTS),
+                        default=list(COMPONENTS))
+    parser.add_argument("--threshold", type=float, default=COPY_THRESHOLD,
+                        help="peak allocation, as a fraction of the frame's "
+                             "shallow size, that counts as a full copy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    quiet_bare_mode()
+    df = make_dataset(args.rows, args.seed)
+    print(f"Frame: {len(df):,} rows, {frame_bytes(df) / 2**20:.1f}MiB shallow, "
+          f"{frame_bytes(df, deep=True) / 2**20:.1f}MiB deep")
+    print(f"{'component':<42}{'peak':>12}{'retained':>12}{'ratio':>8}")
+
+    failures = []
+    for name in args.components:
+        clear_caches()
+        record = check_component(name, df, args.threshold)
+        ratio = record["peak_bytes"] / record["frame_bytes"]
+        print(f"{name:<42}{record['peak_bytes'] / 2**20:>10.1f}Mi"
+              f"{record['retained_bytes'] / 2**20:>10.1f}Mi{ratio:>8.2f}")
+        if record["copy_suspected"]:
+            failures.append(f"{name} allocated {ratio:.2f}x the frame; "
+                            "largest retained: "
+                            + "; ".join(record["top_allocations"]))
+        if record["mutated"]:
+            failures.append(f"{name} changed the columns of its input frame")
+            df = make_dataset(args.rows, args.seed)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        return 1
+    print(f"No full-frame copies above {args.threshold:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Write the survey data as time partitions and check their date range queries.
+
+Loads a raw survey CSV or Parquet file (the shipped processed CSV by
+default), splits it into partitions of ``Datetime`` and writes one Parquet
+file per partition with their pre-aggregates and a manifest. With
+``--check`` the partitions are reopened from disk, and the rows and
+aggregates of a set of date ranges are compared with a full scan of the
+frame by the pandas helpers.
+
+Usage (from the src directory):
+    python -m tools.partition_data partitions/ --source waves.parquet --freq M --check
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from tools.build_database import HELPERS, compare
+from utils.data_processing import CSV_FILE_PATH, process_data
+from utils.partitions import PARTITION_FREQ, PRE_AGGREGATES, TimePartitions
+from utils.survey_db import read_source, source_version
+
+def check_ranges(df):
+    """Return date ranges covering all, none, and parts of the partitions"""
+    first, last = df["Datetime"].min(), df["Datetime"].max()
+    span = last - first
+    return [
+        (first, last + pd.Timedelta(seconds=1)),
+        (first + span / 3, first + span / 2),
+        (first.normalize() + pd.Timedelta(days=1),
+         first.normalize() + pd.Timedelta(days=2)),
+        (last + pd.Timedelta(days=1), last + pd.Timedelta(days=2)),
+    ]
+
+
+def check(partitions, df):
+    """
+    Compare date range queries on the partitions with full scans.
+
+    Selections are compared on their row labels and the columns the
+    pre-aggregates read, so a range over the whole archive is not held in
+    memory three times.
+    """
+    columns = ["Datetime", *sorted({col for keys, cols in PRE_AGGREGATES.values()
+                                    for col in [*keys, *cols]})]
+    df = df[columns]
+    failures = []
+    for start, end in check_ranges(df):
+        label = f"{start:%Y-%m-%d %H:%M} .. {end:%Y-%m-%d %H:%M}"
+        inside, cut = partitions.prune(start, end)
+
+        begin = time.perf_counter()
+        rows = df[(df["Datetime"] >= start) & (df["Datetime"] < end)]
+        expected = {name: helper(rows, None)
+                    for name, helper in HELPERS.items()}
+        scanned = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        results = {name: partitions.aggregate(name, start, end)
+                   for name in PRE_AGGREGATES}
+        aggregated = time.perf_counter() - begin
+        selected = partitions.select(start, end, columns)
+
+        for name, result in results.items():
+            if isinstance(result, pd.Series):
+                result = result.reset_index(name="count")
+            failure = compare(f"{name} {label}", expected[name], result)
+            if failure:
+                failures.append(failure)
+        failure = compare(f"select {label}", rows, selected)
+        if failure:
+            failures.append(failure)
+        if not selected.index.equals(rows.index):
+            failures.append(f"select {label}: row labels differ")
+
+        print(f"{label:<36}{len(rows):>10,}{len(inside):>7}{len(cut):>5}"
+              f"{scanned:>9.3f}s{aggregated:>9.3f}s")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="directory to write the partitions to")
+    parser.add_argument("--source", default=CSV_FILE_PATH,
+                        help="raw survey CSV or .parquet file")
+    parser.add_argument("--freq", default=PARTITION_FREQ,
+                        help="partition period, e.g. D, W, M or Y")
+    parser.add_argument("--check", action="store_true",
+                        help="compare date range queries with full scans")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = process_data(pd.concat(read_source(args.source), ignore_index=True))
+    partitions = TimePartitions.build(df, source_version(args.source),
+                                      args.freq)
+    partitions.write(args.output)
+    print(f"Wrote {len(partitions.stats)} partitions of {len(df):,} rows to "
+          f"{args.output} (version {partitions.version}) "
+          f"in {time.perf_counter() - start:.1f}s")
+    if not args.check:
+        return 0
+
+    print(f"{'range':<36}{'rows':>10}{'whole':>7}{'cut':>5}"
+          f"{'scan':>10}{'parts':>10}")
+    failures = check(TimePartitions.open(args.output), df)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Start the dashboard with its caches warmed at server start.
+
+Equivalent to ``streamlit run app.py`` but begins the background cache
+warm-up as soon as the Streamlit runtime is up, before the first session
+connects. Extra arguments are passed through to ``streamlit run``.
+
+Usage (from the src directory):
+    python -m tools.serve --server.port 8501
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).parent.parent / "app.py"
+
+
+def warm_when_ready(poll_interval=0.1):
+    """Wait for the Streamlit runtime to start, then launch the warm-up"""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.runtime import RuntimeState
+
+    while not (Runtime.exists() and Runtime.instance().state in (
+            RuntimeState.NO_SESSIONS_CONNECTED,
+            RuntimeState.ONE_OR_MORE_SESSIONS_CONNECTED)):
+        time.sleep(poll_interval)
+
+    from utils.warmup import start_warmup
+    start_warmup()
+
+
+def main(argv=None):
+    from streamlit.web import cli
+
+    threading.Thread(target=warm_when_ready, name="warmup-launcher",
+                     daemon=True).start()
+    sys.argv = ["streamlit", "run", str(APP_PATH),
+                *(sys.argv[1:] if argv is None else argv)]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
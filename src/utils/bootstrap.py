@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.cache import persistent_cache
+
+# Resamples drawn per task; fixed so results do not depend on the worker count
+CHUNK_RESAMPLES = 250
+# Upper bound on the (resamples x rows) index matrix materialized at once
+BATCH_CELLS = 4_000_000
+# Total work (resamples x rows) above which chunks go to a process pool
+PARALLEL_THRESHOLD = 50_000_000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """
+    Return the process pool shared by every bootstrap in this process.
+
+    It is started on first use and reused afterwards, so a server pays for
+    its worker processes once. Workers are started by a fork server where
+    available rather than forked from the multi-threaded server process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else None)
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=context)
+        return _pool
+
+
+def _resample_means(values, offsets, sizes, n_boot, seed):
+    """
+    Draw bootstrap resamples of every group at once and return their means.
+
+    ``values`` must be sorted by group, with group ``g`` occupying
+    ``values[offsets[g]:offsets[g] + sizes[g]]``. Each resample is one row of
+    an index matrix in which every column draws from its own group's slice,
+    so group sums reduce to a single ``np.add.reduceat`` per batch.
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.repeat(offsets, sizes)
+    lengths = np.repeat(sizes, sizes)
+    batch = max(1, BATCH_CELLS // len(values))
+
+    means = []
+    for start in range(0, n_boot, batch):
+        draws = rng.random((min(batch, n_boot - start), len(values)))
+        index = starts + (draws * lengths).astype(np.intp)
+        means.append(np.add.reduceat(values[index], offsets, axis=1) / sizes)
+    return np.vstack(means)
+
+
+def bootstrap_means(values, by, n_boot=1000, ci=95, seed=0):
+    """
+    Compute percentile bootstrap confidence intervals for group means.
+
+    All groups are resampled together in vectorized batches. When the total
+    work is large, batches are spread over the shared process pool; chunks
+    and their seeds are fixed up front, so the result is the same either
+    way.
+
+    Args:
+        values (pd.Series): Metric to average
+        by (list): Series to group by, aligned with ``values``
+        n_boot (int): Number of bootstrap resamples
+        ci (float): Confidence level in percent
+        seed (int): Seed for the resampling
+
+    Returns:
+        pd.DataFrame: ``count``, ``mean``, ``low`` and ``high`` per group,
+        empty when no row has the metric and every key
+    """
+    valid = values.notna()
+    for key in by:
+        valid &= key.notna()
+    values = values[valid]
+    by = [key[valid] for key in by]
+
+    grouped = values.groupby(by, observed=True, sort=True)
+    if values.empty:
+        # No group to resample, e.g. a selection whose metric is all missing
+        return pd.DataFrame({
+            "count": np.zeros(0, dtype=np.intp),
+            "mean": np.zeros(0),
+            "low": np.zeros(0),
+            "high": np.zeros(0),
+        }, index=grouped.size().index)
+    codes = grouped.ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    sizes = np.bincount(codes[order])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    sorted_values = values.to_numpy(dtype=float)[order]
+
+    chunks = [min(CHUNK_RESAMPLES, n_boot - start)
+              for start in range(0, n_boot, CHUNK_RESAMPLES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = [(sorted_values, offsets, sizes, chunk, chunk_seed)
+            for chunk, chunk_seed in zip(chunks, seeds)]
+
+    if n_boot * len(sorted_values) > PARALLEL_THRESHOLD and len(chunks) > 1:
+        results = list(_get_pool().map(_resample_means, *zip(*args)))
+    else:
+        results = [_resample_means(*arg) for arg in args]
+
+    low, high = np.percentile(np.vstack(results),
+                              [(100 - ci) / 2, (100 + ci) / 2], axis=0)
+    return pd.DataFrame({
+        "count": sizes,
+        "mean": grouped.mean().to_numpy(),
+        "low": low,
+        "high": high,
+    }, index=grouped.size().index)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+@persistent_cache
+def get_bootstrap_ci(_df, by, metric, version, n_boot=1000, ci=95):
+    """
+    Return bootstrap confidence intervals of a metric's group means.
+
+    Cached per grouping, metric and version; the frame itself is not
+    hashed, so ``version`` must identify the rows it holds.
+
+    Args:
+        _df (pd.DataFrame): Survey rows (not hashed)
+        by (tuple): Columns to group by
+        metric (str): Column to average
+        version (str): Version of ``_df``, from ``get_data_version``
+        n_boot (int): Number of bootstrap resamples
+        ci (float): Confidence level in percent
+
+    Returns:
+        pd.DataFrame: ``count``, ``mean``, ``low`` and ``high`` per group
+    """
+    return bootstrap_means(_df[metric], [_df[col] for col in by], n_boot, ci)
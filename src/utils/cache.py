@@ -0,0 +1,317 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# Second-level cache of computed aggregates, kept in the SQLite file at
+# DASHBOARD_CACHE_PATH so restarted and additional workers start warm;
+# disabled when unset
+CACHE_PATH = os.environ.get("DASHBOARD_CACHE_PATH")
+# Total size of the stored values above which the least recently used
+# entries are evicted
+CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_CACHE_MAX_MB", 512)) * 2**20
+# Milliseconds a process waits for another one's write to finish
+BUSY_TIMEOUT = 30_000
+# Seconds a hit may leave an entry's recency stale; only hits on entries
+# not touched for longer write, so hits are mostly plain reads
+ACCESS_GRANULARITY = 60
+
+
+def keyed_lru_cache(maxsize=128):
+    """
+    Memoize a function in a bounded, thread-safe LRU cache.
+
+    Like ``st.cache_data``, parameters whose name starts with an underscore
+    are left out of the cache key, so large inputs (DataFrames, aggregate
+    tables) can be passed next to the small hashable values that identify
+    them, e.g. a dataset version and the active filters. Cached values are
+    returned as-is and must be treated as read-only. Concurrent callers
+    missing the same key wait for the in-flight computation instead of
+    repeating it.
+
+    Args:
+        maxsize (int): Maximum number of entries kept before the least
+            recently used one is evicted
+
+    Returns:
+        callable: Decorator exposing ``cache_info()`` and ``cache_clear()``
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        key_params = [name for name in signature.parameters
+                      if not name.startswith("_")]
+        entries = OrderedDict()
+        lock = threading.Lock()
+        key_locks = defaultdict(threading.Lock)
+        stats = {"hits": 0, "misses": 0}
+
+        def lookup(key):
+            with lock:
+                if key in entries:
+                    entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return True, entries[key]
+            return False, None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments[name] for name in key_params)
+
+            found, value = lookup(key)
+            if found:
+                return value
+
+            with lock:
+                key_lock = key_locks[key]
+            with key_lock:
+                try:
+                    # Another caller may have computed the value meanwhile
+                    found, value = lookup(key)
+                    if found:
+                        return value
+
+                    with lock:
+                        stats["misses"] += 1
+                    value = func(*args, **kwargs)
+
+                    with lock:
+                        entries[key] = value
+                        entries.move_to_end(key)
+                        while len(entries) > maxsize:
+                            entries.popitem(last=False)
+                finally:
+                    # Also when func raises, so failing keys leave no lock
+                    with lock:
+                        key_locks.pop(key, None)
+            return value
+
+        def cache_info():
+            with lock:
+                return {**stats, "size": len(entries), "maxsize": maxsize}
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+                key_locks.clear()
+                stats.update(hits=0, misses=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+class PersistentCache:
+    """
+    Size-bounded LRU key-value store in a SQLite file.
+
+    Values are pickled. The file is opened in WAL mode and every write is a
+    single transaction, so several worker processes can share it: readers
+    never see a partial value, never wait for writers, and concurrent
+    writers wait for each other. Recency is tracked per entry, to within
+    ``ACCESS_GRANULARITY`` seconds, and once the stored values exceed
+    ``max_bytes`` the least recently used ones are deleted.
+    """
+
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0,
+                      "errors": 0}
+        # A connection must not be used across fork; children open their own
+        os.register_at_fork(after_in_child=self._forget_connections)
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                       "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                       "size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed "
+                       "ON entries (accessed)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _forget_connections(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def get(self, key):
+        """Return ``(True, value)`` for a stored key, else ``(False, None)``"""
+        try:
+            db = self._connection()
+            # A read outside any transaction, which takes no write lock
+            row = db.execute("SELECT value, accessed FROM entries "
+                             "WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] > ACCESS_GRANULARITY:
+                self._touch(db, key, now)
+            value = pickle.loads(row[0]) if row is not None else None
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError,
+                AttributeError, ImportError):
+            self._count("errors")
+            row = value = None
+        self._count("hits" if row is not None else "misses")
+        return row is not None, value
+
+    def _touch(self, db, key, now):
+        """Mark a stale entry as recently used; a failure only skips it"""
+        try:
+            db.execute("UPDATE entries SET accessed = ? "
+                       "WHERE key = ? AND accessed < ?",
+                       (now, key, now - ACCESS_GRANULARITY))
+        except sqlite3.Error:
+            pass
+
+    def set(self, key, value):
+        """Store a value, evicting least recently used entries over the bound"""
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self._count("errors")
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        try:
+            with self._transaction() as db:
+                db.execute("INSERT OR REPLACE INTO entries "
+                           "VALUES (?, ?, ?, ?)",
+                           (key, data, len(data), time.time()))
+                total = db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                evicted = []
+                if total > self.max_bytes:
+                    # Oldest first, read only as far as needed
+                    for old_key, size in db.execute(
+                            "SELECT key, size FROM entries ORDER BY accessed"):
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append((old_key,))
+                        total -= size
+                    db.executemany("DELETE FROM entries WHERE key = ?",
+                                   evicted)
+        except sqlite3.Error:
+            self._count("errors")
+            return
+        self._count("writes")
+        self._count("evictions", len(evicted))
+
+    def info(self):
+        """
+        Return the counters with the current entry count and size, which
+        are None when the file cannot be read
+        """
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            self._count("errors")
+            entries = size = None
+        with self._lock:
+            return {**self.stats, "entries": entries, "bytes": size,
+                    "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """Delete every entry and reset the counters"""
+        try:
+            with self._transaction() as db:
+                db.execute("DELETE FROM entries")
+        except sqlite3.Error:
+            self._count("errors")
+            return
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+
+class _Transaction:
+    """Run a block in an immediate transaction of a connection"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, *exc_info):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
+
+
+PERSISTENT_CACHE = PersistentCache(CACHE_PATH) if CACHE_PATH else None
+
+
+def _canonical(value):
+    """Return a form of a cache key argument whose repr is stable across processes"""
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted((_canonical(v) for v in value), key=repr)))
+    if isinstance(value, (tuple, list)):
+        return tuple(_canonical(v) for v in value)
+    return value
+
+
+def persistent_cache(func):
+    """
+    Keep a function's results in the persistent cache.
+
+    Apply below ``st.cache_*`` or ``keyed_lru_cache`` so the persistent
+    cache is only consulted on an in-process miss. As with those, parameters
+    starting with an underscore are left out of the key, so the others must
+    identify the result, e.g. through a dataset version. The key also holds
+    the function's source, so changing the function invalidates its
+    entries. Returns ``func`` unchanged when no cache path is configured.
+    """
+    if PERSISTENT_CACHE is None:
+        return func
+
+    signature = inspect.signature(func)
+    key_params = [name for name in signature.parameters
+                  if not name.startswith("_")]
+    try:
+        source = inspect.getsource(func)
+    except OSError:
+        source = ""
+    prefix = (f"{func.__module__}.{func.__qualname__}:"
+              f"{hashlib.blake2b(source.encode()).hexdigest()[:16]}")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = repr(tuple(_canonical(bound.arguments[name])
+                         for name in key_params))
+        key = f"{prefix}:{hashlib.blake2b(key.encode()).hexdigest()}"
+
+        found, value = PERSISTENT_CACHE.get(key)
+        if found:
+            return value
+        value = func(*args, **kwargs)
+        PERSISTENT_CACHE.set(key, value)
+        return value
+
+    return wrapper
@@ -0,0 +1,382 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data_processing import derive_version, get_data_version, tag_version
+
+# Dimensions a crossfilter holds; each owns one bit of the per-row filter mask
+MAX_DIMENSIONS = 8
+# Normal quantile of the two-sided 95% intervals of group means
+INTERVAL_Z = 1.96
+
+
+@st.cache_resource(max_entries=32)
+def get_dimension_index(_df, version, name, _values=None):
+    """
+    Sort the rows of a dimension, once per dataset version.
+
+    Shared by every session's crossfilter. Numeric values are sorted as
+    they are, with missing values last; other values are replaced by their
+    code among the sorted distinct values, with missing values first.
+
+    Args:
+        _df (pd.DataFrame): Survey data (not hashed)
+        version (str): Dataset version the index is cached under
+        name (str): Dimension name; the column it indexes unless ``_values``
+            is given
+        _values (callable): Derives the dimension's values from the frame
+
+    Returns:
+        dict: Row positions in value ``order``, the sorted ``keys`` and the
+        ``categories`` the codes refer to (None for numeric values)
+    """
+    values = _df[name] if _values is None else _values(_df)
+    if (pd.api.types.is_numeric_dtype(values)
+            and not isinstance(values.dtype, pd.CategoricalDtype)):
+        keys, categories = values.to_numpy(dtype=float), None
+    else:
+        keys, categories = pd.factorize(values, sort=True)
+        categories = list(categories)
+    order = np.argsort(keys, kind="stable")
+    return {"order": order, "keys": keys[order], "categories": categories}
+
+
+@st.cache_resource(max_entries=32)
+def get_group_index(_df, version, name, columns, _by=None):
+    """
+    Assign the rows of a group to its keys, once per dataset version.
+
+    Shared by every session's crossfilter, along with the reductions of
+    all rows that a group without active filters starts from.
+
+    Args:
+        _df (pd.DataFrame): Survey data (not hashed)
+        version (str): Dataset version the index is cached under
+        name (str): Group name; it must identify the grouping
+        columns (tuple): Columns whose sums are kept per key
+        _by (tuple or callable): Key columns, or a function deriving a
+            frame of key columns from the data
+
+    Returns:
+        dict: Per-row key ``codes``, key ``labels``, the ``values`` and
+        ``present`` arrays of ``columns`` and the ``totals`` of all rows
+    """
+    keys = _by(_df) if callable(_by) else _df[list(_by)]
+    grouper = keys.groupby(list(keys.columns), sort=True, observed=True)
+    labels = grouper.size().index.to_frame(index=False)
+    # Rows missing a key fall into a trailing bin that is never reported
+    codes = grouper.ngroup().to_numpy()
+    codes = np.where(codes < 0, len(labels), codes)
+
+    values = _df[list(columns)].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.0)
+    index = {"codes": codes, "labels": labels, "values": values,
+             "present": present}
+    index["totals"] = reduce_rows(index, np.arange(len(codes)))
+    return index
+
+
+def reduce_rows(index, rows):
+    """
+    Reduce rows of a group to their count and the count, sum and sum of
+    squares of every column per key.
+
+    Returns:
+        dict: Arrays with one entry per key, plus the missing-key bin
+    """
+    bins = len(index["labels"]) + 1
+    codes = index["codes"][rows]
+    reductions = {"count": np.bincount(codes, minlength=bins)}
+    values, present = index["values"][rows], index["present"][rows]
+    # Weighted bincounts of no rows are integers; keep them float, as rows
+    # are later added to them
+    for i in range(values.shape[1]):
+        reductions[("count", i)] = np.bincount(
+            codes, present[:, i], minlength=bins).astype(float)
+        reductions[("sum", i)] = np.bincount(
+            codes, values[:, i], minlength=bins).astype(float)
+        reductions[("sumsq", i)] = np.bincount(
+            codes, values[:, i] ** 2, minlength=bins).astype(float)
+    return reductions
+
+
+def _subtract_intervals(a, b):
+    """Return the parts of sorted disjoint intervals ``a`` outside ``b``"""
+    result = []
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while start < end:
+            if k == len(b) or b[k][0] >= end:
+                result.append((start, end))
+                break
+            if b[k][0] > start:
+                result.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            k += 1
+    return result
+
+
+class Dimension:
+    """
+    A filterable column of a crossfilter.
+
+    The rows passing its filter are kept as intervals of its sorted index,
+    so a new filter is applied by comparing its intervals with the previous
+    ones: only the rows of the intervals that differ enter or leave the
+    filter.
+    """
+
+    def __init__(self, crossfilter, name, bit, index):
+        self.crossfilter = crossfilter
+        self.name = name
+        self.bit = bit
+        self.index = index
+        self._all = [(0, len(index["order"]))]
+        self._intervals = self._all
+
+    @property
+    def categories(self):
+        """Distinct values of a non-numeric dimension, in code order"""
+        return self.index["categories"]
+
+    def has_filter(self):
+        return self._intervals != self._all
+
+    def filter_all(self):
+        """Clear the filter"""
+        self._set(self._all)
+
+    def filter_in(self, values):
+        """Keep the rows whose value is one of ``values``"""
+        keys = self.index["keys"]
+        if self.categories is not None:
+            codes = {value: code for code, value in enumerate(self.categories)}
+            values = [codes[value] for value in values if value in codes]
+        intervals = []
+        for value in sorted(set(values)):
+            start = int(np.searchsorted(keys, value, side="left"))
+            end = int(np.searchsorted(keys, value, side="right"))
+            if start < end:
+                intervals.append((start, end))
+        self._set(intervals)
+
+    def filter_exact(self, value):
+        """Keep the rows whose value equals ``value``"""
+        self.filter_in([value])
+
+    def filter_range(self, low, high):
+        """Keep the rows with ``low <= value < high`` (numeric dimensions)"""
+        keys = self.index["keys"]
+        start = int(np.searchsorted(keys, low, side="left"))
+        end = int(np.searchsorted(keys, high, side="left"))
+        self._set([(start, end)] if start < end else [])
+
+    def group(self, name, by=None, columns=()):
+        """
+        Register a group that observes every filter but this dimension's.
+
+        Args:
+            name (str): Group name; it must identify the grouping
+            by (tuple or callable): Key columns, this dimension's column
+                by default
+            columns (tuple): Columns whose sums are kept per key
+        """
+        return self.crossfilter.group(name, by or (self.name,), columns,
+                                      dimension=self)
+
+    def _set(self, intervals):
+        if intervals == self._intervals:
+            return
+        order = self.index["order"]
+
+        def positions(parts):
+            if not parts:
+                return np.empty(0, dtype=np.intp)
+            return np.concatenate([order[start:end] for start, end in parts])
+
+        added = positions(_subtract_intervals(intervals, self._intervals))
+        removed = positions(_subtract_intervals(self._intervals, intervals))
+        self._intervals = intervals
+        self.crossfilter._update(self, added, removed)
+
+
+class Group:
+    """
+    Reductions per key of the rows passing a crossfilter's filters.
+
+    Updated by adding the rows that enter the filters and subtracting those
+    that leave them, so its cost follows the rows that change rather than
+    the rows that pass.
+    """
+
+    def __init__(self, crossfilter, name, index, columns, dimension=None):
+        self.crossfilter = crossfilter
+        self.name = name
+        self.index = index
+        self.columns = list(columns)
+        self.dimension = dimension
+        # Filter bits this group observes
+        self.mask = np.uint8(0xFF & ~(dimension.bit if dimension else 0))
+        self.reductions = {key: value.copy()
+                           for key, value in index["totals"].items()}
+
+    def is_filtered(self):
+        """Whether a filter this group observes is active"""
+        return any(dimension.has_filter()
+                   for dimension in self.crossfilter.dimensions.values()
+                   if dimension is not self.dimension)
+
+    def _add(self, rows, sign):
+        if len(rows):
+            for key, value in reduce_rows(self.index, rows).items():
+                self.reductions[key] += sign * value
+
+    def all(self):
+        """
+        Return the reductions of the keys with rows.
+
+        Returns:
+            pd.DataFrame: Key columns, ``count`` and per column its mean,
+            ``<col>_count``, ``<col>_sum``, ``<col>_sumsq`` and the
+            ``<col>_low`` and ``<col>_high`` bounds of its 95% interval
+        """
+        keys = len(self.index["labels"])
+        result = self.index["labels"].copy()
+        result["count"] = self.reductions["count"][:keys]
+        for i, col in enumerate(self.columns):
+            for stat in ["count", "sum", "sumsq"]:
+                result[f"{col}_{stat}"] = self.reductions[(stat, i)][:keys]
+        result = result[result["count"] > 0].reset_index(drop=True)
+        return summarize(result, self.columns)
+
+
+def summarize(reductions, columns):
+    """
+    Add the mean and normal 95% interval of columns to their reductions.
+
+    Reductions can be summed over keys before they are summarized.
+    """
+    reductions = reductions.copy()
+    for col in columns:
+        count = reductions[f"{col}_count"]
+        total, squares = reductions[f"{col}_sum"], reductions[f"{col}_sumsq"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / count
+            variance = np.maximum(squares - total * mean, 0) / (count - 1)
+            margin = INTERVAL_Z * np.sqrt(variance / count)
+        reductions[col] = mean.where(count > 0)
+        margin = margin.where(count > 1)
+        reductions[f"{col}_low"] = reductions[col] - margin
+        reductions[f"{col}_high"] = reductions[col] + margin
+    return reductions
+
+
+class Crossfilter:
+    """
+    Filters on several dimensions of a frame with linked groups.
+
+    Every row holds a bit per dimension that is set while the dimension's
+    filter excludes it. A group observes every dimension but its own, as a
+    chart brushed on a dimension still shows the values outside its brush.
+    When a filter changes, only the rows entering or leaving it are checked
+    against the other filters and added to or subtracted from the groups.
+
+    The sorted dimension indexes, group keys and unfiltered reductions are
+    shared between sessions; a crossfilter itself holds the filter mask, one
+    byte per row, and the reductions of its groups.
+    """
+
+    def __init__(self, df, version):
+        self._df = df
+        self.version = version
+        self.filters = np.zeros(len(df), dtype=np.uint8)
+        self.dimensions = {}
+        self.groups = {}
+
+    def dimension(self, name, values=None):
+        """
+        Return a dimension, registering it on first use.
+
+        Args:
+            name (str): Column, or name of the derived values
+            values (callable): Derives the values from the frame; the
+                column ``name`` when omitted
+        """
+        if name not in self.dimensions:
+            if len(self.dimensions) == MAX_DIMENSIONS:
+                raise ValueError(
+                    f"A crossfilter holds at most {MAX_DIMENSIONS} dimensions")
+            index = get_dimension_index(self._df, self.version, name, values)
+            self.dimensions[name] = Dimension(
+                self, name, 1 << len(self.dimensions), index)
+        return self.dimensions[name]
+
+    def group(self, name, by, columns=(), dimension=None):
+        """
+        Return a group, registering it on first use.
+
+        A group registered while filters are active starts from the rows
+        passing them; otherwise it starts from the shared totals.
+
+        Args:
+            name (str): Group name; it must identify the grouping
+            by (tuple or callable): Key columns, or a function deriving a
+                frame of key columns from the data
+            columns (tuple): Columns whose sums are kept per key
+            dimension (Dimension): Dimension whose filter the group ignores
+        """
+        if name not in self.groups:
+            index = get_group_index(self._df, self.version, name,
+                                    tuple(columns), by)
+            group = Group(self, name, index, columns, dimension)
+            if group.is_filtered():
+                rows = np.flatnonzero((self.filters & group.mask) == 0)
+                group.reductions = reduce_rows(index, rows)
+            self.groups[name] = group
+        return self.groups[name]
+
+    def rows(self):
+        """Return the rows passing every filter, tagged with their version"""
+        spec = tuple((name, tuple(dimension._intervals))
+                     for name, dimension in self.dimensions.items()
+                     if dimension.has_filter())
+        rows = self._df.take(np.flatnonzero(self.filters == 0))
+        return tag_version(rows, derive_version(self.version,
+                                                ("crossfilter", spec)))
+
+    def _update(self, dimension, added, removed):
+        bit = np.uint8(dimension.bit)
+        groups = [group for group in self.groups.values()
+                  if group.dimension is not dimension]
+
+        if len(removed):
+            before = self.filters[removed]
+            for group in groups:
+                group._add(removed[(before & group.mask) == 0], -1)
+            self.filters[removed] = before | bit
+
+        if len(added):
+            after = self.filters[added] & ~bit
+            self.filters[added] = after
+            for group in groups:
+                group._add(added[(after & group.mask) == 0], 1)
+
+
+def get_crossfilter(df, name):
+    """
+    Return the session's crossfilter of a page, for the data's version.
+
+    Panels register their dimensions and groups on it once; a new dataset
+    version starts a new crossfilter.
+    """
+    version = get_data_version(df)
+    key = f"crossfilter_{name}"
+    crossfilter = st.session_state.get(key)
+    if crossfilter is None or crossfilter.version != version:
+        crossfilter = Crossfilter(df, version)
+        st.session_state[key] = crossfilter
+    return crossfilter
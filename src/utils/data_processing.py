@@ -1,33 +1,128 @@
+import hashlib
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 import json
-from PIL import Image
 import base64
 from io import BytesIO
 
+from utils.cache import keyed_lru_cache, persistent_cache
+from utils.instrumentation import cache_miss, instrumented
+
+logger = logging.getLogger(__name__)
+
 # Get the project root directory
 ROOT_DIR = Path(__file__).parent.parent.parent
 CSV_FILE_PATH = ROOT_DIR / "data" / "processed" / "processed_data.csv"
 GEO_JSON_PATH = ROOT_DIR / "data" / "raw" / "world-countries.json"
 GAME_LOGO_PATH = ROOT_DIR / "assets" / "game_logos"
+# SQLite database built by tools.build_database to load the survey from
+# instead of the CSV, so aggregates and filters are computed by SQLite
+DATABASE_PATH = os.environ.get("DASHBOARD_DATABASE", "")
+
+# Playstyle groups, matched in order against the raw Playstyle answer
+PLAYSTYLE_GROUPS = [
+    ("Singleplayer", "Single Player"),
+    ("Multiplayer - offline", "Multiplayer - offline (same room)"),
+    ("Multiplayer - online - with strangers",
+     "Multiplayer - online (with strangers)"),
+    ("Multiplayer - online - with online acquaintances",
+     "Multiplayer - online (with online acquaintances/teammates)"),
+    ("Multiplayer - online - with real life friends",
+     "Multiplayer - online (with real-life friends)"),
+]
+
+# Age group bins and their labels
+AGE_GROUP_BINS = [0, 22, 26, 30, 35, float("inf")]
+AGE_GROUP_LABELS = ["18-22", "22-26", "26-30", "30-35", "35+"]
+
+
+# Hex digits kept from the BLAKE2 digest of a version token
+VERSION_DIGITS = 16
+
+# Version tokens of frames, keyed by object id; an entry holds a weak
+# reference so it is dropped along with its frame
+_versions = {}
+_versions_lock = threading.Lock()
+
+# Aggregate functions of views whose aggregates are combined from
+# pre-aggregates rather than computed from rows, e.g. date ranges of time
+# partitions, keyed by the views' versions; the most recent VIEW_ENTRIES
+# are kept
+VIEW_ENTRIES = 256
+_view_aggregates = OrderedDict()
 
 
-@st.cache_data
 def load_data():
-    """Load and process the gaming survey data"""
-    df = pd.read_csv(CSV_FILE_PATH)
+    """
+    Load and process the gaming survey data.
 
+    The frame is shared by every session and rerun rather than copied for
+    each caller, so it must be treated as read-only; derive new columns on
+    a selection or in separate Series. It is reloaded when the CSV file
+    changes on disk.
+
+    With ``DASHBOARD_DATABASE`` set, the frame holds only the columns the
+    dashboard reads, loaded from that database, and is registered as a view
+    whose aggregates and ``filter_rows`` selections are queried from it.
+
+    Returns:
+        tuple: The processed frame and its version, a digest of the CSV (or
+        the database's source) that ``get_data_version`` also returns for
+        the frame
+    """
+    if DATABASE_PATH:
+        stat = os.stat(DATABASE_PATH)
+        df, version, view = load_database(
+            DATABASE_PATH, stat.st_size, stat.st_mtime_ns)
+        # Registered on every call, so the view outlives evictions
+        register_view_aggregates(version, view)
+        return df, version
+    stat = CSV_FILE_PATH.stat()
+    return load_dataset(stat.st_size, stat.st_mtime_ns)
+
+
+@instrumented
+@st.cache_resource(max_entries=1)
+@cache_miss
+def load_dataset(size, mtime_ns):
+    """Read the CSV file with the given size and modification time"""
+    data = CSV_FILE_PATH.read_bytes()
+    version = hashlib.blake2b(data).hexdigest()[:VERSION_DIGITS]
+    df = process_data(pd.read_csv(BytesIO(data)))
+    return tag_version(df, version), version
+
+
+@instrumented
+@st.cache_resource(max_entries=1)
+@cache_miss
+def load_database(path, size, mtime_ns):
+    """Read the dashboard columns of a survey database file"""
+    from utils.survey_db import DASHBOARD_COLUMNS, DatabaseView, SurveyDatabase
+
+    db = SurveyDatabase(path)
+    df = db.select(DASHBOARD_COLUMNS)
+    return tag_version(df, db.version), db.version, DatabaseView(db, db.version)
+
+
+@instrumented
+def process_data(df):
+    """Derive the dashboard columns from raw survey rows"""
     # Basic processing
     df["Datetime"] = pd.to_datetime(df["Datetime"])
 
     # Create age groups
     df["AgeGroup"] = pd.cut(
         df["Age"],
-        bins=[0, 22, 26, 30, 35, float("inf")],
-        labels=["18-22", "22-26", "26-30", "30-35", "35+"],
+        bins=AGE_GROUP_BINS,
+        labels=AGE_GROUP_LABELS,
     )
 
     # Process gaming platforms
@@ -44,13 +139,170 @@ def load_data():
         )
     )
 
+    df["Grouped_Playstyle"] = group_playstyles(df["Playstyle"])
+
+    return df
+
+
+@instrumented
+def group_playstyles(playstyles):
+    """Map raw Playstyle answers to their playstyle group"""
+    playstyles = playstyles.astype(str)
+    conditions = [playstyles.str.contains(pattern, regex=False)
+                  for pattern, _ in PLAYSTYLE_GROUPS]
+    groups = [group for _, group in PLAYSTYLE_GROUPS]
+    return pd.Series(np.select(conditions, groups, default="Others"),
+                     index=playstyles.index)
+
+
+def categorize_anxiety(scores):
+    """Categorize GAD scores into anxiety levels"""
+    return pd.Series(
+        np.select([scores <= 7, scores <= 14],
+                  ["Low Anxiety", "Moderate Anxiety"], default="High Anxiety"),
+        index=scores.index)
+
+
+def tag_version(df, version):
+    """
+    Attach a version token to a frame for ``get_data_version``.
+
+    The token must identify the frame's contents, e.g. a digest of its
+    source or a token from ``derive_version``, and the frame must not be
+    modified afterwards.
+
+    Returns:
+        pd.DataFrame: ``df`` itself
+    """
+    key = id(df)
+
+    def forget(ref):
+        with _versions_lock:
+            if _versions.get(key, (None,))[0] is ref:
+                del _versions[key]
+
+    with _versions_lock:
+        _versions[key] = (weakref.ref(df, forget), version)
     return df
 
 
-def get_country_stats(df):
+def derive_version(version, spec):
+    """
+    Return the version token of a view derived from a versioned frame.
+
+    Args:
+        version (str): Version of the source frame
+        spec: Hashable description of the derivation, e.g. a filter as a
+            tuple of (column, value) pairs; its ``repr`` is hashed
+
+    Returns:
+        str: Token combining the source version and the spec
+    """
+    return hashlib.blake2b(f"{version}|{spec!r}".encode()).hexdigest()[
+        :VERSION_DIGITS]
+
+
+@instrumented
+def get_data_version(df):
+    """
+    Return the token identifying the contents of a frame.
+
+    Frames from ``load_data`` and ``filter_rows`` are tagged when created,
+    so this is a dictionary lookup. Any other frame is hashed row by row on
+    the first call and tagged with the result, with a warning: frames
+    derived in the app should be tagged with ``derive_version`` instead.
+    """
+    with _versions_lock:
+        ref, version = _versions.get(id(df), (None, None))
+    if ref is not None and ref() is df:
+        return version
+
+    logger.warning("Hashing an untagged frame of %d rows; tag derived frames "
+                   "with tag_version(df, derive_version(...))", len(df),
+                   stack_info=logger.isEnabledFor(logging.DEBUG))
+    digest = hashlib.blake2b(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+    version = digest.hexdigest()[:VERSION_DIGITS]
+    tag_version(df, version)
+    return version
+
+
+def register_view_aggregates(version, aggregate):
+    """
+    Answer the aggregates of a versioned view without scanning its rows.
+
+    Args:
+        version (str): Version the view is tagged with
+        aggregate (callable): Takes an aggregate name (a key of
+            ``utils.partitions.PRE_AGGREGATES``, e.g. ``country_stats``) and
+            returns what the helper of that name returns for the view's
+            rows, or None to have it computed from the rows. It may also
+            have a ``select(columns, spec)`` method answering
+            ``filter_rows`` on the view, returning None to have the rows
+            masked instead
+    """
+    with _versions_lock:
+        _view_aggregates[version] = aggregate
+        _view_aggregates.move_to_end(version)
+        while len(_view_aggregates) > VIEW_ENTRIES:
+            _view_aggregates.popitem(last=False)
+
+
+def view_aggregate(version, name):
+    """Return an aggregate of a registered view, or None"""
+    with _versions_lock:
+        aggregate = _view_aggregates.get(version)
+    return aggregate(name) if aggregate is not None else None
+
+
+def view_select(version, columns, spec):
+    """Return the rows of a registered view matching a filter spec, or None"""
+    with _versions_lock:
+        select = getattr(_view_aggregates.get(version), "select", None)
+    return select(columns, spec) if select is not None else None
+
+
+def filter_rows(df, **equals):
+    """
+    Return the rows whose columns equal the given values.
+
+    The selection is cached per source version and filter, and tagged with
+    a derived version, so caches downstream key on it without hashing rows.
+
+    Args:
+        df (pd.DataFrame): Versioned survey data
+        **equals: Column names and the value each must equal
+
+    Returns:
+        pd.DataFrame: Selected rows, or ``df`` itself without filters
+    """
+    if not equals:
+        return df
+    return select_rows(df, get_data_version(df), tuple(sorted(equals.items())))
+
+
+@instrumented
+@keyed_lru_cache(maxsize=64)
+def select_rows(_df, version, spec):
+    """Select and tag the rows matching a filter spec of (column, value) pairs"""
+    rows = view_select(version, list(_df.columns), spec)
+    if rows is not None:
+        return rows
+    mask = np.logical_and.reduce(
+        [_df[col].to_numpy() == value for col, value in spec])
+    return tag_version(_df[mask], derive_version(version, spec))
+
+
+@instrumented
+@keyed_lru_cache(maxsize=32)
+@persistent_cache
+def get_country_stats(_df, version):
     """Calculate country-level statistics"""
+    stats = view_aggregate(version, "country_stats")
+    if stats is not None:
+        return stats
     return (
-        df.groupby("Residence_ISO3")
+        _df.groupby("Residence_ISO3")
         .agg(
             {
                 "GAD_T": "mean",
@@ -63,19 +315,31 @@ def get_country_stats(df):
     )
 
 
-def get_age_stats(df):
+@instrumented
+@keyed_lru_cache(maxsize=32)
+@persistent_cache
+def get_age_stats(_df, version):
     """Calculate age group statistics"""
+    stats = view_aggregate(version, "age_stats")
+    if stats is not None:
+        return stats
     return (
-        df.groupby("AgeGroup")
+        _df.groupby("AgeGroup", observed=False)
         .agg({"Hours": "mean", "GAD_T": "mean", "SWL_T": "mean"})
         .reset_index()
     )
 
 
-def get_platform_stats(df):
+@instrumented
+@keyed_lru_cache(maxsize=32)
+@persistent_cache
+def get_platform_stats(_df, version):
     """Calculate gaming platform statistics"""
+    stats = view_aggregate(version, "platform_stats")
+    if stats is not None:
+        return stats
     platform_stats = (
-        df.groupby(["Platform", "Playstyle"]).size().reset_index(name="count")
+        _df.groupby(["Platform", "Playstyle"]).size().reset_index(name="count")
     )
     platform_stats["percentage"] = platform_stats.groupby("Platform")[
         "count"
@@ -83,7 +347,9 @@ def get_platform_stats(df):
     return platform_stats
 
 
+@instrumented
 @st.cache_data
+@cache_miss
 def load_geojson():
     """Load and cache the world GeoJSON data"""
     try:
@@ -94,6 +360,7 @@ def load_geojson():
         return None
 
 
+@instrumented
 def get_country_names():
     """Get a mapping of country codes to names from the world GeoJSON"""
     world_geo = load_geojson()
@@ -107,7 +374,9 @@ def get_country_names():
     return {}
 
 
+@instrumented
 @st.cache_data
+@cache_miss
 def get_game_logo(game_name):
     """
     Return the base64 encoded image for a given game.
@@ -118,16 +387,17 @@ def get_game_logo(game_name):
     Returns:
         str: Base64 encoded image URL or None if logo not found
     """
+    from PIL import Image
+
     try:
         # Convert game name to filename format
         logo_path = GAME_LOGO_PATH / f"{game_name}.png"
 
-        # Debug print
-        print(f"Attempting to load logo from: {logo_path}")
+        logger.debug("Attempting to load logo from: %s", logo_path)
 
         # Check if file exists
         if not logo_path.exists():
-            print(f"Logo not found: {logo_path}")
+            logger.debug("Logo not found: %s", logo_path)
             return None
 
         # Open and process image
@@ -146,11 +416,11 @@ def get_game_logo(game_name):
         # Encode to base64
         img_str = base64.b64encode(buffered.getvalue()).decode()
 
-        print(f"Successfully processed logo for {game_name}")  # Debug print
+        logger.debug("Successfully processed logo for %s", game_name)
         return f"data:image/png;base64,{img_str}"
 
     except Exception as e:
-        print(f"Error processing logo for {game_name}: {str(e)}")
-        # Print the full path for debugging
-        print(f"Full path attempted: {GAME_LOGO_PATH.absolute()}")
+        logger.debug("Error processing logo for %s: %s (full path "
+                     "attempted: %s)", game_name, e,
+                     GAME_LOGO_PATH.absolute())
         return None
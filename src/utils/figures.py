@@ -0,0 +1,251 @@
+import base64
+import json
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from utils import instrumentation
+
+# Figures are compacted before they are sent unless DASHBOARD_COMPACT_FIGURES
+# is set to 0
+ENABLED = os.environ.get("DASHBOARD_COMPACT_FIGURES", "1") not in ("", "0")
+
+# Trace attributes drawn as positions or sizes. Their float arrays are sent
+# as float32 when that moves no value by more than FLOAT32_TOLERANCE of the
+# array's range, far below a pixel; other numbers (customdata, colors) are
+# only narrowed losslessly
+POSITION_KEYS = {"x", "y", "z", "r", "lat", "lon", "base", "width", "size",
+                 "array", "arrayminus"}
+FLOAT32_TOLERANCE = 1e-5
+# Attributes that are displayed as given, so they are never encoded
+TEXT_KEYS = {"text", "hovertext", "ids", "labels", "parents"}
+# Integer types plotly.js decodes, smallest first
+INT_TYPES = [("i1", np.int8), ("u1", np.uint8), ("i2", np.int16),
+             ("u2", np.uint16), ("i4", np.int32), ("u4", np.uint32)]
+# Arrays shorter than this are only encoded when that is smaller than JSON
+SMALL_ARRAY = 64
+# Trace attributes kept on every trace rather than moved to the template
+TRACE_IDENTITY = {"type", "name", "uid", "xaxis", "yaxis", "legendgroup"}
+
+
+class FigureStats:
+    """Serialized sizes of the figures sent, before and after compaction"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.figures = 0
+        self.original_bytes = 0
+        self.compact_bytes = 0
+
+    def add(self, original, compact):
+        with self.lock:
+            self.figures += 1
+            self.original_bytes += original
+            self.compact_bytes += compact
+
+    def summary(self):
+        with self.lock:
+            return {"figures": self.figures,
+                    "original_bytes": self.original_bytes,
+                    "compact_bytes": self.compact_bytes}
+
+
+FIGURE_STATS = FigureStats()
+
+
+class CompactFigure(go.Figure):
+    """
+    Figure serialized from a compacted spec.
+
+    Typed arrays are not valid property values for plotly.py, so the spec
+    bypasses validation: it was built from a validated figure, and
+    ``st.plotly_chart`` does not revalidate figures.
+    """
+
+    def __init__(self, spec):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return self._spec
+
+    def to_plotly_json(self):
+        return self._spec
+
+
+def _int_type(values):
+    """Return the smallest plotly.js integer type holding integral values"""
+    if values.dtype.kind == "f":
+        if not np.isfinite(values).all() or (values != np.round(values)).any():
+            return None
+    lo, hi = values.min(), values.max()
+    for code, dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return code, dtype
+    return None
+
+
+def encode_array(values, positional=False):
+    """
+    Return the plotly.js typed-array spec of a numeric array.
+
+    Integral values get the smallest integer type; other floats get float32
+    when ``positional`` and precise enough, float64 otherwise.
+
+    Returns:
+        dict: ``dtype``, base64 ``bdata`` and, for 2-D arrays, ``shape``;
+        None when the values are not numeric or JSON is shorter
+    """
+    try:
+        values = np.asarray(values)
+    except ValueError:
+        return None
+    if values.dtype.kind not in "iuf" or values.ndim not in (1, 2) \
+            or values.size == 0:
+        return None
+
+    int_type = _int_type(values)
+    if int_type:
+        code, dtype = int_type
+    else:
+        code, dtype = "f8", np.float64
+        finite = values[np.isfinite(values)]
+        if positional and finite.size:
+            narrowed = finite.astype(np.float32)
+            span = max(finite.max() - finite.min(), np.abs(finite).max())
+            if np.abs(narrowed - finite).max() <= FLOAT32_TOLERANCE * span:
+                code, dtype = "f4", np.float32
+
+    spec = {"dtype": code, "bdata": base64.b64encode(
+        values.astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+    ).decode("ascii")}
+    if values.ndim == 2:
+        spec["shape"] = f"{values.shape[0]},{values.shape[1]}"
+
+    if values.size < SMALL_ARRAY and len(json.dumps(spec)) >= len(
+            json.dumps(values.tolist())):
+        return None
+    return spec
+
+
+def _encode_arrays(container):
+    """Replace the numeric arrays of a trace, recursively, in place"""
+    for key, value in container.items():
+        if key in TEXT_KEYS:
+            continue
+        if isinstance(value, dict):
+            _encode_arrays(value)
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            spec = encode_array(value, positional=key in POSITION_KEYS)
+            if spec is not None:
+                container[key] = spec
+
+
+def _scalar_leaves(container, prefix=()):
+    """Yield (path, value) for the scalar attributes of a trace"""
+    for key, value in container.items():
+        if not prefix and key in TRACE_IDENTITY:
+            continue
+        # A typed array is a value; its dtype and shape describe its bytes
+        if isinstance(value, dict) and "bdata" not in value:
+            yield from _scalar_leaves(value, (*prefix, key))
+        elif isinstance(value, (str, bool, int, float)):
+            yield (*prefix, key), value
+
+
+def _pop_path(container, path):
+    """Remove a nested attribute, dropping containers left empty"""
+    if len(path) == 1:
+        container.pop(path[0], None)
+        return
+    child = container[path[0]]
+    _pop_path(child, path[1:])
+    if not child:
+        del container[path[0]]
+
+
+def _set_path(container, path, value):
+    for key in path[:-1]:
+        container = container.setdefault(key, {})
+    container[path[-1]] = value
+
+
+def share_trace_defaults(spec):
+    """
+    Move attributes repeated on every trace of a type into the template.
+
+    Plotly applies ``layout.template.data.<type>`` entries to the traces of
+    that type in turn, so a single entry acts as a default for all of them.
+    Types whose template already cycles through several entries are left
+    alone.
+    """
+    by_type = defaultdict(list)
+    for trace in spec.get("data", []):
+        by_type[trace.get("type", "scatter")].append(trace)
+
+    template = spec.setdefault("layout", {}).setdefault("template", {})
+    for trace_type, traces in by_type.items():
+        entries = template.get("data", {}).get(trace_type, [])
+        if len(traces) < 2 or len(entries) > 1:
+            continue
+
+        shared = dict(_scalar_leaves(traces[0]))
+        for trace in traces[1:]:
+            leaves = dict(_scalar_leaves(trace))
+            shared = {path: value for path, value in shared.items()
+                      if path in leaves and leaves[path] == value
+                      and type(leaves[path]) is type(value)}
+        if not shared:
+            continue
+
+        entries = template.setdefault("data", {}).setdefault(trace_type, [])
+        if not entries:
+            entries.append({})
+        for path, value in shared.items():
+            _set_path(entries[0], path, value)
+            for trace in traces:
+                _pop_path(trace, path)
+
+
+def compact_figure(fig):
+    """
+    Return a figure that serializes to a smaller payload.
+
+    Numeric trace arrays are sent as base64 typed arrays, narrowed where
+    precision allows, and attributes repeated on every trace of a type are
+    moved into the figure's template. With instrumentation enabled, the
+    sizes before and after are added to ``FIGURE_STATS``.
+
+    Args:
+        fig (go.Figure): Figure to compact; it is not modified
+
+    Returns:
+        CompactFigure: Figure holding the compacted spec
+    """
+    spec = fig.to_dict()
+    for trace in spec.get("data", []):
+        _encode_arrays(trace)
+    share_trace_defaults(spec)
+
+    if instrumentation.ENABLED:
+        FIGURE_STATS.add(len(fig.to_json()),
+                         len(pio.to_json(spec, validate=False)))
+    return CompactFigure(spec)
+
+
+def plotly_chart(fig, **kwargs):
+    """
+    ``st.plotly_chart`` sending the compacted figure, unless disabled.
+
+    The size of the figure sent is recorded by the instrumentation.
+    """
+    if ENABLED:
+        fig = compact_figure(fig)
+    with instrumentation.sending_chart(fig.to_json):
+        return st.plotly_chart(fig, **kwargs)
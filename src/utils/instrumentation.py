@@ -0,0 +1,340 @@
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import memory
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation is off unless DASHBOARD_METRICS (or DASHBOARD_MEMORY) is set;
+# the app then serves Prometheus text on
+# 127.0.0.1:DASHBOARD_METRICS_PORT/metrics and/or rewrites
+# DASHBOARD_METRICS_FILE, and shows the metrics under ?debug=metrics
+ENABLED = (os.environ.get("DASHBOARD_METRICS", "") not in ("", "0")
+           or memory.ENABLED)
+PORT = os.environ.get("DASHBOARD_METRICS_PORT")
+FILE = os.environ.get("DASHBOARD_METRICS_FILE")
+
+# Observations kept per function and measure for the rolling quantiles
+WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+# Seconds between rewrites of the metrics file
+FILE_INTERVAL = 10
+
+MEASURES = {
+    "seconds": "Wall time of the call",
+    "rows_in": "Rows in the first DataFrame or Series argument",
+    "rows_out": "Rows in the returned DataFrame or Series",
+    "payload_bytes": "Serialized size of the charts the call emitted",
+}
+
+_local = threading.local()
+# Functions whose misses ``cache_miss`` flags, by qualified name
+_miss_flagged = set()
+
+
+class FunctionMetrics:
+    """Rolling observations and counters of one instrumented function"""
+
+    def __init__(self):
+        self.windows = {measure: deque(maxlen=WINDOW) for measure in MEASURES}
+        self.sums = dict.fromkeys(MEASURES, 0.0)
+        self.counts = dict.fromkeys(MEASURES, 0)
+        self.calls = 0
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+
+    def observe(self, measure, value):
+        self.windows[measure].append(value)
+        self.sums[measure] += value
+        self.counts[measure] += 1
+
+    def quantiles(self, measure):
+        window = self.windows[measure]
+        if not window:
+            return [np.nan] * len(QUANTILES)
+        return list(np.quantile(np.fromiter(window, float), QUANTILES))
+
+
+class MetricsRegistry:
+    """Thread-safe store of the metrics of every instrumented function"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.functions = {}
+
+    def record(self, name, seconds, rows_in, rows_out, payload, cached, error):
+        with self.lock:
+            metrics = self.functions.setdefault(name, FunctionMetrics())
+            metrics.calls += 1
+            metrics.errors += error
+            if cached is not None:
+                metrics.hits += cached
+                metrics.misses += not cached
+            metrics.observe("seconds", seconds)
+            for measure, value in (("rows_in", rows_in), ("rows_out", rows_out),
+                                   ("payload_bytes", payload)):
+                if value is not None:
+                    metrics.observe(measure, value)
+
+    def summary(self):
+        """
+        Summarize the rolling windows of every function.
+
+        Returns:
+            pd.DataFrame: Calls, cache hit rate and p50/p95/p99 of every
+            measure, one row per function
+        """
+        rows = []
+        with self.lock:
+            for name, metrics in sorted(self.functions.items()):
+                row = {"function": name, "calls": metrics.calls,
+                       "errors": metrics.errors}
+                lookups = metrics.hits + metrics.misses
+                row["hit_rate"] = metrics.hits / lookups if lookups else np.nan
+                for measure in MEASURES:
+                    for q, value in zip(QUANTILES, metrics.quantiles(measure)):
+                        row[f"{measure}_p{round(q * 100)}"] = value
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            items = sorted(self.functions.items())
+            for measure, description in MEASURES.items():
+                metric = f"dashboard_{measure}"
+                lines += [f"# HELP {metric} {description}",
+                          f"# TYPE {metric} summary"]
+                for name, metrics in items:
+                    if not metrics.counts[measure]:
+                        continue
+                    for q, value in zip(QUANTILES, metrics.quantiles(measure)):
+                        lines.append(f'{metric}{{function="{name}",'
+                                     f'quantile="{q}"}} {value:.6g}')
+                    lines.append(f'{metric}_sum{{function="{name}"}} '
+                                 f'{metrics.sums[measure]:.6g}')
+                    lines.append(f'{metric}_count{{function="{name}"}} '
+                                 f'{metrics.counts[measure]}')
+
+            for counter, description in (("calls", "Calls"),
+                                         ("errors", "Calls that raised"),
+                                         ("hits", "Calls served from cache"),
+                                         ("misses", "Calls computed on a cache miss")):
+                metric = f"dashboard_{counter}_total"
+                lines += [f"# HELP {metric} {description}",
+                          f"# TYPE {metric} counter"]
+                for name, metrics in items:
+                    lines.append(f'{metric}{{function="{name}"}} '
+                                 f'{getattr(metrics, counter)}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def _frames():
+    if not hasattr(_local, "frames"):
+        _local.frames = []
+    return _local.frames
+
+
+def _record_payload(size):
+    """Attribute a chart payload to the innermost instrumented call"""
+    frames = _frames()
+    if frames:
+        frames[-1]["payload"] = (frames[-1]["payload"] or 0) + size
+
+
+@contextlib.contextmanager
+def sending_chart(serialize):
+    """
+    Wrap the call sending a chart (``utils.figures.plotly_chart``, the map's
+    ``st_folium`` call).
+
+    Attributes the serialized size of the chart to the innermost
+    instrumented call, and leaves the allocations of sending it out of the
+    memory accounting.
+
+    Args:
+        serialize (callable): Returns the chart as sent, as a string; only
+            called while an instrumented call is being recorded
+    """
+    if not ENABLED:
+        yield
+        return
+    with memory.untracked():
+        if _frames():
+            _record_payload(len(serialize()))
+        yield
+
+
+def cache_miss(func):
+    """
+    Flag the computations of a function under a Streamlit cache as misses.
+
+    Apply below ``st.cache_data`` or ``st.cache_resource``, with
+    ``instrumented`` above it. The cache only calls the function on a miss,
+    so an instrumented call is counted as a hit unless its computation
+    flags it.
+    """
+    if not ENABLED:
+        return func
+    _miss_flagged.add(_name(func))
+
+    @functools.wraps(func)
+    def flag_miss(*args, **kwargs):
+        frames = _frames()
+        if frames:
+            frames[-1]["cached"] = False
+        return func(*args, **kwargs)
+
+    return flag_miss
+
+
+def instrumented(func):
+    """
+    Record timing, row counts, cache hits and chart payloads of a function.
+
+    Apply above any caching decorator so cache hits are recorded too. Misses
+    are counted by the ``cache_info`` of a ``keyed_lru_cache`` function, or
+    flagged by ``cache_miss`` under a Streamlit cache. With memory
+    accounting enabled, the outermost instrumented call also records
+    its allocations. Returns ``func`` unchanged when instrumentation is
+    disabled.
+    """
+    if not ENABLED:
+        return func
+
+    name = _name(func)
+    if name in _miss_flagged:
+        cache = "flag"
+    elif hasattr(func, "cache_info"):
+        cache = "cache_info"
+    else:
+        cache = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        first = next(iter(args), None)
+        if first is None and kwargs:
+            first = next(iter(kwargs.values()))
+        frame = {"payload": None, "cached": True if cache == "flag" else None}
+        misses = func.cache_info()["misses"] if cache == "cache_info" else None
+        frames = _frames()
+        tracker = (memory.MemoryTracker(name, first)
+                   if memory.ENABLED and not frames
+                   else contextlib.nullcontext())
+        frames.append(frame)
+
+        start = time.perf_counter()
+        error = False
+        result = None
+        try:
+            with tracker:
+                result = func(*args, **kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            frames.pop()
+            if getattr(tracker, "record", None):
+                memory.MEMORY_LOG.add(tracker.record)
+            if misses is not None:
+                frame["cached"] = func.cache_info()["misses"] == misses
+            REGISTRY.record(name, seconds, _rows(first), _rows(result),
+                            frame["payload"], frame["cached"], error)
+            if frame["payload"] and frames:
+                _record_payload(frame["payload"])
+
+    for attr in ("clear", "cache_info", "cache_clear"):
+        if hasattr(func, attr):
+            setattr(wrapper, attr, getattr(func, attr))
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_metrics_file(path, interval):
+    failing = False
+    while True:
+        time.sleep(interval)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(REGISTRY.to_prometheus())
+            os.replace(tmp_path, path)
+        except OSError:
+            # Keep trying, as the file may become writable again, but only
+            # log the first of a run of failures
+            if not failing:
+                logger.exception("Could not write the metrics file %s", path)
+            failing = True
+        else:
+            failing = False
+
+
+@st.cache_resource(show_spinner=False)
+def start_exporter():
+    """
+    Start the metrics endpoint and file writer, once per process.
+
+    Returns:
+        ThreadingHTTPServer: The metrics server, or None when instrumentation
+        is disabled, no port is configured or the port is in use
+    """
+    if not ENABLED:
+        return None
+
+    if FILE:
+        threading.Thread(target=_write_metrics_file, args=(FILE, FILE_INTERVAL),
+                         name="metrics-file", daemon=True).start()
+    if not PORT:
+        return None
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", int(PORT)), _MetricsHandler)
+    except OSError as e:
+        # Returned rather than raised, so the failure is cached and the app
+        # runs without the endpoint, e.g. next to another server on the port
+        logger.warning("Metrics endpoint not started on port %s: %s", PORT, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server",
+                     daemon=True).start()
+    return server
@@ -0,0 +1,190 @@
+import contextlib
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+
+import pandas as pd
+
+# Per-call memory accounting is off unless DASHBOARD_MEMORY is set; it is
+# recorded for the outermost @instrumented call, i.e. each render_* component
+ENABLED = os.environ.get("DASHBOARD_MEMORY", "") not in ("", "0")
+
+# A warm call whose peak allocation reaches this fraction of its input
+# frame's shallow size is flagged as having copied the whole frame
+COPY_THRESHOLD = 0.9
+# Records kept for the debug panel
+HISTORY = 200
+# Source lines listed per record
+TOP_ALLOCATIONS = 5
+
+
+def frame_bytes(df, deep=False):
+    """
+    Return the memory held by a DataFrame or Series.
+
+    The shallow size (column buffers and object pointers) is what a copy
+    allocates; ``deep`` also counts the Python objects the pointers refer to.
+    """
+    usage = df.memory_usage(deep=deep, index=True)
+    return int(usage.sum() if isinstance(df, pd.DataFrame) else usage)
+
+
+class MemoryLog:
+    """Recent memory records of instrumented calls, shared by every session"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=HISTORY)
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def to_frame(self):
+        with self.lock:
+            records = list(self.records)
+        return pd.DataFrame(records)
+
+
+MEMORY_LOG = MemoryLog()
+
+
+class MemoryTracker:
+    """
+    Measure the allocations made while a block runs.
+
+    Records the traced peak and the memory still held at the end relative to
+    the start, the source lines holding the most new memory, and whether the
+    peak reached ``COPY_THRESHOLD`` times the input frame's shallow size.
+    Tracing is process-wide, so only one block is measured at a time; a
+    block entered while another is measured leaves ``record`` as None.
+
+    A block is warm when the same name already ran on the same frame. Only
+    warm blocks are checked for copies: the first run on a frame also fills
+    the caches of its helpers, e.g. the index matrices of a bootstrap, which
+    can exceed the frame without copying it.
+
+    Blocks run under ``untracked`` inside a measured block are left out of
+    its peak and retained bytes.
+    """
+
+    _lock = threading.Lock()
+    # The tracker measuring a block, if any
+    current = None
+    # Frames each name has run on, keyed by (name, frame id); an entry holds
+    # a weak reference so it is dropped along with its frame
+    _seen = {}
+    _seen_lock = threading.Lock()
+
+    def __init__(self, name, frame=None, threshold=COPY_THRESHOLD,
+                 snapshots=True):
+        self.name = name
+        self.frame = frame
+        self.threshold = threshold
+        self.snapshots = snapshots
+        self.record = None
+
+    def _is_warm(self):
+        if not isinstance(self.frame, (pd.DataFrame, pd.Series)):
+            return False
+        key = (self.name, id(self.frame))
+        seen, lock = self._seen, self._seen_lock
+
+        def forget(ref):
+            with lock:
+                if seen.get(key) is ref:
+                    del seen[key]
+
+        with lock:
+            ref = seen.get(key)
+            if ref is not None and ref() is self.frame:
+                return True
+            seen[key] = weakref.ref(self.frame, forget)
+        return False
+
+    def __enter__(self):
+        self.warm = self._is_warm()
+        self._active = self._lock.acquire(blocking=False)
+        if not self._active:
+            return self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._before = tracemalloc.take_snapshot() if self.snapshots else None
+        tracemalloc.reset_peak()
+        self._start = self._peak = tracemalloc.get_traced_memory()[0]
+        # Memory still held by untracked blocks
+        self._excluded = 0
+        MemoryTracker.current = self
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self._active:
+            return False
+        try:
+            self._record()
+        finally:
+            MemoryTracker.current = None
+            self._lock.release()
+        return False
+
+    def _exclude(self, start, peak):
+        """Leave out the allocations made since an untracked block began"""
+        current = tracemalloc.get_traced_memory()[0]
+        self._peak = max(self._peak, peak - self._excluded)
+        self._excluded += current - start
+        tracemalloc.reset_peak()
+
+    def _record(self):
+        current, peak = tracemalloc.get_traced_memory()
+        current -= self._excluded
+        peak = max(self._peak, peak - self._excluded)
+        shallow = deep = None
+        if isinstance(self.frame, (pd.DataFrame, pd.Series)):
+            shallow = frame_bytes(self.frame)
+            deep = frame_bytes(self.frame, deep=True)
+
+        top = []
+        if self.snapshots:
+            after = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)])
+            for stat in after.compare_to(self._before, "lineno")[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                top.append(f"{frame.filename}:{frame.lineno} "
+                           f"{stat.size_diff / 2**20:+.1f}MiB")
+
+        peak_bytes = peak - self._start
+        self.record = {
+            "time": time.time(),
+            "function": self.name,
+            "frame_bytes": shallow,
+            "frame_deep_bytes": deep,
+            "peak_bytes": peak_bytes,
+            "retained_bytes": current - self._start,
+            "warm": self.warm,
+            "copy_suspected": self.warm and bool(shallow) and
+            peak_bytes >= self.threshold * shallow,
+            "top_allocations": top,
+        }
+
+
+@contextlib.contextmanager
+def untracked():
+    """
+    Leave the allocations of a block out of the block being measured.
+
+    Used around sending a chart, whose serialization grows with the chart
+    rather than the frame and is recorded as its payload. Memory the block
+    still holds when it ends is left out of the retained bytes too.
+    """
+    tracker = MemoryTracker.current
+    if tracker is None:
+        yield
+        return
+    start, peak = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        tracker._exclude(start, peak)
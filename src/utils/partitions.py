@@ -0,0 +1,342 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.cache import keyed_lru_cache
+from utils.data_processing import (AGE_GROUP_LABELS, categorize_anxiety,
+                                   derive_version, register_view_aggregates,
+                                   tag_version)
+from utils.instrumentation import instrumented
+
+# Time bucket of a partition, as a pandas period frequency (D, W, M, Q, Y);
+# the shipped survey wave spans a week, so it is split by day by default
+PARTITION_FREQ = os.environ.get("DASHBOARD_PARTITION_FREQ", "D")
+# Pre-aggregates kept per partition: helper name -> (group columns, columns
+# whose mean or sum is taken). Sums and non-null counts are stored, so
+# partitions combine by addition
+PRE_AGGREGATES = {
+    "country_stats": (["Residence_ISO3"], ["GAD_T", "SWL_T", "SPIN_T", "Hours"]),
+    "age_stats": (["AgeGroup"], ["Hours", "GAD_T", "SWL_T"]),
+    "platform_stats": (["Platform", "Playstyle"], []),
+    "game_counts": (["Game"], []),
+    "country_counts": (["Residence_ISO3"], []),
+    "life_quality_cells": (["Gender", "Work", "Degree", "Age"],
+                           ["Hours", "streams", "GAD_T", "SPIN_T", "SWL_T"]),
+    "radar_aggregates": (["Game", "Grouped_Playstyle"],
+                         ["SPIN_T", "SWL_T", "Narcissism", "GAD_T"]),
+    # Anxiety levels are derived from GAD_T when the partials are combined
+    "sunburst_counts": (["Game", "Grouped_Playstyle", "GAD_T"], []),
+}
+# Columns whose min and max are stored too; they combine by min and max
+EXTREMA = {
+    "life_quality_cells": ["GAD_T", "SPIN_T", "SWL_T"],
+    "radar_aggregates": ["SPIN_T", "SWL_T", "Narcissism", "GAD_T"],
+}
+# Pre-aggregates whose rows with a missing key form groups of their own
+KEEP_MISSING = {"life_quality_cells", "sunburst_counts"}
+# Pre-aggregates that store the label of the first row of every group
+FIRST_ROW = {"radar_aggregates"}
+MANIFEST = "partitions.json"
+
+
+def partial_aggregate(df, name, by=()):
+    """
+    Compute the additive form of a pre-aggregate.
+
+    Args:
+        df (pd.DataFrame): Survey rows
+        name (str): Key of ``PRE_AGGREGATES``
+        by (list): Leading group keys, e.g. the partition of every row
+
+    Returns:
+        pd.DataFrame: ``<col>_sum``, ``<col>_count`` and ``rows`` per group,
+        plus ``<col>_min`` and ``<col>_max`` of the ``EXTREMA`` columns and
+        ``first_row_min`` for ``FIRST_ROW`` aggregates
+    """
+    keys, columns = PRE_AGGREGATES[name]
+    groupers = [*by, *(df[key] for key in keys)]
+    options = dict(observed=True, dropna=name not in KEEP_MISSING)
+    grouped = df.groupby(groupers, **options)
+    stats = {col: ["sum", "count"] for col in columns}
+    for col in EXTREMA.get(name, []):
+        stats[col] = [*stats.get(col, []), "min", "max"]
+    partial = grouped.agg(stats) if stats \
+        else pd.DataFrame(index=grouped.size().index)
+    partial.columns = [f"{col}_{stat}" for col, stat in partial.columns]
+    partial["rows"] = grouped.size()
+    if name in FIRST_ROW:
+        partial["first_row_min"] = pd.Series(df.index, index=df.index).groupby(
+            groupers, **options).min()
+    return partial
+
+
+def combine_partials(partials, name):
+    """Combine partials of the same pre-aggregate over their group keys"""
+    keys, _ = PRE_AGGREGATES[name]
+    combined = pd.concat(partials)
+    how = {col: col.rsplit("_", 1)[-1] if col.endswith(("_min", "_max"))
+           else "sum" for col in combined.columns}
+    return combined.groupby(level=keys, observed=True,
+                            dropna=name not in KEEP_MISSING).agg(how)
+
+
+def finalize_aggregate(partial, name):
+    """Turn a combined partial into what the helper of that name returns"""
+    keys, columns = PRE_AGGREGATES[name]
+    result = pd.DataFrame(index=partial.index)
+    if name == "life_quality_cells":
+        for col in columns:
+            result[col] = partial[f"{col}_sum"]
+        result["Employed"] = np.where(
+            partial.index.get_level_values("Work") == "Employed",
+            partial["rows"], 0)
+        result["count"] = partial["rows"]
+        for col in EXTREMA[name]:
+            result[f"{col}_min"] = partial[f"{col}_min"]
+            result[f"{col}_max"] = partial[f"{col}_max"]
+        return result.reset_index()
+    if name == "radar_aggregates":
+        for col in columns:
+            for stat in ["count", "sum", "min", "max"]:
+                result[f"{col}_{stat}"] = partial[f"{col}_{stat}"]
+        # Pairs in order of appearance, as the helper groups without sorting
+        result["first_row"] = partial["first_row_min"]
+        return result.sort_values("first_row").reset_index()
+    if name == "sunburst_counts":
+        counts = partial["rows"].reset_index()
+        counts["Anxiety_Level"] = categorize_anxiety(counts["GAD_T"])
+        return counts.groupby(["Game", "Grouped_Playstyle", "Anxiety_Level"])[
+            "rows"].sum().rename(None)
+
+    for col in columns:
+        result[col] = partial[f"{col}_sum"] / partial[f"{col}_count"]
+
+    if name == "age_stats":
+        result = result.reindex(AGE_GROUP_LABELS)
+        result.index = pd.CategoricalIndex(
+            result.index, categories=AGE_GROUP_LABELS, ordered=True,
+            name="AgeGroup")
+    elif name == "platform_stats":
+        result["count"] = partial["rows"]
+        result["percentage"] = result["count"] / result.groupby(
+            level="Platform")["count"].transform("sum") * 100
+    elif name in ("game_counts", "country_counts"):
+        result["count"] = partial["rows"]
+        return result.reset_index().sort_values(
+            by="count", ascending=False, kind="stable").reset_index(drop=True)
+    return result.reset_index()
+
+
+class TimePartitions:
+    """
+    Survey rows split into time buckets of ``Datetime``.
+
+    Every partition keeps the min/max of each numeric column and the
+    partial ``PRE_AGGREGATES`` of its rows. A date range is resolved on the
+    partitions' Datetime bounds: partitions outside it are skipped, those
+    inside it are used whole and only the rows of the partitions it cuts
+    through are compared with its ends. Rows without a Datetime are in no
+    partition.
+
+    Partitions are held in memory as row positions of the source frame, or
+    read from a directory written by ``write`` one file at a time.
+    """
+
+    def __init__(self, version, freq, stats, aggregates, df=None,
+                 positions=None, path=None):
+        self.version = version
+        self.freq = freq
+        self.stats = stats
+        self.aggregates = aggregates
+        self._df = df
+        self._positions = positions
+        self.path = Path(path) if path is not None else None
+
+    @classmethod
+    def build(cls, df, version, freq=PARTITION_FREQ):
+        """Partition a frame in memory; its rows are not copied"""
+        buckets = df["Datetime"].dt.to_period(freq)
+        codes, labels = pd.factorize(buckets, sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        positions = [order[start:end]
+                     for start, end in zip(bounds[:-1], bounds[1:])]
+
+        partition = pd.Series(codes, index=df.index, name="partition")
+        valid = codes >= 0
+        numeric = df.select_dtypes(["number", "datetime"]).columns
+        stats = df.loc[valid, numeric].groupby(partition[valid]).agg(
+            ["min", "max"])
+        stats.columns = [f"{col}_{stat}" for col, stat in stats.columns]
+        stats.insert(0, "rows", np.diff(bounds))
+        stats.insert(0, "bucket", labels.astype(str))
+
+        rows, partition = df[valid], partition[valid]
+        aggregates = {name: partial_aggregate(rows, name, [partition])
+                      for name in PRE_AGGREGATES}
+        return cls(version, freq, stats, aggregates, df=df,
+                   positions=positions)
+
+    @classmethod
+    def open(cls, path):
+        """Open partitions written by ``write``, reading only their metadata"""
+        path = Path(path)
+        with open(path / MANIFEST) as f:
+            manifest = json.load(f)
+        stats = pd.DataFrame(manifest["stats"])
+        for col in stats.columns:
+            if col.startswith("Datetime_"):
+                stats[col] = pd.to_datetime(stats[col])
+        aggregates = {name: pd.read_parquet(path / f"{name}.parquet")
+                      for name in PRE_AGGREGATES}
+        return cls(manifest["version"], manifest["freq"], stats, aggregates,
+                   path=path)
+
+    def write(self, path):
+        """
+        Write every partition to its own Parquet file in a directory.
+
+        The directory also holds the pre-aggregates and a manifest of the
+        version, bucket frequency and partition statistics, written last.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for i, bucket in enumerate(self.stats["bucket"]):
+            self.partition(i).to_parquet(path / f"part-{bucket}.parquet")
+        for name, aggregate in self.aggregates.items():
+            aggregate.to_parquet(path / f"{name}.parquet")
+
+        stats = self.stats.copy()
+        for col in stats.select_dtypes("datetime").columns:
+            stats[col] = stats[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+        manifest = {"version": self.version, "freq": self.freq,
+                    "stats": json.loads(stats.to_json(orient="records"))}
+        tmp_path = path / f"{MANIFEST}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, path / MANIFEST)
+
+    def partition(self, i, columns=None):
+        """Return the rows of a partition, in source order"""
+        if self._df is not None:
+            if columns is None:
+                return self._df.take(self._positions[i])
+            return self._df.iloc[self._positions[i],
+                                 self._df.columns.get_indexer(columns)]
+        bucket = self.stats["bucket"].iloc[i]
+        return pd.read_parquet(self.path / f"part-{bucket}.parquet",
+                               columns=columns)
+
+    def prune(self, start, end):
+        """
+        Resolve ``start <= Datetime < end`` on the partition bounds.
+
+        Returns:
+            tuple: Positions of the partitions wholly inside the range and
+            of those it cuts through
+        """
+        low, high = self.stats["Datetime_min"], self.stats["Datetime_max"]
+        overlap = (high >= start) & (low < end)
+        inside = overlap & (low >= start) & (high < end)
+        return (np.flatnonzero(inside.to_numpy()),
+                np.flatnonzero((overlap & ~inside).to_numpy()))
+
+    def select(self, start, end, columns=None):
+        """
+        Return the rows with ``start <= Datetime < end``, in source order.
+
+        Args:
+            start (pd.Timestamp): First instant of the range
+            end (pd.Timestamp): First instant after the range
+            columns (list): Columns to read, all of them when omitted
+        """
+        inside, cut = self.prune(start, end)
+        if self._df is not None:
+            positions = [self._positions[i] for i in inside]
+            for i in cut:
+                rows = self._positions[i]
+                dates = self._df["Datetime"].to_numpy()[rows]
+                positions.append(rows[(dates >= start) & (dates < end)])
+            positions = np.sort(np.concatenate(
+                positions or [np.empty(0, dtype=np.intp)]))
+            if columns is None:
+                return self._df.take(positions)
+            return self._df.iloc[positions, self._df.columns.get_indexer(columns)]
+
+        read = None if columns is None else list(dict.fromkeys(
+            ["Datetime", *columns]))
+        frames = [self.partition(i, read) for i in inside]
+        for i in cut:
+            rows = self.partition(i, read)
+            frames.append(rows[(rows["Datetime"] >= start)
+                               & (rows["Datetime"] < end)])
+        if not frames:
+            frames = [self.partition(0, read).iloc[:0]]
+        rows = pd.concat(frames).sort_index()
+        return rows if columns is None else rows[columns]
+
+    def aggregate(self, name, start, end):
+        """
+        Return a pre-aggregate of the rows in a date range.
+
+        The stored partials of the partitions inside the range are added to
+        partials computed from the rows of the partitions it cuts through,
+        so only those rows are read.
+
+        Returns:
+            What the helper named ``name`` returns for the same rows
+        """
+        inside, cut = self.prune(start, end)
+        stored = self.aggregates[name]
+        partials = [stored[stored.index.get_level_values(0).isin(inside)]
+                    .droplevel(0)]
+        keys, columns = PRE_AGGREGATES[name]
+        for i in cut:
+            rows = self.partition(
+                i, list(dict.fromkeys(["Datetime", *keys, *columns])))
+            partials.append(partial_aggregate(
+                rows[(rows["Datetime"] >= start) & (rows["Datetime"] < end)],
+                name))
+        return finalize_aggregate(combine_partials(partials, name), name)
+
+
+@st.cache_resource(max_entries=4)
+def get_time_partitions(_df, version, freq=PARTITION_FREQ):
+    """Partition a dataset version by time, once per process"""
+    return TimePartitions.build(_df, version, freq)
+
+
+@instrumented
+def select_dates(partitions, start, end):
+    """
+    Return the rows of partitioned data in a date range as a versioned view.
+
+    The view is tagged with a version derived from the partitions' and the
+    range, and its ``PRE_AGGREGATES`` are answered from the partitions
+    rather than its rows.
+
+    Args:
+        partitions (TimePartitions): Partitioned survey data
+        start (pd.Timestamp): First instant of the range
+        end (pd.Timestamp): First instant after the range
+
+    Returns:
+        pd.DataFrame: The matching rows, in source order
+    """
+    return _select_dates(partitions, partitions.version,
+                         pd.Timestamp(start), pd.Timestamp(end))
+
+
+@keyed_lru_cache(maxsize=32)
+def _select_dates(_partitions, version, start, end):
+    view_version = derive_version(
+        version, ("dates", start.isoformat(), end.isoformat()))
+    register_view_aggregates(
+        view_version,
+        lambda name: _partitions.aggregate(name, start, end)
+        if name in PRE_AGGREGATES else None)
+    return tag_version(_partitions.select(start, end), view_version)
@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Threads preparing panel data, shared by every session; pandas and NumPy
+# release the GIL in most kernels, so independent panels overlap. Set
+# DASHBOARD_PANEL_WORKERS=1 to prepare each panel when it is rendered
+WORKERS = int(os.environ.get("DASHBOARD_PANEL_WORKERS",
+                             min(4, os.cpu_count() or 1)))
+THREAD_NAME_PREFIX = "panel-prepare"
+# Session State key of the steps submitted by the session's last rerun
+FUTURES_KEY = "_panel_futures"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _quiet_missing_context(record):
+    """Drop the missing ScriptRunContext warnings raised by pool threads"""
+    return not record.threadName.startswith(THREAD_NAME_PREFIX)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+            # Preparation runs outside the session, which Streamlit warns
+            # about on every cached call
+            logging.getLogger(get_script_run_ctx.__module__).addFilter(
+                _quiet_missing_context)
+            _pool = ThreadPoolExecutor(max_workers=WORKERS,
+                                       thread_name_prefix=THREAD_NAME_PREFIX)
+        return _pool
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Panel preparation failed", exc_info=future.exception())
+
+
+def prepare_panels(*steps):
+    """
+    Start the data preparation of a rerun's panels concurrently.
+
+    Each step is a component's ``prepare_*`` function followed by the
+    arguments its ``render_*`` function calls it with. Preparation only
+    fills the caches of the panels' helpers and emits no Streamlit
+    elements, so the panels are still rendered in order on the script
+    thread and compute whatever is not cached yet themselves. A panel
+    reaching a ``keyed_lru_cache`` helper while its step is computing the
+    same key waits for that result; ``st.cache_data`` and
+    ``st.cache_resource`` helpers give no such guarantee, so a panel that
+    gets there first may compute the value a second time. A rerun thus
+    takes about as long as its slowest panel rather than the sum of them,
+    at the cost of occasionally repeated work.
+
+    Steps of the session's previous rerun that have not started yet are
+    cancelled, so an interrupted rerun does not keep the pool busy.
+
+    Args:
+        *steps (tuple): ``(prepare, *args)`` per panel
+
+    Returns:
+        list: Futures of the steps; empty when ``WORKERS`` is 1
+    """
+    if WORKERS <= 1:
+        return []
+
+    for future in st.session_state.get(FUTURES_KEY, []):
+        future.cancel()
+
+    pool = _get_pool()
+    futures = []
+    for prepare, *args in steps:
+        future = pool.submit(prepare, *args)
+        future.add_done_callback(_log_failure)
+        futures.append(future)
+    st.session_state[FUTURES_KEY] = futures
+    return futures
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+
+from utils.data_processing import ROOT_DIR
+
+# Every full rerun is profiled when DASHBOARD_PROFILE is set, otherwise only
+# reruns of a page opened with ?profile=1
+ENABLED = os.environ.get("DASHBOARD_PROFILE", "") not in ("", "0")
+PROFILE_PARAM = "profile"
+PROFILE_DIR = Path(os.environ.get("DASHBOARD_PROFILE_DIR",
+                                  ROOT_DIR / "profiles"))
+
+# Seconds between stack samples; the effective rate is also bounded by the
+# interpreter's thread switch interval
+SAMPLE_INTERVAL = 0.001
+UNKEYED_WIDGET = re.compile(r"[0-9a-f]{64}")
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class StackSampler:
+    """
+    Sample the call stack of the current thread from a background thread.
+
+    Used as a context manager around the code to profile; stacks are cut at
+    the frame that entered the ``with`` block. Each sample is weighted by the
+    time elapsed since the previous one.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.frames = {}
+        self.samples = []
+        self.weights = []
+        self.duration = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._root = sys._getframe(1)
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler",
+                                        daemon=True)
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+        self._root = None
+        return False
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(self._frame_index(
+                    code.co_qualname, code.co_filename, code.co_firstlineno))
+                if frame is self._root:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.samples.append(stack[::-1])
+                self.weights.append(now - last)
+            last = now
+
+    def _frame_index(self, name, file, line):
+        key = (name, file, line)
+        if key not in self.frames:
+            self.frames[key] = len(self.frames)
+        return self.frames[key]
+
+    def to_speedscope(self, name, metadata=None):
+        """Return the samples as a speedscope file (sampled profile)"""
+        frames = [{"name": frame_name, "file": file, "line": line}
+                  for frame_name, file, line in self.frames]
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "gaming-dashboard-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "metadata": metadata or {},
+        }
+
+
+def profiling_requested():
+    """Return whether the current rerun should be profiled"""
+    return ENABLED or st.query_params.get(PROFILE_PARAM) == "1"
+
+
+def get_widget_state():
+    """Return the JSON-serializable values of keyed widgets and session state"""
+    state = {}
+    for key, value in st.session_state.to_dict().items():
+        # Widgets without a key are stored under a generated hash
+        if UNKEYED_WIDGET.fullmatch(str(key)):
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        state[str(key)] = value
+    return state
+
+
+def save_profile(sampler, section, directory=PROFILE_DIR):
+    """
+    Save a rerun profile as speedscope JSON tagged with the view it rendered.
+
+    Args:
+        sampler (StackSampler): Finished sampler of the rerun
+        section (str): Active dashboard section
+        directory (Path): Directory the profile is written to
+
+    Returns:
+        Path: The written file
+    """
+    created = datetime.now()
+    metadata = {
+        "created": created.isoformat(timespec="seconds"),
+        "section": section,
+        "duration": sampler.duration,
+        "samples": len(sampler.samples),
+        "widgets": get_widget_state(),
+    }
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "-" for c in section).lower()
+    path = directory / f"{created:%Y%m%d-%H%M%S-%f}-{slug}.speedscope.json"
+    with open(path, "w") as f:
+        json.dump(sampler.to_speedscope(f"{section} rerun", metadata), f)
+    return path
+
+
+def list_profiles(limit=10, directory=PROFILE_DIR):
+    """
+    List the most recent saved profiles.
+
+    Returns:
+        list: (path, metadata) pairs, newest first
+    """
+    if not directory.exists():
+        return []
+    paths = sorted(directory.glob("*.speedscope.json"), reverse=True)[:limit]
+    profiles = []
+    for path in paths:
+        with open(path) as f:
+            profiles.append((path, json.load(f).get("metadata", {})))
+    return profiles
@@ -0,0 +1,338 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (AGE_GROUP_LABELS, CSV_FILE_PATH,
+                                   VERSION_DIGITS, derive_version,
+                                   process_data, register_view_aggregates,
+                                   tag_version)
+
+TABLE = "survey"
+# Source rows read, processed and inserted per batch while building
+CHUNK_ROWS = 100_000
+# Columns the dashboard filters on, each with its own index
+INDEX_COLUMNS = ["Residence_ISO3", "Game", "Work", "Gender", "Degree", "Age"]
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Columns the dashboard reads; a frame loaded from the database holds only
+# these, so extend the list when a component uses another column
+DASHBOARD_COLUMNS = [
+    "Datetime", "Game", "Platform", "Hours", "earnings", "streams",
+    "Narcissism", "Gender", "Age", "Work", "Degree", "Playstyle", "GAD_T",
+    "SWL_T", "SPIN_T", "Residence_ISO3", "AgeGroup", "Grouped_Playstyle"]
+# Aggregates of utils.partitions.PRE_AGGREGATES computed by SQLite
+AGGREGATES = ["country_stats", "age_stats", "platform_stats", "game_counts",
+              "country_counts", "life_quality_cells", "radar_aggregates",
+              "sunburst_counts"]
+# Score columns of the Quality of Life cells and the score radar
+CELL_SCORES = ["GAD_T", "SPIN_T", "SWL_T"]
+RADAR_SCORES = ["SPIN_T", "SWL_T", "Narcissism", "GAD_T"]
+
+
+def _param(value):
+    """Convert a NumPy scalar, which sqlite3 cannot bind, to a Python one"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def read_source(path, chunk_rows=CHUNK_ROWS):
+    """Yield raw survey rows from a CSV or Parquet file in chunks"""
+    if str(path).endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            chunk = batch.to_pandas()
+            chunk.index += start
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def source_version(path):
+    """Return the version token of a survey file, a digest of its bytes"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()[:VERSION_DIGITS]
+
+
+def build_database(path, source=CSV_FILE_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Load a survey file into a SQLite database, one chunk at a time.
+
+    Rows get the same derived columns as ``load_data``, so memory use is
+    bounded by the chunk size rather than the dataset. The database is
+    written next to ``path`` and moved into place when complete.
+
+    Args:
+        path (str or Path): Database file to create or replace
+        source (str or Path): Raw survey CSV or Parquet file
+        chunk_rows (int): Rows processed per batch
+
+    Returns:
+        SurveyDatabase: The new database
+    """
+    version = source_version(source)
+
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    db = sqlite3.connect(tmp_path)
+    try:
+        rows = 0
+        for chunk in read_source(source, chunk_rows):
+            chunk = process_data(chunk)
+            chunk["Datetime"] = chunk["Datetime"].dt.strftime(DATETIME_FORMAT)
+            chunk["AgeGroup"] = chunk["AgeGroup"].astype(object)
+            chunk.to_sql(TABLE, db, if_exists="append", index=True,
+                         index_label="row")
+            rows += len(chunk)
+
+        for col in INDEX_COLUMNS:
+            db.execute(f'CREATE INDEX "{TABLE}_{col}" ON {TABLE} ("{col}")')
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", version), ("rows", str(rows)), ("source", str(source))])
+        db.execute("ANALYZE")
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_path, path)
+    return SurveyDatabase(path)
+
+
+class SurveyDatabase:
+    """
+    Survey rows in a SQLite file, queried with pushed-down filters.
+
+    Filters are keyword arguments naming a column: a scalar selects equal
+    rows, None missing values, a ``(low, high)`` tuple an inclusive range
+    and a list or set any of its values. Filters on ``INDEX_COLUMNS`` are
+    answered from their index, so a query reads only the matching rows and
+    aggregates are computed by SQLite rather than in pandas.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        meta = dict(self._connection().execute(
+            "SELECT key, value FROM meta").fetchall())
+        self.version = meta["version"]
+        self.rows = int(meta["rows"])
+        self.columns = [row[1] for row in self._connection().execute(
+            f"PRAGMA table_info({TABLE})")]
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.db = db
+        return db
+
+    def _where(self, filters, required=()):
+        """
+        Translate filters into a WHERE clause.
+
+        Returns:
+            tuple: The clause, its parameters and a canonical filter spec
+        """
+        clauses = [f'"{col}" IS NOT NULL' for col in required]
+        params = []
+        spec = []
+        for col, value in sorted(filters.items()):
+            if col not in self.columns:
+                raise ValueError(f"Unknown survey column: {col}")
+            if value is None:
+                clauses.append(f'"{col}" IS NULL')
+            elif isinstance(value, tuple):
+                value = tuple(map(_param, value))
+                clauses.append(f'"{col}" BETWEEN ? AND ?')
+                params.extend(value)
+            elif isinstance(value, (list, set, frozenset)):
+                value = tuple(sorted(map(_param, value)))
+                clauses.append(f'"{col}" IN ({", ".join("?" * len(value))})')
+                params.extend(value)
+                value = ("in", value)
+            else:
+                value = _param(value)
+                clauses.append(f'"{col}" = ?')
+                params.append(value)
+            spec.append((col, value))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params, tuple(spec)
+
+    def query(self, sql, params=()):
+        """Run a query and return its result as a DataFrame"""
+        return pd.read_sql_query(sql, self._connection(), params=params)
+
+    def count(self, **filters):
+        """Return the number of rows matching the filters"""
+        where, params, _ = self._where(filters)
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM {TABLE} {where}", params).fetchone()[0]
+
+    def select(self, columns, **filters):
+        """
+        Return the given columns of the rows matching the filters.
+
+        The frame has the dtypes and row labels of the same selection on
+        ``load_data``'s frame, and is tagged with a version derived from the
+        database's and the query, for the version-keyed caches.
+        """
+        where, params, spec = self._where(filters)
+        names = ", ".join(f'"{col}"' for col in columns)
+        df = pd.read_sql_query(
+            f"SELECT row, {names} FROM {TABLE} {where} ORDER BY row",
+            self._connection(), params=params, index_col="row")
+        df.index.name = None
+        if "Datetime" in df:
+            df["Datetime"] = pd.to_datetime(df["Datetime"])
+        if "AgeGroup" in df:
+            df["AgeGroup"] = pd.Categorical(
+                df["AgeGroup"], categories=AGE_GROUP_LABELS, ordered=True)
+        return tag_version(df, derive_version(
+            self.version, ("select", tuple(columns), spec)))
+
+    def country_stats(self, **filters):
+        """``get_country_stats`` of the rows matching the filters"""
+        where, params, _ = self._where(filters, required=["Residence_ISO3"])
+        return self.query(
+            "SELECT Residence_ISO3, AVG(GAD_T) AS GAD_T, AVG(SWL_T) AS SWL_T, "
+            f"AVG(SPIN_T) AS SPIN_T, AVG(Hours) AS Hours FROM {TABLE} {where} "
+            "GROUP BY Residence_ISO3 ORDER BY Residence_ISO3", params)
+
+    def age_stats(self, **filters):
+        """``get_age_stats`` of the rows matching the filters"""
+        where, params, _ = self._where(filters, required=["AgeGroup"])
+        stats = self.query(
+            "SELECT AgeGroup, AVG(Hours) AS Hours, AVG(GAD_T) AS GAD_T, "
+            f"AVG(SWL_T) AS SWL_T FROM {TABLE} {where} GROUP BY AgeGroup",
+            params).set_index("AgeGroup").reindex(AGE_GROUP_LABELS)
+        stats.index = pd.CategoricalIndex(
+            stats.index, categories=AGE_GROUP_LABELS, ordered=True,
+            name="AgeGroup")
+        return stats.reset_index()
+
+    def platform_stats(self, **filters):
+        """``get_platform_stats`` of the rows matching the filters"""
+        where, params, _ = self._where(filters,
+                                       required=["Platform", "Playstyle"])
+        return self.query(
+            "SELECT Platform, Playstyle, COUNT(*) AS count, "
+            "COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (PARTITION BY Platform) "
+            f"AS percentage FROM {TABLE} {where} "
+            "GROUP BY Platform, Playstyle ORDER BY Platform, Playstyle",
+            params)
+
+    def game_counts(self, **filters):
+        """``get_game_counts`` of the rows matching the filters"""
+        return self._counts("Game", filters)
+
+    def country_counts(self, **filters):
+        """``get_country_counts`` of the rows matching the filters"""
+        return self._counts("Residence_ISO3", filters)
+
+    def _counts(self, col, filters):
+        where, params, _ = self._where(filters, required=[col])
+        return self.query(
+            f'SELECT "{col}", COUNT(*) AS count FROM {TABLE} {where} '
+            f'GROUP BY "{col}" ORDER BY count DESC, "{col}"', params)
+
+    def life_quality_cells(self, **filters):
+        """Quality of Life cells of the rows matching the filters"""
+        where, params, _ = self._where(filters)
+        # TOTAL is 0 rather than NULL without values, as pandas' sum
+        sums = ", ".join(f'TOTAL("{col}") AS "{col}"'
+                         for col in ["Hours", "streams", *CELL_SCORES])
+        extrema = ", ".join(f'MIN("{col}") AS "{col}_min", '
+                            f'MAX("{col}") AS "{col}_max"'
+                            for col in CELL_SCORES)
+        return self.query(
+            f"SELECT Gender, Work, Degree, Age, {sums}, "
+            "TOTAL(Work = 'Employed') AS Employed, COUNT(*) AS count, "
+            f"{extrema} FROM {TABLE} {where} "
+            "GROUP BY Gender, Work, Degree, Age "
+            # Missing keys last, as pandas sorts groups
+            "ORDER BY Gender IS NULL, Gender, Work IS NULL, Work, "
+            "Degree IS NULL, Degree, Age IS NULL, Age", params)
+
+    def radar_aggregates(self, **filters):
+        """``get_radar_aggregates`` of the rows matching the filters"""
+        where, params, _ = self._where(
+            filters, required=["Game", "Grouped_Playstyle"])
+        stats = ", ".join(
+            f'COUNT("{col}") AS "{col}_count", TOTAL("{col}") AS "{col}_sum", '
+            f'MIN("{col}") AS "{col}_min", MAX("{col}") AS "{col}_max"'
+            for col in RADAR_SCORES)
+        return self.query(
+            f"SELECT Game, Grouped_Playstyle, {stats}, MIN(row) AS first_row "
+            f"FROM {TABLE} {where} GROUP BY Game, Grouped_Playstyle "
+            "ORDER BY first_row", params)
+
+    def sunburst_counts(self, **filters):
+        """``get_sunburst_counts`` of the rows matching the filters"""
+        where, params, _ = self._where(
+            filters, required=["Game", "Grouped_Playstyle"])
+        # The levels of categorize_anxiety
+        counts = self.query(
+            "SELECT Game, Grouped_Playstyle, CASE "
+            "WHEN GAD_T <= 7 THEN 'Low Anxiety' "
+            "WHEN GAD_T <= 14 THEN 'Moderate Anxiety' "
+            "ELSE 'High Anxiety' END AS Anxiety_Level, COUNT(*) AS count "
+            f"FROM {TABLE} {where} GROUP BY 1, 2, 3 ORDER BY 1, 2, 3", params)
+        return counts.set_index(
+            ["Game", "Grouped_Playstyle", "Anxiety_Level"])["count"].rename(None)
+
+    def explain(self, **filters):
+        """Return SQLite's plan for a filtered row selection"""
+        where, params, _ = self._where(filters)
+        plan = self._connection().execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {TABLE} {where}", params)
+        return [row[-1] for row in plan.fetchall()]
+
+
+class DatabaseView:
+    """
+    Aggregates and row selections of a filtered database view.
+
+    Registered with ``register_view_aggregates`` for the view's version, so
+    the aggregate helpers and ``filter_rows`` of the view's frame push their
+    work down to SQLite rather than scanning rows in pandas.
+    """
+
+    def __init__(self, db, version, filters=None):
+        self.db = db
+        self.version = version
+        self.filters = dict(filters or {})
+
+    def __call__(self, name):
+        if name not in AGGREGATES:
+            return None
+        return getattr(self.db, name)(**self.filters)
+
+    def select(self, columns, spec):
+        """
+        Return the given columns of the view's rows matching a filter spec.
+
+        Args:
+            columns (list): Columns of the returned frame
+            spec (tuple): ``filter_rows`` spec of (column, value) pairs
+
+        Returns:
+            pd.DataFrame: The rows, tagged with the version ``filter_rows``
+            derives and registered as a view of their own, or None when a
+            filter has no equivalent WHERE clause
+        """
+        filters = dict(self.filters)
+        for col, value in spec:
+            if (col not in self.db.columns or filters.get(col, value) != value
+                    or not isinstance(value, (str, int, float, np.generic))
+                    or pd.isna(value)):
+                return None
+            filters[col] = value
+        version = derive_version(self.version, spec)
+        register_view_aggregates(version, DatabaseView(self.db, version, filters))
+        return tag_version(self.db.select(columns, **filters), version)
@@ -0,0 +1,243 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import CSV_FILE_PATH
+
+# Rows generated per task; fixed so output does not depend on the worker count
+CHUNK_ROWS = 250_000
+
+# Item scores and their totals
+SCALE_ITEMS = {
+    "GAD_T": [f"GAD{i}" for i in range(1, 8)],
+    "SWL_T": [f"SWL{i}" for i in range(1, 6)],
+    "SPIN_T": [f"SPIN{i}" for i in range(1, 18)],
+}
+
+# Columns sampled jointly through a Gaussian copula
+COPULA_COLUMNS = [
+    *(item for items in SCALE_ITEMS.values() for item in items),
+    "Narcissism", "GADE", "Hours", "streams", "Age",
+    "Game", "Gender", "Work", "Degree", "Residence",
+]
+
+# Columns copied together from a survey row sharing the key column's value,
+# which keeps free-text answers and country codes consistent with the key
+DONOR_BLOCKS = {
+    "Game": ["Platform", "Playstyle", "earnings", "whyplay", "League"],
+    "Residence": ["Residence_ISO3", "Birthplace", "Birthplace_ISO3"],
+}
+
+# Standard normal CDF table; interpolating it is far faster than erf per value
+_CDF_GRID = np.linspace(-8.5, 8.5, 2**16)
+_CDF_TABLE = np.array([NormalDist().cdf(x) for x in _CDF_GRID])
+
+
+class SurveyModel:
+    """
+    Distributions of the survey fitted from the processed CSV.
+
+    Every copula column keeps its empirical marginal; categories are ordered
+    by their mean anxiety score so the copula correlations carry the
+    relationship between each category and the scores. Donor blocks keep
+    the conditional distribution of their columns given the key.
+    """
+
+    def __init__(self, df):
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes.to_dict()
+        self.marginals = {}
+
+        normal = NormalDist()
+        scores = np.empty((len(df), len(COPULA_COLUMNS)))
+        for i, column in enumerate(COPULA_COLUMNS):
+            values, codes = self._fit_marginal(df, column)
+            counts = np.bincount(codes, minlength=len(values))
+            self.marginals[column] = (values, np.cumsum(counts) / len(df))
+            # Mid-rank normal scores; ties share the score of their midpoint
+            midpoints = (np.cumsum(counts) - counts / 2) / len(df)
+            scores[:, i] = np.array([normal.inv_cdf(p) for p in midpoints])[codes]
+
+        correlation = np.corrcoef(scores, rowvar=False)
+        correlation[np.diag_indices_from(correlation)] += 1e-9
+        self.cholesky = np.linalg.cholesky(correlation)
+
+        self.donors = {}
+        for key, columns in DONOR_BLOCKS.items():
+            block = df[columns].reset_index(drop=True)
+            self.donors[key] = {
+                value: block.iloc[rows].to_dict("list")
+                for value, rows in block.groupby(
+                    df[key].to_numpy(), dropna=False).indices.items()
+            }
+
+        self.timestamps = np.sort(
+            pd.to_datetime(df["Datetime"]).to_numpy().astype("int64"))
+
+    @staticmethod
+    def _fit_marginal(df, column):
+        """Return the sorted distinct values of a column and each row's code"""
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series):
+            values, codes = np.unique(series.to_numpy(), return_inverse=True)
+            return values, codes
+
+        codes, categories = pd.factorize(series, use_na_sentinel=False)
+        anxiety = df["GAD_T"].groupby(codes).mean().to_numpy()
+        order = np.argsort(anxiety, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return np.asarray(categories, dtype=object)[order], rank[codes]
+
+    def sample(self, rows, start, total, seed, time_range=None):
+        """
+        Generate a chunk of synthetic survey rows.
+
+        Args:
+            rows (int): Rows in the chunk
+            start (int): Position of the chunk's first row in the full output
+            total (int): Rows in the full output, for ``Datetime`` ordering
+            seed: Seed or ``np.random.SeedSequence`` for the chunk
+            time_range (tuple): First and last ``Datetime`` of the full
+                output; the shipped survey period when omitted
+
+        Returns:
+            pd.DataFrame: Rows with the same columns as the processed CSV
+        """
+        rng = np.random.default_rng(seed)
+        latent = rng.standard_normal((rows, len(COPULA_COLUMNS))) @ self.cholesky.T
+        uniform = np.interp(latent, _CDF_GRID, _CDF_TABLE)
+
+        data = {}
+        for i, column in enumerate(COPULA_COLUMNS):
+            values, cumulative = self.marginals[column]
+            index = np.searchsorted(cumulative, uniform[:, i], side="right")
+            data[column] = values[np.minimum(index, len(values) - 1)]
+
+        for key, columns in DONOR_BLOCKS.items():
+            keys = pd.Series(data[key])
+            block = {column: np.empty(rows, dtype=object) for column in columns}
+            for value, positions in keys.groupby(
+                    keys.to_numpy(), dropna=False).indices.items():
+                donors = self.donors[key][value]
+                picks = rng.integers(0, len(donors[columns[0]]), len(positions))
+                for column in columns:
+                    block[column][positions] = np.asarray(
+                        donors[column], dtype=object)[picks]
+            data.update(block)
+
+        for total_column, items in SCALE_ITEMS.items():
+            data[total_column] = sum(data[item] for item in items)
+
+        # Each row takes a quantile inside its own slot of the full output, so
+        # timestamps increase across rows and chunks
+        positions = (start + np.arange(rows) + rng.random(rows)) / total
+        timestamps = self.timestamps
+        if time_range is not None:
+            # Stretch the shipped period over the range, keeping its shape
+            first, last = (pd.Timestamp(t).value for t in time_range)
+            timestamps = first + (timestamps - timestamps[0]) / max(
+                timestamps[-1] - timestamps[0], 1) * (last - first)
+        data["Datetime"] = np.interp(
+            positions * (len(timestamps) - 1),
+            np.arange(len(timestamps)),
+            timestamps,
+        ).astype("int64").astype("datetime64[ns]").astype("datetime64[s]")
+
+        df = pd.DataFrame(data)[self.columns]
+        for column, dtype in self.dtypes.items():
+            if column != "Datetime":
+                df[column] = df[column].astype(dtype)
+        return df
+
+
+def fit_survey_model(path=CSV_FILE_PATH):
+    """Fit a SurveyModel from a processed survey CSV"""
+    return SurveyModel(pd.read_csv(path))
+
+
+def _sample_chunk(model, rows, start, total, seed, time_range=None):
+    return model.sample(rows, start, total, seed, time_range)
+
+
+def generate_chunks(model, rows, seed=0, workers=None, time_range=None):
+    """
+    Generate synthetic survey rows in chunks, in order.
+
+    Chunks and their seeds are fixed up front, so the output is the same
+    for any number of workers. With more than one worker and one chunk the
+    chunks are generated in a process pool.
+
+    Args:
+        model (SurveyModel): Fitted survey distributions
+        rows (int): Total number of rows
+        seed (int): Seed for the generation
+        workers (int): Worker processes, defaults to the CPU count
+        time_range (tuple): First and last ``Datetime`` of the rows, the
+            shipped survey period when omitted
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of at most ``CHUNK_ROWS`` rows
+    """
+    starts = list(range(0, rows, CHUNK_ROWS))
+    sizes = [min(CHUNK_ROWS, rows - start) for start in starts]
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    workers = min(len(starts), workers or os.cpu_count() or 1)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_sample_chunk, [model] * len(starts), sizes,
+                                starts, [rows] * len(starts), seeds,
+                                [time_range] * len(starts))
+    else:
+        for size, start, chunk_seed in zip(sizes, starts, seeds):
+            yield model.sample(size, start, rows, chunk_seed, time_range)
+
+
+def generate_survey(rows, seed=0, workers=None, model=None, time_range=None):
+    """Return ``rows`` synthetic survey rows as one DataFrame"""
+    model = model or fit_survey_model()
+    chunks = list(generate_chunks(model, rows, seed, workers, time_range))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_survey(path, rows, seed=0, workers=None, model=None,
+                 time_range=None):
+    """
+    Write synthetic survey rows to a CSV or Parquet file, chunk by chunk.
+
+    Args:
+        path (str or Path): Output file; a ``.parquet`` suffix selects Parquet
+        rows (int): Total number of rows
+        seed (int): Seed for the generation
+        workers (int): Worker processes, defaults to the CPU count
+        model (SurveyModel): Fitted distributions, fitted from the shipped
+            CSV when omitted
+        time_range (tuple): First and last ``Datetime`` of the rows, the
+            shipped survey period when omitted
+    """
+    model = model or fit_survey_model()
+    chunks = generate_chunks(model, rows, seed, workers, time_range)
+
+    if str(path).endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = pa.schema([
+                    field.with_type(pa.string()) if field.type == pa.null()
+                    else field for field in table.schema])
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+    else:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0,
+                          index=False)
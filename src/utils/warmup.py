@@ -0,0 +1,132 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Written once warm-up completes, for external readiness probes
+HEALTH_FILE = os.environ.get("DASHBOARD_WARMUP_HEALTH_FILE")
+
+# Modules whose import cost is paid during warm-up rather than on first view
+WARM_MODULES = [
+    "pages.player_analysis",
+    "pages.game_analysis",
+    "pages.quality_analysis",
+    "folium",
+    "branca.colormap",
+    "streamlit_folium",
+    "shapely.geometry",
+    "PIL.Image",
+]
+
+
+class WarmupState:
+    """Progress of the background warm-up, shared by every session"""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.steps = []
+        self.error = None
+
+    def status(self):
+        """Return a health summary of the warm-up"""
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.ready.is_set(),
+            "elapsed": end - self.started_at,
+            "steps": list(self.steps),
+            "error": self.error,
+        }
+
+
+def warm_caches(state):
+    """
+    Populate the dataset, geometry, logo and default-view caches.
+
+    Every step goes through the same cached functions the pages call, so a
+    session asking for a value that is still being computed waits on the
+    in-flight computation instead of starting its own.
+    """
+    from components.life_quality import get_life_quality_cube
+    from components.score_radar import (get_playstyle_options,
+                                        get_radar_aggregates,
+                                        get_radar_scores)
+    from components.sunburst_chart import (build_sunburst_tree,
+                                           get_sunburst_counts)
+    from components.world_map import get_country_geometry, get_world_map
+    from utils.bootstrap import get_bootstrap_ci
+    from utils.data_processing import (get_country_names, get_country_stats,
+                                       get_game_logo, load_data)
+
+    def step(name, func, *args):
+        func(*args)
+        state.steps.append(name)
+        logger.info("Warm-up step done: %s", name)
+
+    try:
+        df, version = load_data()
+        state.steps.append("dataset")
+
+        step("country names", get_country_names)
+        step("geometry index", get_country_geometry)
+        for game in sorted(df["Game"].unique()):
+            get_game_logo(game)
+        state.steps.append("logo manifest")
+
+        # Aggregates behind the default state of every section
+        step("country stats", get_country_stats, df, version)
+        step("map intervals", get_bootstrap_ci, df, ("Residence_ISO3",),
+             "GAD_T", version)
+        step("world map", get_world_map, df, version)
+        step("quality cube", get_life_quality_cube, df, version)
+        aggregates = get_radar_aggregates(df, version)
+        playstyles = frozenset(get_playstyle_options(aggregates, "All"))
+        step("radar scores", get_radar_scores, aggregates, "All", playstyles,
+             version)
+        step("sunburst tree", build_sunburst_tree,
+             get_sunburst_counts(df, version), "All", version)
+
+        for module in WARM_MODULES:
+            importlib.import_module(module)
+        state.steps.append("modules")
+    except Exception as e:
+        state.error = str(e)
+        logger.exception("Cache warm-up failed")
+    finally:
+        state.finished_at = time.time()
+        state.ready.set()
+        if HEALTH_FILE and state.error is None:
+            with open(HEALTH_FILE, "w") as f:
+                f.write("ready\n")
+
+
+def _quiet_missing_context(record):
+    """Drop the missing ScriptRunContext warnings raised by the warm-up thread"""
+    return record.threadName != "cache-warmup"
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    """
+    Start the cache warm-up in a background thread, once per process.
+
+    Returns:
+        WarmupState: Shared progress and readiness of the warm-up
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    # The warm-up runs outside any session, which Streamlit warns about on
+    # every cached call
+    logging.getLogger(get_script_run_ctx.__module__).addFilter(
+        _quiet_missing_context)
+
+    state = WarmupState()
+    threading.Thread(target=warm_caches, args=(state,),
+                     name="cache-warmup", daemon=True).start()
+    return state
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app and its tools import their modules from the src directory
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
@@ -0,0 +1,54 @@
+"""Bootstrap intervals on empty selections and across execution paths"""
+import inspect
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import bootstrap
+from utils.bootstrap import bootstrap_means, get_bootstrap_ci
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    rows = 3_000
+    return pd.DataFrame({
+        "Game": rng.choice(["A", "B", "C"], rows),
+        "Gender": rng.choice(["Male", "Female"], rows),
+        "GAD_T": np.where(rng.random(rows) < 0.1, np.nan,
+                          rng.integers(0, 22, rows).astype(float)),
+    })
+
+
+@pytest.mark.parametrize("rows", [
+    lambda df: df.iloc[:0],
+    lambda df: df.assign(GAD_T=np.nan),
+    lambda df: df.assign(Game=None),
+])
+def test_empty_selection(df, rows):
+    ci = inspect.unwrap(get_bootstrap_ci)(rows(df), ("Game", "Gender"),
+                                          "GAD_T", None)
+    assert ci.empty
+    assert list(ci.columns) == ["count", "mean", "low", "high"]
+
+
+def test_paths_match_serial(df, monkeypatch):
+    by = [df["Game"], df["Gender"]]
+    serial = bootstrap_means(df["GAD_T"], by, n_boot=600, seed=3)
+
+    # Index matrices of a few resamples at a time
+    monkeypatch.setattr(bootstrap, "BATCH_CELLS", 5_000)
+    batched = bootstrap_means(df["GAD_T"], by, n_boot=600, seed=3)
+    pd.testing.assert_frame_equal(serial, batched)
+
+    # Chunks spread over the process pool
+    monkeypatch.setattr(bootstrap, "PARALLEL_THRESHOLD", 0)
+    pooled = bootstrap_means(df["GAD_T"], by, n_boot=600, seed=3)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+    assert (serial["low"] <= serial["mean"]).all()
+    assert (serial["mean"] <= serial["high"]).all()
+    expected = df.groupby(["Game", "Gender"])["GAD_T"].agg(["count", "mean"])
+    pd.testing.assert_frame_equal(serial[["count", "mean"]], expected,
+                                  check_dtype=False, check_names=False)
@@ -0,0 +1,77 @@
+"""Persistent aggregate cache: version-keyed hits, LRU eviction and errors"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils import cache
+from utils.cache import PersistentCache, persistent_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_hits_are_keyed_by_version(tmp_path, monkeypatch):
+    store = PersistentCache(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(cache, "PERSISTENT_CACHE", store)
+    calls = []
+
+    @persistent_cache
+    def count_rows(_df, version):
+        calls.append(version)
+        return len(_df)
+
+    df = pd.DataFrame({"a": range(3)})
+    assert count_rows(df, "v1") == 3
+    # The frame is not part of the key, only the version
+    assert count_rows(df.iloc[:1], "v1") == 3
+    assert count_rows(df.iloc[:1], "v2") == 1
+    assert calls == ["v1", "v2"]
+    assert store.info()["hits"] == 1
+    assert store.info()["entries"] == 2
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    value = b"x" * 1000
+    store = PersistentCache(tmp_path / "cache.sqlite", max_bytes=3500)
+    for key in ["a", "b", "c"]:
+        store.set(key, value)
+        clock.now += 1
+    assert store.info()["evictions"] == 0
+
+    # A hit within the access granularity leaves the recency unchanged
+    store.get("a")
+    clock.now += cache.ACCESS_GRANULARITY + 1
+    store.get("b")
+    store.set("d", value)
+
+    assert store.info()["evictions"] == 1
+    assert not store.get("a")[0]
+    assert [store.get(key)[0] for key in ["b", "c", "d"]] == [True] * 3
+    assert store.info()["bytes"] <= store.max_bytes
+
+
+def test_corrupted_value_is_an_error(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    store = PersistentCache(path)
+    store.set("key", {"a": 1})
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE entries SET value = ? WHERE key = 'key'",
+                   (b"not a pickle",))
+
+    assert store.get("key") == (False, None)
+    info = store.info()
+    assert info["errors"] == 1
+    assert info["misses"] == 1
@@ -0,0 +1,123 @@
+"""Incremental crossfilter groups against groupbys of the filtered rows"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.benchmark import quiet_bare_mode
+from utils.crossfilter import Crossfilter
+from utils.data_processing import CSV_FILE_PATH, process_data
+
+COLUMNS = ("GAD_T", "Hours")
+STEPS = 40
+
+
+@pytest.fixture(scope="module")
+def df():
+    quiet_bare_mode()
+    return process_data(pd.read_csv(CSV_FILE_PATH))
+
+
+def expected_group(df, mask, by, columns):
+    """Reductions of a group recomputed from the rows passing its filters"""
+    rows = df[mask]
+    keys = by(rows) if callable(by) else rows[list(by)]
+    grouped = rows[list(columns)].groupby(
+        [keys[col] for col in keys.columns], observed=True)
+    result = grouped.size().rename("count").to_frame()
+    for col in columns:
+        result[f"{col}_count"] = grouped[col].count()
+        result[f"{col}_sum"] = grouped[col].sum()
+        result[f"{col}_sumsq"] = (rows[col] ** 2).groupby(
+            [keys[c] for c in keys.columns], observed=True).sum()
+    return result.reset_index()
+
+
+def check_groups(df, crossfilter, passes, groups):
+    for name, (dimension, by) in groups.items():
+        mask = np.ones(len(df), dtype=bool)
+        for other, passed in passes.items():
+            if other != dimension:
+                mask &= passed
+        expected = expected_group(df, mask, by, COLUMNS)
+        result = crossfilter.groups[name].all()[expected.columns]
+        pd.testing.assert_frame_equal(
+            result, expected, check_dtype=False, check_categorical=False,
+            rtol=1e-9, obj=name)
+
+    passing = np.logical_and.reduce(list(passes.values()))
+    assert crossfilter.rows().index.equals(df.index[passing])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_brushes_match_groupby(df, seed):
+    rng = random.Random(seed)
+    crossfilter = Crossfilter(df, "test-crossfilter")
+    countries = crossfilter.dimension("Residence_ISO3")
+    ages = crossfilter.dimension("Age")
+    age_groups = crossfilter.dimension("AgeGroup")
+    games = crossfilter.dimension("Game")
+    dimensions = {"Residence_ISO3": countries, "Age": ages,
+                  "AgeGroup": age_groups, "Game": games}
+
+    # Group name -> (dimension whose filter it ignores, keys)
+    groups = {
+        "by_age_group": ("AgeGroup", ("AgeGroup",)),
+        "by_country": ("Residence_ISO3", ("Residence_ISO3",)),
+        "by_game_platform": (None, ("Game", "Platform")),
+    }
+    age_groups.group("by_age_group", columns=COLUMNS)
+    countries.group("by_country", columns=COLUMNS)
+    crossfilter.group("by_game_platform", ("Game", "Platform"), COLUMNS)
+
+    passes = {name: np.ones(len(df), dtype=bool) for name in dimensions}
+    previous = {}
+
+    def apply(name, action):
+        kind, arg = action
+        dimension, column = dimensions[name], df[name]
+        if kind == "all":
+            dimension.filter_all()
+            passes[name] = np.ones(len(df), dtype=bool)
+        elif kind == "in":
+            dimension.filter_in(arg)
+            passes[name] = column.isin(arg).to_numpy()
+        else:
+            dimension.filter_range(*arg)
+            passes[name] = column.between(arg[0], arg[1],
+                                          inclusive="left").to_numpy()
+
+    def random_action(name):
+        if name == "Age":
+            low = rng.randint(15, 50)
+            return "range", (low, low + rng.randint(0, 15))
+        values = df[name].dropna().unique().tolist()
+        return "in", rng.sample(values, rng.randint(1, min(4, len(values))))
+
+    for step in range(STEPS):
+        name = rng.choice(list(dimensions))
+        move = rng.random()
+        if move < 0.2:
+            action = ("all", None)
+        elif move < 0.35 and name in previous:
+            # Clear a brush, then apply the same brush again
+            apply(name, ("all", None))
+            check_groups(df, crossfilter, passes, groups)
+            action = previous[name]
+        elif move < 0.45 and name in previous:
+            # The same brush twice in a row is a no-op
+            action = previous[name]
+        else:
+            action = random_action(name)
+        apply(name, action)
+        if action[0] != "all":
+            previous[name] = action
+
+        if step == STEPS // 2:
+            # Registered while filters are active, it starts from the rows
+            # passing them
+            crossfilter.group("by_gender", lambda rows: rows[["Gender"]],
+                              COLUMNS)
+            groups["by_gender"] = (None, lambda rows: rows[["Gender"]])
+        check_groups(df, crossfilter, passes, groups)
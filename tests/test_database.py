@@ -0,0 +1,47 @@
+"""SQLite backend aggregates and selections against the pandas helpers"""
+import inspect
+
+import pandas as pd
+import pytest
+
+from tools.benchmark import quiet_bare_mode
+from tools.build_database import check, compare
+from utils.data_processing import (CSV_FILE_PATH, filter_rows,
+                                   get_country_stats, get_data_version,
+                                   process_data, register_view_aggregates,
+                                   tag_version)
+from utils.survey_db import (DASHBOARD_COLUMNS, DatabaseView, build_database,
+                             read_source)
+
+
+# Missing Degree values are None in query results and NaN in frames
+pytestmark = pytest.mark.filterwarnings(
+    "ignore:Mismatched null-like values:FutureWarning")
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    quiet_bare_mode()
+    return build_database(tmp_path_factory.mktemp("db") / "survey.sqlite")
+
+
+@pytest.fixture(scope="module")
+def df():
+    return process_data(pd.concat(read_source(CSV_FILE_PATH)))
+
+
+def test_queries_match_helpers(db, df):
+    assert check(db, df) == []
+
+
+def test_filter_rows_queries_database(db, df):
+    # As load_data registers the database frame with DASHBOARD_DATABASE set
+    frame = tag_version(db.select(DASHBOARD_COLUMNS), db.version)
+    register_view_aggregates(db.version, DatabaseView(db, db.version))
+
+    rows = filter_rows(frame, Gender="Female", Game="Other")
+    expected = df[(df["Gender"] == "Female") & (df["Game"] == "Other")]
+    assert compare("rows", expected[DASHBOARD_COLUMNS], rows) is None
+    assert compare("country_stats",
+                   inspect.unwrap(get_country_stats)(expected, None),
+                   get_country_stats(rows, get_data_version(rows))) is None
@@ -0,0 +1,112 @@
+"""Compacted figures decode back to the data of the original figures"""
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from utils.figures import (FLOAT32_TOLERANCE, compact_figure, encode_array,
+                           share_trace_defaults)
+
+ROWS = 200
+
+
+def decode(spec):
+    """Return the array a plotly.js typed-array spec holds"""
+    values = np.frombuffer(base64.b64decode(spec["bdata"]),
+                           dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+    if "shape" in spec:
+        values = values.reshape([int(n) for n in spec["shape"].split(",")])
+    return values
+
+
+def apply_template(spec):
+    """Return the traces with the single template entry of their type applied"""
+    def merge(default, trace):
+        merged = dict(default)
+        for key, value in trace.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                value = merge(merged[key], value)
+            merged[key] = value
+        return merged
+
+    template = spec["layout"].get("template", {}).get("data", {})
+    return [merge(template.get(trace.get("type"), [{}])[0], trace)
+            for trace in spec["data"]]
+
+
+@pytest.mark.parametrize("values, dtype", [
+    (np.arange(ROWS) - 100, "i1"),
+    (np.arange(ROWS) + 50, "u1"),
+    (np.arange(ROWS) * 100 - 10_000, "i2"),
+    (np.arange(ROWS) * 300, "u2"),
+    (np.arange(ROWS) * 100_000 - 10_000_000, "i4"),
+    (np.arange(ROWS) * 20_000_000, "u4"),
+    (np.arange(ROWS, dtype=float) - 100, "i1"),
+])
+def test_ints_use_smallest_type(values, dtype):
+    spec = encode_array(values, positional=True)
+    assert spec["dtype"] == dtype
+    np.testing.assert_array_equal(decode(spec), values)
+
+
+def test_floats_with_nan():
+    rng = np.random.default_rng(0)
+    values = rng.normal(50, 10, ROWS)
+    values[::7] = np.nan
+    span = np.nanmax(values) - np.nanmin(values)
+
+    positional = encode_array(values, positional=True)
+    assert positional["dtype"] == "f4"
+    np.testing.assert_allclose(decode(positional), values,
+                               atol=FLOAT32_TOLERANCE * span, rtol=0)
+    assert np.isnan(decode(positional)[::7]).all()
+
+    exact = encode_array(values)
+    assert exact["dtype"] == "f8"
+    np.testing.assert_array_equal(decode(exact), values)
+
+
+def test_2d_arrays_keep_their_shape():
+    values = np.arange(ROWS * 3).reshape(ROWS, 3)
+    np.testing.assert_array_equal(decode(encode_array(values)), values)
+
+
+def test_dates_and_text_pass_through():
+    dates = pd.date_range("2017-02-18", periods=ROWS, freq="h")
+    labels = [f"player {i}" for i in range(ROWS)]
+    fig = go.Figure(go.Scatter(x=dates, y=np.arange(ROWS) * 1.5, text=labels,
+                               customdata=np.array(labels)))
+    original = fig.to_dict()["data"][0]
+    trace = compact_figure(fig).to_dict()["data"][0]
+
+    for key in ["x", "text", "customdata"]:
+        assert not isinstance(trace[key], dict)
+        np.testing.assert_array_equal(np.asarray(trace[key]),
+                                      np.asarray(original[key]))
+    np.testing.assert_array_equal(decode(trace["y"]), original["y"])
+
+
+def test_shared_defaults_keep_overrides():
+    fig = go.Figure([
+        go.Scatter(x=[1, 2], y=[3, 4], mode="markers",
+                   marker=dict(size=12, color="red"), name="a"),
+        go.Scatter(x=[1, 2], y=[5, 6], mode="markers",
+                   marker=dict(size=12, color="red"), name="b"),
+        go.Scatter(x=[1, 2], y=[7, 8], mode="markers",
+                   marker=dict(size=12, color="blue"), name="c"),
+    ])
+    original = fig.to_dict()
+    spec = fig.to_dict()
+    share_trace_defaults(spec)
+
+    shared = spec["layout"]["template"]["data"]["scatter"][0]
+    assert shared["mode"] == "markers"
+    assert shared["marker"]["size"] == 12
+    # The color differs on one trace, so every trace keeps its own
+    assert "color" not in shared["marker"]
+    assert [trace["marker"]["color"] for trace in spec["data"]] == [
+        "red", "red", "blue"]
+
+    assert apply_template(spec) == apply_template(original)
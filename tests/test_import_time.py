@@ -0,0 +1,18 @@
+"""Cold-start import budget of the app entry point"""
+from tools.import_report import DEFAULT_BUDGET, measure_imports, summarize
+
+# Packages the map components import when they first render
+LAZY_PACKAGES = ["folium", "branca", "streamlit_folium", "shapely"]
+
+
+def test_app_import_within_budget():
+    # The fastest of a few runs, so a busy machine does not fail the check
+    runs = [measure_imports() for _ in range(3)]
+    total = min(summarize(imports)["total"] for imports in runs)
+    assert total <= DEFAULT_BUDGET, (
+        f"import app took {total:.3f}s, over the {DEFAULT_BUDGET:.3f}s budget")
+
+
+def test_app_import_is_lazy():
+    imported = {name for name, _, _, _ in measure_imports()}
+    assert not imported & set(LAZY_PACKAGES)
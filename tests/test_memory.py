@@ -0,0 +1,43 @@
+"""Full-frame copies and mutations of the components on a rerun"""
+import pytest
+
+from tools.benchmark import (COMPONENTS, clear_caches, make_dataset,
+                             quiet_bare_mode)
+from tools.memory_check import check_component
+from utils.memory import COPY_THRESHOLD, MemoryTracker
+
+ROWS = 50_000
+
+
+@pytest.fixture(scope="module")
+def df():
+    quiet_bare_mode()
+    return make_dataset(ROWS)
+
+
+@pytest.mark.parametrize("name", list(COMPONENTS))
+def test_rerun_does_not_copy_frame(df, name):
+    clear_caches()
+    record = check_component(name, df, COPY_THRESHOLD)
+    assert record["warm"]
+    assert not record["copy_suspected"], (
+        f"{name} allocated {record['peak_bytes'] / record['frame_bytes']:.2f}x "
+        "the frame: " + "; ".join(record["top_allocations"]))
+    assert not record["mutated"]
+
+
+def test_tracker_flags_warm_copy(df):
+    for _ in range(2):
+        with MemoryTracker("copy", df, snapshots=False) as tracker:
+            copy = df.copy()
+        del copy
+    assert tracker.record["warm"]
+    assert tracker.record["copy_suspected"]
+
+
+def test_tracker_skips_cold_call(df):
+    with MemoryTracker("cold copy", df, snapshots=False) as tracker:
+        copy = df.copy()
+    del copy
+    assert not tracker.record["warm"]
+    assert not tracker.record["copy_suspected"]
@@ -0,0 +1,76 @@
+"""Date range views of time partitions against full scans of the rows"""
+import pandas as pd
+import pytest
+
+from tools.benchmark import quiet_bare_mode
+from tools.build_database import HELPERS, compare
+from utils.data_processing import CSV_FILE_PATH, get_data_version, process_data
+from utils.partitions import PRE_AGGREGATES, TimePartitions, select_dates
+
+# Missing Degree values are None in partitions read back from Parquet
+pytestmark = pytest.mark.filterwarnings(
+    "ignore:Mismatched null-like values:FutureWarning")
+
+
+@pytest.fixture(scope="module")
+def df():
+    quiet_bare_mode()
+    return process_data(pd.read_csv(CSV_FILE_PATH))
+
+
+@pytest.fixture(scope="module", params=["memory", "disk"])
+def partitions(request, df, tmp_path_factory):
+    partitions = TimePartitions.build(df, "test", "D")
+    if request.param == "disk":
+        path = tmp_path_factory.mktemp("partitions")
+        partitions.write(path)
+        partitions = TimePartitions.open(path)
+    return partitions
+
+
+def date_ranges(df):
+    first, last = df["Datetime"].min(), df["Datetime"].max()
+    day = first.normalize() + pd.Timedelta(days=1)
+    return {
+        "full": (first, last + pd.Timedelta(seconds=1)),
+        "cut at both ends": (day + pd.Timedelta(hours=7),
+                             day + pd.Timedelta(days=2, hours=15)),
+        "single day": (day, day + pd.Timedelta(days=1)),
+        "within one day": (day + pd.Timedelta(hours=9),
+                           day + pd.Timedelta(hours=13)),
+        "empty": (last + pd.Timedelta(days=1), last + pd.Timedelta(days=2)),
+    }
+
+
+@pytest.mark.parametrize("label", ["full", "cut at both ends", "single day",
+                                   "within one day", "empty"])
+def test_range_matches_full_scan(df, partitions, label):
+    start, end = date_ranges(df)[label]
+    inside, cut = partitions.prune(start, end)
+    if label == "cut at both ends":
+        assert len(cut) == 2 and len(inside) == 1
+    elif label == "single day":
+        assert len(cut) == 0 and len(inside) == 1
+
+    rows = df[(df["Datetime"] >= start) & (df["Datetime"] < end)]
+    selected = partitions.select(start, end, list(df.columns))
+    assert selected.index.equals(rows.index)
+    assert compare("select", rows, selected) is None
+
+    for name in PRE_AGGREGATES:
+        expected = HELPERS[name](rows, None)
+        result = partitions.aggregate(name, start, end)
+        if isinstance(result, pd.Series):
+            result = result.reset_index(name="count")
+        assert compare(name, expected, result) is None
+
+
+@pytest.mark.parametrize("label", ["cut at both ends", "within one day"])
+def test_view_helpers_read_partitions(df, partitions, label):
+    # The dashboard's path: a tagged view whose helpers read the partitions
+    start, end = date_ranges(df)[label]
+    view = select_dates(partitions, start, end)
+    rows = df[(df["Datetime"] >= start) & (df["Datetime"] < end)]
+    for name in PRE_AGGREGATES:
+        assert compare(name, HELPERS[name](rows, None),
+                       HELPERS[name](view, get_data_version(view))) is None
@@ -0,0 +1,75 @@
+"""Rolling score means and bands against windows computed from the rows"""
+import inspect
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.score_trends import (BAND_Z, BUCKETS, TREND_COLUMNS,
+                                     get_score_buckets, rolling_scores)
+from tools.benchmark import quiet_bare_mode
+from utils.data_processing import CSV_FILE_PATH, process_data
+
+
+@pytest.fixture(scope="module")
+def survey():
+    quiet_bare_mode()
+    return process_data(pd.read_csv(CSV_FILE_PATH))
+
+
+@pytest.fixture(params=["survey", "sparse", "offset"])
+def df(request, survey):
+    if request.param == "sparse":
+        # Few rows, so many buckets and windows are empty or hold one value
+        return survey.iloc[::97]
+    if request.param == "offset":
+        # Large values with a small spread, where sums of squares cancel
+        return survey.assign(GAD_T=survey["GAD_T"] + 1e7,
+                             Hours=survey["Hours"] * 1e-3 + 1e5)
+    return survey
+
+
+def expected_scores(df, bucket, by, groups, window):
+    """Mean, band and count of every window, from the rows in it"""
+    step, _ = BUCKETS[bucket]
+    df = df[df["Datetime"].notna()]
+    stamps = df["Datetime"].dt.floor(step)
+    positions = ((stamps - stamps.min()) // step).to_numpy()
+    if by is None:
+        keys = pd.Series("All", index=df.index)
+    else:
+        keys = df[by].fillna("Other").astype(str)
+        keys = keys.where(keys.isin(groups), "Other")
+
+    shape = (len(groups), positions.max() + 1, len(TREND_COLUMNS))
+    result = {name: np.full(shape, np.nan) for name in
+              ["mean", "low", "high", "count"]}
+    for i, group in enumerate(groups):
+        rows = df.loc[(keys == group).to_numpy(), list(TREND_COLUMNS)]
+        group_positions = positions[(keys == group).to_numpy()]
+        for j in range(shape[1]):
+            window_rows = rows[(group_positions > j - window)
+                               & (group_positions <= j)]
+            count = window_rows.count().to_numpy()
+            mean = window_rows.mean().to_numpy()
+            margin = BAND_Z * window_rows.std().to_numpy() / np.sqrt(count)
+            result["count"][i, j] = count
+            result["mean"][i, j] = mean
+            result["low"][i, j] = mean - margin
+            result["high"][i, j] = mean + margin
+    return result
+
+
+@pytest.mark.parametrize("bucket", list(BUCKETS))
+@pytest.mark.parametrize("by", [None, "Platform", "Game"])
+def test_rolling_matches_rows(df, bucket, by):
+    buckets = inspect.unwrap(get_score_buckets)(df, None, bucket, by)
+    _, default_window = BUCKETS[bucket]
+    for window in [1, 2, default_window, len(buckets["times"]) + 5]:
+        rolling = rolling_scores(buckets, window)
+        expected = expected_scores(df, bucket, by, buckets["groups"], window)
+        np.testing.assert_array_equal(rolling["count"], expected["count"])
+        for name in ["mean", "low", "high"]:
+            np.testing.assert_allclose(rolling[name], expected[name],
+                                       rtol=1e-9, atol=1e-6,
+                                       err_msg=f"{name}, window {window}")